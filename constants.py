@@ -16,6 +16,7 @@ RIGHT = 2
 DOWN = 3
 
 # Maze cell states
+UNKNOWN = 0
 CLOSED = 1
 OPEN = 2
 BOUNDARY = 3
@@ -0,0 +1,119 @@
+from functools import lru_cache
+
+import numpy as np
+
+# Largest period over which the waits of one pair of candidate sets are tabulated, pairs with a longer
+# period are answered from their list of lcms
+MAX_PAIR_TURNS = 1 << 12
+
+# Candidate pairs kept in memory, each holds at most two MAX_PAIR_TURNS long tables
+MAX_CACHED_PAIRS = 1024
+
+
+def frequency_mask(frequencies):
+    """Bitmask of a set of frequencies, bit n meaning frequency n, 0 being the never open door"""
+    mask = 0
+    for frequency in frequencies:
+        mask |= 1 << frequency
+    return mask
+
+
+def mask_frequencies(mask):
+    return [frequency for frequency in range(mask.bit_length()) if mask >> frequency & 1]
+
+
+def can_open(mask1, mask2):
+    """Whether some pair of candidates lets both doors open together, i.e. both have a non zero candidate"""
+    return mask1 >> 1 != 0 and mask2 >> 1 != 0
+
+
+class PairWaits:
+    """Waits before the two doors of an edge are open together, for every pair of their candidates
+
+        Each pair (f1, f2) of non zero candidates is open on the multiples of lcm(f1, f2), so the wait from
+        turn t is -t mod lcm(f1, f2) and the waits of all pairs repeat with the lcm of those periods.
+    """
+
+    def __init__(self, mask1, mask2, never_open_period=None):
+        frequencies1 = np.array(mask_frequencies(mask1), dtype=np.int64)
+        frequencies2 = np.array(mask_frequencies(mask2), dtype=np.int64)
+        periods = np.lcm.outer(frequencies1, frequencies2).ravel()
+        if never_open_period is None:
+            periods = periods[periods > 0]
+        else:
+            periods = np.where(periods > 0, periods, never_open_period)
+
+        self.periods, self.counts = np.unique(periods, return_counts=True)
+        self.n_pairs = int(self.counts.sum())
+        self.period = int(np.lcm.reduce(self.periods)) if self.n_pairs else 0
+        self.mean_period = float(self.periods @ self.counts / self.n_pairs) if self.n_pairs else float("inf")
+
+        self.expected_table = None
+        self.worst_table = None
+        if 0 < self.period <= MAX_PAIR_TURNS:
+            waits = -np.arange(self.period)[:, None] % self.periods[None, :]
+            self.expected_table = (waits @ self.counts / self.n_pairs).tolist()
+            self.worst_table = waits.max(axis=1).tolist()
+
+    def waits(self, turn):
+        """Expected and worst case waits before a move succeeding on `turn` or later, inf if it never does"""
+        if self.n_pairs == 0:
+            return float("inf"), float("inf")
+        if self.expected_table is not None:
+            index = turn % self.period
+            return self.expected_table[index], self.worst_table[index]
+        waits = -turn % self.periods
+        return float(waits @ self.counts / self.n_pairs), int(waits.max())
+
+
+class WaitTable:
+    """Bounded cache of PairWaits keyed by the candidate bitmasks of the two doors of an edge
+
+        Candidate sets are the ones the players already maintain, as bitmasks built with frequency_mask or
+        read from frequency_inference.FrequencyCandidates. The pairs are enumerated once per distinct
+        (mask1, mask2), afterwards every query is a table lookup.
+    """
+
+    def __init__(self, never_open_period=None, max_cached_pairs=MAX_CACHED_PAIRS):
+        """
+            Args:
+                never_open_period (Optional[int]): period given to the pairs involving a never open candidate,
+                    None leaves them out of the averages
+                max_cached_pairs (int): number of candidate pairs kept, least recently used first out
+        """
+        self.never_open_period = never_open_period
+        self.pair_waits = lru_cache(maxsize=max_cached_pairs)(self.build)
+
+    def build(self, mask1, mask2):
+        return PairWaits(mask1, mask2, self.never_open_period)
+
+    def get(self, mask1, mask2):
+        # the waits of an edge don't depend on the side it's crossed from
+        if mask1 > mask2:
+            mask1, mask2 = mask2, mask1
+        return self.pair_waits(mask1, mask2)
+
+    def waits(self, mask1, mask2, turn):
+        return self.get(mask1, mask2).waits(turn)
+
+    def expected_wait(self, mask1, mask2, turn):
+        return self.get(mask1, mask2).waits(turn)[0]
+
+    def worst_wait(self, mask1, mask2, turn):
+        return self.get(mask1, mask2).waits(turn)[1]
+
+    def mean_period(self, mask1, mask2):
+        """Mean lcm over the pairs of candidates, regardless of the turn"""
+        return self.get(mask1, mask2).mean_period
+
+
+shared_tables = {}
+
+
+def get_wait_table(never_open_period=None):
+    """WaitTable shared by every component of a process using the same never open period"""
+    table = shared_tables.get(never_open_period)
+    if table is None:
+        table = WaitTable(never_open_period)
+        shared_tables[never_open_period] = table
+    return table
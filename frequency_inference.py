@@ -0,0 +1,108 @@
+import numpy as np
+
+import constants
+from frequency_tables import get_frequency_tables, pack_frequencies, unpack_frequencies
+
+
+class FrequencyCandidates:
+    """Frequencies still consistent with every observation of every door of a maze
+
+        A door with frequency n > 0 is open exactly on the turns divisible by n, and a door with
+        frequency 0 is never open. The candidates of each door are kept as a bitmask over
+        0..maximum_door_frequency in a dense (width, height, 4, words) array, so that one percept
+        updates every door it contains with a single vectorized AND against the mask of the
+        frequencies open on that turn.
+    """
+
+    def __init__(self, maximum_door_frequency, shape=(2 * constants.map_dim + 1, 2 * constants.map_dim + 1),
+                 tables=None):
+        """
+            Args:
+                maximum_door_frequency (int): the maximum frequency of doors
+                shape (Tuple[int, int]): size of the grid, large enough for any position the caller uses
+                tables (Optional[FrequencyTables]): precomputed open masks, shared ones are used if None
+        """
+        self.maximum_door_frequency = maximum_door_frequency
+        self.tables = tables if tables is not None else get_frequency_tables(maximum_door_frequency)
+        self.shape = tuple(shape)
+        self.frequencies = np.arange(maximum_door_frequency + 1)
+
+        self.all_mask = pack_frequencies(np.ones(maximum_door_frequency + 1, dtype=bool))
+        self.never_open_mask = pack_frequencies(self.frequencies == 0)
+        self.n_words = len(self.all_mask)
+
+        self.candidates = np.empty(self.shape + (4, self.n_words), dtype=np.uint64)
+        self.candidates[...] = self.all_mask
+        self.seen = np.zeros(self.shape + (4,), dtype=bool)
+
+    def update(self, maze_state, turn, x, y):
+        """Apply a percept
+
+            Args:
+                maze_state (List[Tuple[int, int, int, int]]): doors of the percept, relative to the drone
+                turn (int): the turn on which the percept was seen
+                x (int): x index of the drone in the grid
+                y (int): y index of the drone in the grid
+            Returns:
+                Tuple[np.ndarray, np.ndarray, np.ndarray]: x, y and door type indexes of the updated doors
+        """
+        doors = np.asarray(maze_state, dtype=np.int64).reshape(-1, 4)
+        return self.apply(x + doors[:, 0], y + doors[:, 1], doors[:, 2], doors[:, 3], turn)
+
+    def update_tensor(self, maze_tensor, turn, x, y):
+        """Same as update, reading the (2r+1, 2r+1, 4) egocentric percept of TimingMazeState.maze_tensor"""
+        radius = maze_tensor.shape[0] // 2
+        dx, dy, door_types = np.nonzero(maze_tensor)
+        return self.apply(x + dx - radius, y + dy - radius, door_types, maze_tensor[dx, dy, door_types], turn)
+
+    def apply(self, xs, ys, door_types, states, turn):
+        inside = (xs >= 0) & (xs < self.shape[0]) & (ys >= 0) & (ys < self.shape[1])
+        if not inside.all():
+            xs, ys, door_types, states = xs[inside], ys[inside], door_types[inside], states[inside]
+
+        open_mask = self.tables.open_mask(turn)
+        masks = np.where((states == constants.OPEN)[:, None], open_mask, ~open_mask & self.all_mask)
+        masks[states == constants.BOUNDARY] = self.never_open_mask
+        self.candidates[xs, ys, door_types] &= masks
+        self.seen[xs, ys, door_types] = True
+        return xs, ys, door_types
+
+    def unpack(self, index=Ellipsis):
+        """Boolean (..., maximum_door_frequency + 1) array of the candidates of the indexed doors"""
+        return unpack_frequencies(self.candidates[index], self.maximum_door_frequency)
+
+    def get_frequencies(self, x, y, door_type):
+        """Candidate frequencies of one door as a sorted list"""
+        return np.flatnonzero(self.unpack((x, y, door_type))).tolist()
+
+    def get_mask(self, x, y, door_type):
+        """Candidates of one door as a python int, bit n meaning frequency n like door_wait.frequency_mask"""
+        words = self.candidates[x, y, door_type]
+        if self.n_words == 1:
+            return int(words[0])
+        return int.from_bytes(words.astype("<u8").tobytes(), "little")
+
+    def count(self, index=Ellipsis):
+        """Number of candidates of the indexed doors"""
+        return self.unpack(index).sum(axis=-1)
+
+    def is_certain(self, index=Ellipsis):
+        return self.count(index) == 1
+
+    def min_frequency(self, index=Ellipsis):
+        """Smallest non zero candidate of the indexed doors, 0 if the door can only be never open"""
+        flags = self.unpack(index)[..., 1:]
+        return np.where(flags.any(axis=-1), flags.argmax(axis=-1) + 1, 0)
+
+    def max_frequency(self, index=Ellipsis):
+        """Largest non zero candidate of the indexed doors, 0 if the door can only be never open"""
+        flags = self.unpack(index)[..., :0:-1]
+        return np.where(flags.any(axis=-1), self.maximum_door_frequency - flags.argmax(axis=-1), 0)
+
+    def mean_frequency(self, index=Ellipsis):
+        """Mean of the non zero candidates of the indexed doors, inf if the door can only be never open"""
+        flags = self.unpack(index)[..., 1:]
+        total = flags.sum(axis=-1)
+        weighted = (flags * self.frequencies[1:]).sum(axis=-1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(total > 0, weighted / np.maximum(total, 1), np.inf)
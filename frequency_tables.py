@@ -0,0 +1,116 @@
+import math
+import os
+import pickle
+
+import numpy as np
+
+# Number of turns stored in the dense table. When the hyperperiod fits (lcm(1..12) = 27720 does,
+# lcm(1..13) = 360360 does not) the table covers one hyperperiod and so every turn, otherwise it covers the
+# first MAX_TABLE_TURNS turns, more than a game gets to play, and later turns are looked up by gcd
+MAX_TABLE_TURNS = 1 << 16
+
+
+def pack_frequencies(flags):
+    """Pack a boolean array over frequencies 0..n into little endian uint64 words, bit i meaning frequency i"""
+    flags = np.asarray(flags, dtype=bool)
+    n_words = (flags.shape[-1] + 63) // 64
+    padded = np.zeros(flags.shape[:-1] + (n_words * 64,), dtype=bool)
+    padded[..., :flags.shape[-1]] = flags
+    return np.packbits(padded, axis=-1, bitorder="little").view("<u8").astype(np.uint64)
+
+
+def unpack_frequencies(masks, maximum_door_frequency):
+    """Inverse of pack_frequencies, returns a boolean array over frequencies 0..maximum_door_frequency"""
+    masks = np.ascontiguousarray(masks, dtype="<u8")
+    flags = np.unpackbits(masks.view(np.uint8), axis=-1, bitorder="little")
+    return flags[..., :maximum_door_frequency + 1].astype(bool)
+
+
+class FrequencyTables:
+    """Which door frequencies are open on which turn, computed once per maximum door frequency
+
+        A door with frequency n > 0 is open on turn t iff n divides t, and every n <= maximum_door_frequency
+        divides the hyperperiod lcm(1..maximum_door_frequency), so the open frequencies only depend on
+        t modulo the hyperperiod. A dense table of min(hyperperiod, MAX_TABLE_TURNS) turns is built and cached
+        in the player's precomp_dir. Past a table shorter than the hyperperiod, turns are looked up by
+        gcd(t, hyperperiod) and memoized as they come.
+    """
+
+    def __init__(self, maximum_door_frequency, precomp_dir=None):
+        """
+            Args:
+                maximum_door_frequency (int): the maximum frequency of doors
+                precomp_dir (Optional[str]): directory where the table is cached, nothing is written if None
+        """
+        self.maximum_door_frequency = maximum_door_frequency
+        self.frequencies = np.arange(maximum_door_frequency + 1)
+        self.hyperperiod = math.lcm(*range(1, maximum_door_frequency + 1))
+        # The table is indexed by turn modulo table_turns, which is only exact past the first turns when the
+        # table covers a whole hyperperiod
+        self.table_turns = min(self.hyperperiod, MAX_TABLE_TURNS)
+
+        self.open_mask_table = None
+        self.open_frequency_table = None
+        self.memo = {}
+        self.load_or_build(precomp_dir)
+
+    def load_or_build(self, precomp_dir):
+        precomp_path = None
+        if precomp_dir:
+            precomp_path = os.path.join(precomp_dir, "frequency_tables_{}_{}.pkl".format(
+                self.maximum_door_frequency, self.table_turns))
+
+        if precomp_path and os.path.isfile(precomp_path):
+            with open(precomp_path, "rb") as f:
+                self.open_mask_table, self.open_frequency_table = pickle.load(f)
+            return
+
+        turns = np.arange(self.table_turns)
+        open_table = np.zeros((self.table_turns, self.maximum_door_frequency + 1), dtype=bool)
+        open_table[:, 1:] = turns[:, None] % self.frequencies[None, 1:] == 0
+        self.open_mask_table = pack_frequencies(open_table)
+        self.open_frequency_table = [tuple(np.flatnonzero(row).tolist()) for row in open_table]
+
+        if precomp_path:
+            with open(precomp_path, "wb") as f:
+                pickle.dump([self.open_mask_table, self.open_frequency_table], f)
+
+    def lookup(self, turn):
+        key = math.gcd(turn, self.hyperperiod)
+        entry = self.memo.get(key)
+        if entry is None:
+            is_open = np.zeros(self.maximum_door_frequency + 1, dtype=bool)
+            is_open[1:] = key % self.frequencies[1:] == 0
+            entry = (tuple(np.flatnonzero(is_open).tolist()), pack_frequencies(is_open))
+            self.memo[key] = entry
+        return entry
+
+    def in_table(self, turn):
+        return self.table_turns == self.hyperperiod or turn < self.table_turns
+
+    def open_frequencies(self, turn):
+        """Frequencies 1..maximum_door_frequency whose doors are open on `turn`, i.e. the divisors of turn"""
+        if self.in_table(turn):
+            return self.open_frequency_table[turn % self.table_turns]
+        return self.lookup(turn)[0]
+
+    def open_mask(self, turn):
+        """Same as open_frequencies, packed like frequency_inference.FrequencyCandidates masks"""
+        if self.in_table(turn):
+            return self.open_mask_table[turn % self.table_turns]
+        return self.lookup(turn)[1]
+
+    def is_open(self, frequency, turn):
+        return frequency > 0 and turn % frequency == 0
+
+
+shared_tables = {}
+
+
+def get_frequency_tables(maximum_door_frequency, precomp_dir=None):
+    """FrequencyTables shared by every component of a process using the same maximum door frequency"""
+    tables = shared_tables.get(maximum_door_frequency)
+    if tables is None:
+        tables = FrequencyTables(maximum_door_frequency, precomp_dir)
+        shared_tables[maximum_door_frequency] = tables
+    return tables
@@ -0,0 +1,118 @@
+import numpy as np
+
+
+def disk_half_widths(radius):
+    """half_widths[dy + radius] is the largest dx with dx^2 + dy^2 <= radius^2, the drone's view being a disk"""
+    dys = np.arange(-radius, radius + 1)
+    half_widths = np.floor(np.sqrt(radius * radius - dys * dys)).astype(np.int64)
+    # floor(sqrt) can be one off for perfect squares
+    half_widths += (half_widths + 1) ** 2 + dys * dys <= radius * radius
+    half_widths -= half_widths ** 2 + dys * dys > radius * radius
+    return half_widths
+
+
+def disk_kernel(radius):
+    """(2r+1, 2r+1) boolean mask of the offsets a drone of radius r sees"""
+    half_widths = disk_half_widths(radius)
+    dxs = np.arange(-radius, radius + 1)
+    return np.abs(dxs)[None, :] <= half_widths[:, None]
+
+
+def disk_shift_offsets(radius, step):
+    """Offsets of the cells entering and leaving the disk when its center moves by `step`
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (n, 2) offsets from the old center of the cells only the moved disk
+                covers, and of the cells only the old disk covers, O(r) of each for a one cell step
+    """
+    kernel = disk_kernel(radius)
+    size = 2 * radius + 1 + 2 * max(abs(step[0]), abs(step[1]))
+    margin = (size - kernel.shape[0]) // 2
+    old = np.zeros((size, size), dtype=bool)
+    old[margin:margin + kernel.shape[0], margin:margin + kernel.shape[1]] = kernel
+    new = np.roll(old, step, axis=(0, 1))
+    center = size // 2
+    entering = np.argwhere(new & ~old) - center
+    leaving = np.argwhere(old & ~new) - center
+    return entering, leaving
+
+
+class InformationGainMap:
+    """How many unseen cells a drone would reveal from every cell of a grid
+
+        The gain of a cell is the number of unseen cells within the drone's disk around it, i.e. the
+        convolution of the unseen bitmap with the disk kernel. The disk is a stack of 2r+1 horizontal spans,
+        so with prefix sums along the rows every span is a difference of two shifted arrays and the gains of
+        the whole grid cost O(r) array operations. Cells outside the grid are never counted as unseen.
+    """
+
+    def __init__(self, shape, radius, seen=None):
+        """
+            Args:
+                shape (Tuple[int, int]): size of the grid
+                radius (int): the radius of the drone
+                seen (Optional[np.ndarray]): boolean array of the seen cells, shared rather than copied, a new
+                    one is made if None
+        """
+        self.shape = tuple(shape)
+        self.radius = radius
+        self.seen = seen if seen is not None else np.zeros(self.shape, dtype=bool)
+        self.half_widths = disk_half_widths(radius).tolist()
+
+    def mark_seen(self, index):
+        self.seen[index] = True
+
+    def gains(self, bounds=None):
+        """(shape) int array of the number of unseen cells in the disk around every cell
+
+            Args:
+                bounds (Optional[Tuple[Optional[Tuple[int, int]], Optional[Tuple[int, int]]]]): inclusive index
+                    range of each axis the cells must lie in to be counted, e.g. the known maze boundary,
+                    None for an axis without bounds
+        """
+        unseen = ~self.seen
+        if bounds is not None:
+            inside = np.ones(self.shape, dtype=bool)
+            for axis, axis_bounds in enumerate(bounds):
+                if axis_bounds is None:
+                    continue
+                indexes = np.arange(self.shape[axis])
+                axis_inside = (indexes >= axis_bounds[0]) & (indexes <= axis_bounds[1])
+                inside &= axis_inside[:, None] if axis == 0 else axis_inside[None, :]
+            unseen &= inside
+        return self.disk_sum(unseen)
+
+    def disk_sum(self, flags):
+        """Number of set flags in the disk around every cell of the grid"""
+        r = self.radius
+        rows, cols = self.shape
+        # prefix[i, j] is the number of flags of padded row i before padded column j
+        prefix = np.zeros((rows + 2 * r, cols + 2 * r + 1), dtype=np.int32)
+        prefix[r:r + rows, r + 1:r + 1 + cols] = flags
+        np.cumsum(prefix, axis=1, out=prefix)
+
+        total = np.zeros(self.shape, dtype=np.int32)
+        for dy, half_width in enumerate(self.half_widths):
+            band = prefix[dy:dy + rows]
+            total += band[:, r + half_width + 1:r + half_width + 1 + cols]
+            total -= band[:, r - half_width:r - half_width + cols]
+        return total
+
+    def gain(self, row, col, bounds=None):
+        """Gain of a single cell, without convolving the whole grid"""
+        r = self.radius
+        total = 0
+        for dy, half_width in enumerate(self.half_widths):
+            y = row + dy - r
+            if not 0 <= y < self.shape[0]:
+                continue
+            low, high = col - half_width, col + half_width
+            if bounds is not None:
+                if bounds[0] is not None and not bounds[0][0] <= y <= bounds[0][1]:
+                    continue
+                if bounds[1] is not None:
+                    low, high = max(low, bounds[1][0]), min(high, bounds[1][1])
+            low, high = max(low, 0), min(high, self.shape[1] - 1)
+            if low <= high:
+                total += high - low + 1 - int(np.count_nonzero(self.seen[y, low:high + 1]))
+        return total
@@ -18,6 +18,7 @@ if __name__ == '__main__':
                                                           "disable_logging is false")
     parser.add_argument("--disable_logging", action="store_true", help="Disable Logging, log_path becomes path to file")
     parser.add_argument("--disable_timeout", action="store_true", help="Disable timeouts for player code")
+    parser.add_argument("--sandbox", action="store_true", help="Run the player in a separate worker process")
     parser.add_argument("--player", "-p", default="d", help="Specifying player")
     args = parser.parse_args()
 
@@ -0,0 +1,193 @@
+import multiprocessing
+import time
+import traceback
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from timing_maze_percept import door_visibility
+from timing_maze_state import TimingMazeState
+from utils import TimeoutException
+
+# Slots of the percept header in shared memory
+N_DOORS, IS_END_VISIBLE, END_X, END_Y, START_X, START_Y, HAS_TENSOR = range(7)
+HEADER_SIZE = 8
+
+# Messages sent to the worker
+MOVE = b"\x01"
+STOP = b"\x00"
+
+
+class PerceptBuffer:
+    """Views over one shared memory block holding a percept
+
+        Layout: an int64 header, the list of (x, y, door_type, state) doors as an int32 array sized for the
+        largest possible percept, and the (2r+1, 2r+1, 4) uint8 egocentric tensor.
+    """
+
+    def __init__(self, shm, radius):
+        max_doors = int(door_visibility(radius).sum())
+        side = 2 * radius + 1
+        doors_offset = HEADER_SIZE * 8
+        tensor_offset = doors_offset + max_doors * 4 * 4
+
+        self.shm = shm
+        self.header = np.ndarray((HEADER_SIZE,), dtype=np.int64, buffer=shm.buf)
+        self.doors = np.ndarray((max_doors, 4), dtype=np.int32, buffer=shm.buf, offset=doors_offset)
+        self.tensor = np.ndarray((side, side, 4), dtype=np.uint8, buffer=shm.buf, offset=tensor_offset)
+
+    @staticmethod
+    def size(radius):
+        side = 2 * radius + 1
+        return HEADER_SIZE * 8 + int(door_visibility(radius).sum()) * 4 * 4 + side * side * 4
+
+    def write(self, percept):
+        n_doors = len(percept.maze_state)
+        if n_doors:
+            self.doors[:n_doors] = percept.maze_state
+        self.header[N_DOORS] = n_doors
+        self.header[IS_END_VISIBLE] = percept.is_end_visible
+        self.header[END_X] = percept.end_x if percept.is_end_visible else 0
+        self.header[END_Y] = percept.end_y if percept.is_end_visible else 0
+        self.header[START_X] = percept.start_x
+        self.header[START_Y] = percept.start_y
+        self.header[HAS_TENSOR] = percept.maze_tensor is not None
+        if percept.maze_tensor is not None:
+            self.tensor[...] = percept.maze_tensor
+
+    def read(self):
+        # The player may keep the percept, so hand it copies rather than views which the next turn overwrites
+        header = self.header.tolist()
+        maze_state = list(map(tuple, self.doors[:header[N_DOORS]].tolist()))
+        maze_tensor = self.tensor.copy() if header[HAS_TENSOR] else None
+        return TimingMazeState(maze_state, bool(header[IS_END_VISIBLE]), header[END_X], header[END_Y],
+                               header[START_X], header[START_Y], maze_tensor)
+
+
+def worker_main(conn, shm, radius, player_class, player_kwargs):
+    """Loop run in the worker process: build the player, then answer one move per message"""
+    buffer = PerceptBuffer(shm, radius)
+    try:
+        start = time.process_time()
+        player = player_class(**player_kwargs)
+        conn.send(("ready", time.process_time() - start, None))
+    except Exception:
+        conn.send(("error", 0.0, traceback.format_exc()))
+        return
+
+    while True:
+        try:
+            message = conn.recv_bytes()
+        except EOFError:
+            return
+        if message == STOP:
+            return
+
+        percept = buffer.read()
+        start = time.process_time()
+        try:
+            action = player.move(current_percept=percept)
+            error = None
+        except Exception:
+            action = None
+            error = traceback.format_exc()
+        cpu_time = time.process_time() - start
+        conn.send((action, cpu_time, error))
+
+
+class WorkerExitedException(Exception):
+    """The worker process of a SandboxedPlayer died, the player can't be asked for moves anymore"""
+
+
+class SandboxedPlayer:
+    """Runs a player in a worker process
+
+        Percepts are written to shared memory and only a one byte wake up message and the returned move
+        go through the pipe. Time is measured as the CPU time of the worker process, and a worker that
+        does not answer before its deadline is killed.
+    """
+
+    def __init__(self, player_class, player_kwargs, init_timeout=None):
+        """
+            Args:
+                player_class (type): class of the player, instantiated in the worker as player_class(**player_kwargs)
+                player_kwargs (dict): constructor arguments, must contain the radius
+                init_timeout (Optional[float]): seconds after which a player still initializing is killed
+        """
+        radius = player_kwargs["radius"]
+        # fork keeps the player's logger handlers and avoids pickling the player class
+        method = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+        context = multiprocessing.get_context(method)
+
+        self.shm = shared_memory.SharedMemory(create=True, size=PerceptBuffer.size(radius))
+        self.buffer = PerceptBuffer(self.shm, radius)
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=worker_main, daemon=True,
+                                       args=(child_conn, self.shm, radius, player_class, player_kwargs))
+        self.process.start()
+        child_conn.close()
+
+        self.last_cpu_time = 0.0
+        self.last_error = None
+
+        status, self.init_cpu_time, error = self.receive(init_timeout)
+        if status != "ready":
+            self.close()
+            raise RuntimeError("Player initialization failed in worker process:\n{}".format(error))
+
+    def receive(self, timeout):
+        if not self.conn.poll(timeout):
+            self.kill()
+            raise TimeoutException
+        try:
+            return self.conn.recv()
+        except EOFError:
+            # The worker died, e.g. killed by the OS for using too much memory, none of its time is known
+            self.close()
+            self.last_cpu_time = 0.0
+            raise WorkerExitedException("Player worker process exited with code {}".format(self.process.exitcode))
+
+    def move(self, current_percept, timeout=None):
+        """Ask the worker for a move
+
+            Args:
+                current_percept (TimingMazeState): contains current state information
+                timeout (Optional[float]): seconds to wait for the move, None to wait forever
+            Returns:
+                int: the move returned by the player, None if the player raised an exception
+            Raises:
+                TimeoutException: the worker did not answer in time and has been killed
+                WorkerExitedException: the worker died, now or on an earlier move
+        """
+        if self.shm is None:
+            self.last_cpu_time = 0.0
+            raise WorkerExitedException("Player worker process exited with code {}".format(self.process.exitcode))
+        self.buffer.write(current_percept)
+        self.conn.send_bytes(MOVE)
+        action, self.last_cpu_time, self.last_error = self.receive(timeout)
+        return action
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.close()
+
+    def close(self):
+        if self.shm is None:
+            return
+        if self.process.is_alive():
+            try:
+                self.conn.send_bytes(STOP)
+            except (BrokenPipeError, OSError):
+                pass
+            self.process.join(1)
+            if self.process.is_alive():
+                self.process.kill()
+                self.process.join()
+        self.conn.close()
+        # Drop the numpy views first, shared memory can't be closed while they exist
+        self.buffer = None
+        self.shm.close()
+        self.shm.unlink()
+        self.shm = None
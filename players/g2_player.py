@@ -3,11 +3,18 @@ import pickle
 import numpy as np
 import logging
 import math
-import heapq
-from collections import deque, defaultdict
+from collections import deque
 
 import constants
 from timing_maze_state import TimingMazeState
+from frequency_inference import FrequencyCandidates
+from frequency_tables import get_frequency_tables
+from timing_maze_planner import EarliestArrivalPlanner
+
+# Position delta of LEFT, UP, RIGHT, DOWN and the door facing each of them
+DX = np.array([-1, 0, 1, 0])
+DY = np.array([0, -1, 0, 1])
+FACING = np.array([constants.RIGHT, constants.DOWN, constants.LEFT, constants.UP])
 
 class Player:
     def __init__(self, rng: np.random.Generator, logger: logging.Logger,
@@ -50,10 +57,32 @@ class Player:
         self.target_x = None
         self.target_y = None
         
-        self.door_frequencies = {}
         self.default_frequency = sum(range(1, self.maximum_door_frequency + 1))/self.maximum_door_frequency
+
+        # Door beliefs on a grid centred on the start, index = coordinate + grid_offset
+        self.frequency_candidates = FrequencyCandidates(
+            self.maximum_door_frequency, tables=get_frequency_tables(self.maximum_door_frequency, precomp_dir))
+        self.grid_offset = constants.map_dim
+        # Estimated frequency of every door, 0 if the door can never open
+        self.door_frequencies = np.full(self.frequency_candidates.shape + (4,), int(self.default_frequency))
+        self.seen_cells = np.zeros(self.frequency_candidates.shape, dtype=bool)
+        # Crossing period of every edge, lcm of its two door frequencies, 0 if it can't be crossed or leads to
+        # an unseen cell. Only the edges of the doors seen in a percept are recomputed, and periods_version
+        # counts the percepts which changed some period
+        self.planner = EarliestArrivalPlanner(self.frequency_candidates.shape)
+        self.periods_version = 0
+        # (search result, target, periods_version) of the last search
+        self.last_search = None
+        # Cells a failed search couldn't reach, valid while periods_version is unreachable_version
+        self.unreachable = np.zeros(self.frequency_candidates.shape, dtype=bool)
+        self.unreachable_version = None
         
-        self.times_discovered = defaultdict(int)
+        # Number of times every cell's doors were seen, and the order in which the cells were first seen
+        # (-1 if never) so that ties go to the cell discovered first
+        self.times_discovered = np.zeros(self.frequency_candidates.shape, dtype=np.int64)
+        self.discovery_order = np.full(self.frequency_candidates.shape, -1, dtype=np.int64)
+        self.num_discovered = 0
+        self.grid_x, self.grid_y = np.indices(self.frequency_candidates.shape) - self.grid_offset
         self.current_destination = None
         
         self.turn_number = 0
@@ -67,16 +96,22 @@ class Player:
             None (relies on class attributes: self.times_discovered, self.curr_x, self.curr_y)
 
         Outputs:
-            destination (tuple): The cell with the lowest score based on times discovered and heuristic.
+            destination (tuple): The cell with the lowest score based on times discovered and heuristic, other
+                than the cells known to be unreachable, or None if there is none.
         """
-        min_score = float('inf')
-        destination = None
-        for cell in self.times_discovered:
-            score = self.times_discovered[cell] + self.heuristic((self.curr_x, self.curr_y), cell)
-            if score < min_score:
-                min_score = score
-                destination = cell
-        return destination
+        discovered = self.discovery_order >= 0
+        if self.unreachable_version == self.periods_version:
+            discovered &= ~self.unreachable
+        if not discovered.any():
+            return None
+
+        # Score of every discovered cell at once, the heuristic being the Manhattan distance
+        score = self.times_discovered + np.abs(self.grid_x - self.curr_x) + np.abs(self.grid_y - self.curr_y)
+        score = np.where(discovered, score, np.iinfo(np.int64).max)
+        best = score == score.min()
+        x, y = np.unravel_index(np.argmin(np.where(best, self.discovery_order, np.iinfo(np.int64).max)),
+                                score.shape)
+        return (int(x) - self.grid_offset, int(y) - self.grid_offset)
     
     def update_door_frequencies(self, maze_state):
         """
@@ -86,60 +121,91 @@ class Player:
             maze_state (list): List of door states in the maze within the current view (each entry contains coordinates and door state).
             
         Outputs:
-            None (modifies class attributes: self.door_frequencies, self.times_discovered).
+            None (modifies class attributes: self.frequency_candidates, self.door_frequencies, self.seen_cells,
+                self.times_discovered).
         """
-        for cell_door in maze_state:
-            # Convert cell coordinates to global coordinates
-            cell_x = cell_door[0] + self.curr_x
-            cell_y = cell_door[1] + self.curr_y
-            
-            self.times_discovered[(cell_x, cell_y)] += 1
-            
-            # If the cell is not in the door frequencies, add it
-            if (cell_x, cell_y) not in self.door_frequencies:
-                self.door_frequencies[(cell_x, cell_y)] = {}
-                
-            # If the door is not in the cell's door frequencies, add it
-            if cell_door[2] not in self.door_frequencies[(cell_x, cell_y)]:
-                self.door_frequencies[(cell_x, cell_y)][cell_door[2]] = {
-                    'possibilities': set(range(1, self.maximum_door_frequency + 1)), 
-                    'frequency': self.default_frequency, 
-                    'certain': False
-                }
-            
-            current_door = self.door_frequencies[(cell_x, cell_y)][cell_door[2]]
-            
-            # If the door is not certain, update the door frequency
-            if not current_door['certain']:
-                # If the door is a boundary, it is certainly closed
-                if cell_door[3] == constants.BOUNDARY:
-                    current_door['frequency'] = float('inf')
-                    current_door['certain'] = True
-                    continue
-                
-                # Remove possibilities that are not consistent with the current state
-                to_remove = set()
-                for possibility in current_door['possibilities']:
-                    if cell_door[3] == constants.OPEN and self.turn_number % possibility != 0:
-                        to_remove.add(possibility)
-                    if cell_door[3] == constants.CLOSED and self.turn_number % possibility == 0:
-                        to_remove.add(possibility)
-                current_door['possibilities'] -= to_remove
-                
-                # If there are no possibilities left, the door is certainly closed
-                if len(current_door['possibilities']) == 0:
-                    current_door['frequency'] = float('inf')
-                    current_door['certain'] = True
-                # If the door is open and there is only one possibility left, the door is certainly that frequency
-                elif cell_door[3] == constants.OPEN and len(current_door['possibilities']) == 1:
-                    current_door['frequency'] = list(current_door['possibilities'])[0]
-                    current_door['certain'] = True
-                else:
-                    current_door['frequency'] = sum(current_door['possibilities']) // len(current_door['possibilities'])
+        # Count every door seen on its cell, in grid coordinates
+        doors = np.asarray(maze_state, dtype=np.int64).reshape(-1, 4)
+        cell_xs = doors[:, 0] + self.curr_x + self.grid_offset
+        cell_ys = doors[:, 1] + self.curr_y + self.grid_offset
+        np.add.at(self.times_discovered, (cell_xs, cell_ys), 1)
+
+        # Rank the new cells in the order they appear in the percept
+        new = self.discovery_order[cell_xs, cell_ys] < 0
+        if new.any():
+            cells = np.stack([cell_xs[new], cell_ys[new]], axis=1)
+            _, first = np.unique(cells, axis=0, return_index=True)
+            first = np.sort(first)
+            self.discovery_order[cells[first, 0], cells[first, 1]] = self.num_discovered + np.arange(len(first))
+            self.num_discovered += len(first)
+
+        # Remove the frequencies that are not consistent with the current state, for every door at once
+        xs, ys, door_types = self.frequency_candidates.update(maze_state, self.turn_number,
+                                                              self.curr_x + self.grid_offset,
+                                                              self.curr_y + self.grid_offset)
+        self.seen_cells[xs, ys] = True
+
+        # A door without possibilities left (or a boundary) is certainly closed, otherwise use the mean
+        mean_frequency = self.frequency_candidates.mean_frequency((xs, ys, door_types))
+        self.door_frequencies[xs, ys, door_types] = np.where(np.isinf(mean_frequency), 0, np.floor(mean_frequency))
+        self.update_periods(xs, ys)
+
+    def update_periods(self, xs, ys):
+        """
+        Recomputes the crossing period of every edge touching the given cells.
+
+        Inputs:
+            xs (np.ndarray): Grid x of the cells whose doors or seen state changed.
+            ys (np.ndarray): Grid y of the cells whose doors or seen state changed.
+
+        Outputs:
+            None (modifies class attributes: self.planner.periods, self.periods_version).
+        """
+        width, height = self.frequency_candidates.shape
+        # The cells and their neighbours, an edge being stored on both of its sides
+        xs = (xs[:, None] + np.append(DX, 0)).ravel()
+        ys = (ys[:, None] + np.append(DY, 0)).ravel()
+        inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+        xs, ys = np.divmod(np.unique(xs[inside] * height + ys[inside]), height)
+
+        neighbor_xs = xs[:, None] + DX
+        neighbor_ys = ys[:, None] + DY
+        usable = (neighbor_xs >= 0) & (neighbor_xs < width) & (neighbor_ys >= 0) & (neighbor_ys < height)
+        neighbor_xs, neighbor_ys = np.where(usable, neighbor_xs, 0), np.where(usable, neighbor_ys, 0)
+        usable &= self.seen_cells[xs, ys][:, None] & self.seen_cells[neighbor_xs, neighbor_ys]
+
+        facing_frequencies = self.door_frequencies[neighbor_xs, neighbor_ys, FACING]
+        periods = np.where(usable, np.lcm(self.door_frequencies[xs, ys], facing_frequencies), 0)
+        if (periods != self.planner.periods[xs, ys]).any():
+            self.planner.periods[xs, ys] = periods
+            self.periods_version += 1
+
+    def get_door_frequency(self, cell, door_type):
+        """
+        Returns the estimated frequency of a door.
+
+        Inputs:
+            cell (tuple): The coordinates of the cell (x, y).
+            door_type (int): The door of the cell.
+
+        Outputs:
+            int or float: The estimated frequency, or infinity if the door never opens.
+        """
+        frequency = int(self.door_frequencies[cell[0] + self.grid_offset, cell[1] + self.grid_offset, door_type])
+        return frequency if frequency > 0 else float('inf')
 
     def a_star_search(self, start, target):
         """
-        Performs A* search to find the optimal path from the start position to the target position.
+        Performs A* search to find the path reaching the target position the earliest from the start position.
+
+        The search is time-expanded, a state being a cell and the turn it is reached on. Crossing an edge of
+        period p from turn t arrives on the next multiple of p, (t // p + 1) * p, so the waits come from the
+        period table in closed form. Waiting is always allowed, hence a cell reached earlier dominates every
+        later state of the same cell: each cell is expanded once, at its earliest arrival, with the Manhattan
+        distance as heuristic.
+
+        When the drone is on the previous path at the turn that search expected and no period changed since,
+        the rest of that path is still the earliest one and the previous search is reused instead.
 
         Inputs:
             start (tuple): The starting coordinates of the search (x, y).
@@ -148,85 +214,71 @@ class Player:
         Outputs:
             list: A list representing the path from start to target, or None if no path is found.
         """
-        # Open set represented as a priority queue with (f_score, node)
-        open_set = []
-        heapq.heappush(open_set, (0, start, self.turn_number))
-
-        # Maps nodes to their parent node
-        came_from = {} # (x, y) -> (x, y)
+        grid_start = (start[0] + self.grid_offset, start[1] + self.grid_offset)
+        grid_target = (target[0] + self.grid_offset, target[1] + self.grid_offset)
 
-        # Cost from start to a node
-        g_score = {start: 0} # (x, y) -> int
-
-        vis = set()
-        while open_set:
-            # Get the node in open_set with the lowest f_score
-            current_f_score, current, current_turn = heapq.heappop(open_set)
-            vis.add(current)
-            
-            # Check if we have reached the goal
-            if current == target:
-                return self.reconstruct_path(came_from, current)
-            
-            # Explore neighbors of current node
-            moves = [
-                (-1, 0, 0, 2), # Left (x - 1, y, left, right)
-                (0, -1, 1, 3), # Up (x, y - 1, up, down)
-                (1, 0, 2, 0), # Right (x + 1, y, right, left)
-                (0, 1, 3, 1) # Down (x, y + 1, down, up)
-            ]
-            
-            for move in moves:
-                neighbor = (current[0] + move[0], current[1] + move[1])
-                
-                # Check for boundaries
-                if neighbor not in self.door_frequencies:
-                    continue
-                
-                lcm = self.calculate_LCM(self.door_frequencies[current][move[2]]['frequency'], self.door_frequencies[neighbor][move[3]]['frequency'])
-                tentative_g_score = g_score[current] + lcm - current_turn % lcm
+        if self.last_search is not None:
+            result, last_target, periods_version = self.last_search
+            if (last_target == target and periods_version == self.periods_version
+                    and result.arrival_turn(grid_start) == self.turn_number):
+                path = self.reconstruct_path(result, grid_target)
+                if path is not None and start in path:
+                    return path[path.index(start):]
 
-                if (neighbor not in g_score or tentative_g_score < g_score[neighbor]) and neighbor not in vis:
-                    came_from[neighbor] = current
-                    g_score[neighbor] = tentative_g_score
-                    f_score = tentative_g_score + self.heuristic(neighbor, target)
-                    heapq.heappush(open_set, (f_score, neighbor, current_turn + 1))
-
-        # No path found
-        return None
+        result = self.planner.search(grid_start, self.turn_number, [grid_target])
+        self.last_search = (result, target, self.periods_version)
+        return self.reconstruct_path(result, grid_target)
     
-    def reconstruct_path(self, came_from, current):
+    def mark_unreachable(self):
         """
-        Reconstructs the path from the start to the target node.
+        Records the cells the last search couldn't reach, after it failed to reach its target.
 
-        Inputs:
-            came_from (dict): A mapping of each node to its parent node (i.e., where it came from).
-            current (tuple): The current node (usually the target) to start backtracking from.
+        A search which doesn't reach its target settles every cell reachable with the current periods, so
+        the cells it didn't reach stay unreachable until some period changes.
+        """
+        result = self.last_search[0]
+        self.unreachable = ~np.isfinite(result.arrival)
+        self.unreachable_version = self.periods_version
+
+    def plan_exploration(self):
+        """
+        Plans the path to the current destination, switching to a reachable destination if it can't be reached.
 
         Outputs:
-            path (list): A list representing the path from start to target, in order.
+            list: The path to the destination, or None if no destination can be reached.
         """
-        path = [current]
-        while current in came_from:
-            current = came_from[current]
-            path.append(current)
-        path.reverse()
+        if self.current_destination is None:
+            return None
+        path = self.a_star_search((self.curr_x, self.curr_y), self.current_destination)
+        if path is None:
+            self.mark_unreachable()
+            self.current_destination = self.determine_destination()
+            if self.current_destination is None:
+                return None
+            path = self.a_star_search((self.curr_x, self.curr_y), self.current_destination)
         return path
-    
-    def calculate_LCM(self, freq_1, freq_2):
+
+    def reconstruct_path(self, result, grid_target):
         """
-        Calculates the least common multiple (LCM) of two frequencies, handling infinity as a special case.
+        Reconstructs the path from the start to the target node.
 
         Inputs:
-            freq_1 (int or float): The frequency of the first door.
-            freq_2 (int or float): The frequency of the second door.
+            result (SearchResult): The search the path is read from.
+            grid_target (tuple): The target in grid coordinates.
 
         Outputs:
-            int: The LCM of the two frequencies, or infinity if either frequency is infinite.
+            path (list): A list representing the path from start to target, in order, or None if the target
+                wasn't reached.
         """
-        if freq_1 == float('inf') or freq_2 == float('inf'):
-            return float('inf')
-        return abs(freq_1 * freq_2) // math.gcd(freq_1, freq_2)
+        doors = result.moves(grid_target)
+        if doors is None:
+            return None
+        x, y = result.source[0] - self.grid_offset, result.source[1] - self.grid_offset
+        path = [(x, y)]
+        for door_type in doors:
+            x, y = x + int(DX[door_type]), y + int(DY[door_type])
+            path.append((x, y))
+        return path
     
     def heuristic(self, start, end):
         """
@@ -294,15 +346,17 @@ class Player:
         if self.is_end_visible:
             if (self.turn_number - self.turn_path_changed) % 5 == 0:
                 path = self.a_star_search((self.curr_x, self.curr_y), (self.target_x, self.target_y))
-                self.path_to_end = self.coordinates_to_moves(path)
+                self.path_to_end = self.coordinates_to_moves(path) if path is not None else deque()
         else:
             if not self.path_to_end:
                 self.current_destination = self.determine_destination()
                 self.turn_path_changed = self.turn_number
             if (self.turn_number - self.turn_path_changed) % 5 == 0:
-                path = self.a_star_search((self.curr_x, self.curr_y), self.current_destination)
-                self.path_to_end = self.coordinates_to_moves(path)
-        
+                path = self.plan_exploration()
+                self.path_to_end = self.coordinates_to_moves(path) if path is not None else deque()
+
+        if not self.path_to_end:
+            return constants.WAIT
         attempted_direction = self.path_to_end[0]
             
         direction = [0, 0, 0, 0]
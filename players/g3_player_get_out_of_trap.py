@@ -162,33 +162,27 @@ class Player:
         return self.move_inside_out(current_percept)
 
     def update_door_timers(self, current_percept):
-        door_seen = np.full((201, 201, 4), False, dtype=bool)
-        for cell in current_percept.maze_state:
-            x, y, direction, state = cell
+        doors = np.asarray(current_percept.maze_state, dtype=int).reshape(-1, 4)
+        state = doors[:, 3]
 
-            # positions relative to start position
-            abs_x = x - current_percept.start_x
-            abs_y = y - current_percept.start_y
-            door_seen[abs_x, abs_y, direction] = True
+        # positions relative to start position
+        abs_x = doors[:, 0] - current_percept.start_x
+        abs_y = doors[:, 1] - current_percept.start_y
+        seen = (abs_x, abs_y, doors[:, 2])
 
-            # if we see the door on this turn, then increment the timer if the door is closed
-            if state == constants.CLOSED:
-                self.door_timers[abs_x, abs_y, direction] += 1
+        # for all doors that were not present in current_percept.maze_state, reset the timer
+        timers = self.door_timers[seen]
+        self.door_timers.fill(0)
 
-            # if the door is closed for more than the maximum frequency, then mark it as always closed
-            if self.door_timers[abs_x, abs_y, direction] >= self.maximum_door_frequency:
-                self.always_closed[abs_x, abs_y, direction] = True
+        # if we see the door on this turn, then increment the timer if the door is closed
+        timers += state == constants.CLOSED
 
-            #if the door is open, then reset the timer
-            if state == constants.OPEN:
-                self.door_timers[abs_x, abs_y, direction] = 0
-
-        # for all doors that we were not present in current_percept.maze_state, set the timer as -1
-        for i in range(201):
-            for j in range(201):
-                for k in range(4):
-                    if not door_seen[i, j, k]:
-                        self.door_timers[i, j, k] = 0
+        # if the door is closed for more than the maximum frequency, then mark it as always closed
+        self.always_closed[seen] |= timers >= self.maximum_door_frequency
+
+        #if the door is open, then reset the timer
+        timers[state == constants.OPEN] = 0
+        self.door_timers[seen] = timers
 
 
     def traverse_djikstra(self, current_percept) -> int:
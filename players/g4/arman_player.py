@@ -10,7 +10,7 @@ from timing_maze_state import TimingMazeState
 # from qtable import QTable
 # from q_policy import QPolicy
 # from multi_armed_bandit.ucb import UpperConfidenceBounds
-from sympy import divisors
+from frequency_tables import get_frequency_tables
 from collections import defaultdict
 
 class Player:
@@ -47,6 +47,7 @@ class Player:
         self.maximum_door_frequency = maximum_door_frequency
         self.radius = radius
         self.turn = 0
+        self.frequency_tables = get_frequency_tables(maximum_door_frequency, precomp_dir)
         self.frequencies_per_cell = defaultdict(
             lambda: set(range(maximum_door_frequency + 1))
         )
@@ -97,7 +98,7 @@ class Player:
             self.recently_seen_positions_list.pop()    
             
         self.turn += 1
-        factors = set(divisors(self.turn))
+        factors = set(self.frequency_tables.open_frequencies(self.turn))
         for dX, dY, door, state in current_percept.maze_state:
             #print(curr_x + dX, curr_y + dY, door, state)
             if state == constants.CLOSED:
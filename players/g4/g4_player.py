@@ -17,7 +17,7 @@ from players.g4.mcts import MCTS
 # from qtable import QTable
 # from q_policy import QPolicy
 # from multi_armed_bandit.ucb import UpperConfidenceBounds
-from sympy import divisors
+from frequency_tables import get_frequency_tables
 
 
 # class MCTSNode:
@@ -250,8 +250,10 @@ class Player:
         )
         self.lcm_cache = {}
         self.turn = 0
+        self.frequency_tables = get_frequency_tables(maximum_door_frequency, precomp_dir)
         self.start = (0,0)
         self.goal = None
+        self.mcts = MCTS(rng=rng)
 
     def set_goal(self, maze_state, curr_x, curr_y):
         ### improve
@@ -267,7 +269,7 @@ class Player:
     def update_door_frequencies(self, curr_x, curr_y, curr_maze_state):
         maze_state = {}
         coords = (float('-inf'), float('-inf'))
-        factors = set(divisors(self.turn))
+        factors = set(self.frequency_tables.open_frequencies(self.turn))
         for dX, dY, door, state in curr_maze_state:
             # update frequency dictionary
             if state == constants.CLOSED:
@@ -350,43 +352,18 @@ class Player:
         # else call the set_goal method
 
 
-        # initialize gridworld and MCTS
+        # initialize gridworld and search, the tree of the previous turn is reused
         env = GridWorld((curr_x, curr_y), maze_state, self.goal, current_percept.is_end_visible)
-        actions = [LEFT, UP, RIGHT, DOWN, WAIT]
-        mcts = MCTS(env, actions, self.frequencies_per_cell, self.turn, self.maximum_door_frequency, maze_state)
-        best_node = mcts.mcts((curr_x, curr_y), timeout=0.03)
-        best_node_actions = list(best_node.parent.children.keys())
+        self.mcts.update(env)
+        best_node_actions = self.mcts.mcts(timeout=0.03)
         print(best_node_actions)
-        
+
         # make sure the action is valid
-        cur_cell = sorted(maze_state[(curr_x, curr_y)], key = lambda x : x[2])
+        best_action = WAIT
         for action in best_node_actions:
-            if action == LEFT:
-                adj_cell = sorted(maze_state[(curr_x - 1, curr_y)], key = lambda x : x[2])
-                adj_action = RIGHT
-                if cur_cell[action][-1] == constants.OPEN and adj_cell[adj_action][-1] == constants.OPEN:
-                    best_action = action
-                    break
-            elif action == UP:
-                adj_cell = sorted(maze_state[(curr_x, curr_y - 1)], key = lambda x : x[2])
-                adj_action = DOWN
-                if cur_cell[action][-1] == constants.OPEN and adj_cell[adj_action][-1] == constants.OPEN:
-                    best_action = action
-                    break
-            elif action == RIGHT:
-                adj_cell = sorted(maze_state[(curr_x + 1, curr_y)], key = lambda x : x[2])
-                adj_action = LEFT
-                if cur_cell[action][-1] == constants.OPEN and adj_cell[adj_action][-1] == constants.OPEN:
-                    best_action = action
-                    break
-            elif action == DOWN:
-                adj_cell = sorted(maze_state[(curr_x, curr_y + 1)], key = lambda x : x[2])
-                adj_action = UP
-                if cur_cell[action][-1] == constants.OPEN and adj_cell[adj_action][-1] == constants.OPEN:
-                    best_action = action
-                    break
-            elif action == WAIT:
+            if env.is_valid_move((curr_x, curr_y), action):
                 best_action = action
                 break
 
+        self.mcts.advance(best_action)
         return best_action
@@ -1,52 +1,118 @@
+import numpy as np
+
 import constants
 from constants import WAIT, LEFT, UP, RIGHT, DOWN
+from timing_maze_planner import grid_neighbors
+
+# Positions relative to the start stay within +-(map_dim - 1)
+OFFSET = constants.map_dim - 1
+GRID_DIM = 2 * constants.map_dim - 1
+
+# Action index in the transition table, WAIT last
+ACTIONS = [LEFT, UP, RIGHT, DOWN, WAIT]
+N_ACTIONS = len(ACTIONS)
+
+# door type on the other side of each door type
+FACING = np.array([RIGHT, DOWN, LEFT, UP])
+
+# Cell behind each door of every cell, -1 outside the grid, and the cell ids, the same for every GridWorld
+NEIGHBORS = np.array(grid_neighbors((GRID_DIM, GRID_DIM))).reshape(GRID_DIM, GRID_DIM, 4)
+CELLS = np.arange(GRID_DIM * GRID_DIM).reshape(GRID_DIM, GRID_DIM)
+
+
+def action_index(action):
+    return N_ACTIONS - 1 if action == WAIT else action
+
 
 class GridWorld:
+    """Belief grid simulator of the maze seen in the current percept
+
+        Cells are identified by (x + OFFSET) * GRID_DIM + (y + OFFSET). A move succeeds if both doors of the
+        edge were open in the percept, a move through a door which wasn't seen fails like a closed one.
+        `transitions[cell * N_ACTIONS + action_index]` is the cell reached by each action, so stepping any
+        number of simulated drones is one fancy indexing operation.
+    """
+
     def __init__(self, state, maze_state, goal, is_end_visible):
+        """
+            Args:
+                state (Tuple[int, int]): drone position relative to the start
+                maze_state (Dict[Tuple[int, int], List[Tuple[int, int, int, int]]]): percept doors keyed by the
+                    cell they belong to, relative to the start
+                goal (Optional[Tuple[int, int]]): target position, None if unknown
+                is_end_visible (bool): whether the goal is the end of the maze
+        """
         self.maze_state = maze_state
         self.state = state
         self.goal = goal
         self.is_end_visible = is_end_visible
 
+        door_open = np.zeros((GRID_DIM, GRID_DIM, 4), dtype=bool)
+        xs, ys, door_types, states = [], [], [], []
+        for (x, y), doors in maze_state.items():
+            for _, _, door_type, door_state in doors:
+                xs.append(x)
+                ys.append(y)
+                door_types.append(door_type)
+                states.append(door_state)
+        if xs:
+            xs = np.asarray(xs) + OFFSET
+            ys = np.asarray(ys) + OFFSET
+            door_open[xs, ys, door_types] = np.asarray(states) == constants.OPEN
+
+        neighbors = NEIGHBORS
+        facing_open = np.zeros_like(door_open)
+        for door_type in (LEFT, UP, RIGHT, DOWN):
+            inside = neighbors[:, :, door_type] >= 0
+            facing_open[:, :, door_type][inside] = door_open.reshape(-1, 4)[
+                neighbors[:, :, door_type][inside], FACING[door_type]
+            ]
+
+        cells = CELLS
+        transitions = np.empty((GRID_DIM, GRID_DIM, N_ACTIONS), dtype=np.int64)
+        transitions[:, :, :4] = np.where(door_open & facing_open, neighbors, cells[:, :, None])
+        transitions[:, :, 4] = cells
+        self.transitions = transitions.ravel()
+
+        # Manhattan distance of every cell to the goal, zero everywhere if there is no goal
+        if goal is None:
+            self.goal_id = -1
+            self.distance = np.zeros(GRID_DIM * GRID_DIM, dtype=np.int64)
+        else:
+            self.goal_id = self.cell_id(goal)
+            gx, gy = goal[0] + OFFSET, goal[1] + OFFSET
+            grid_x, grid_y = np.divmod(np.arange(GRID_DIM * GRID_DIM), GRID_DIM)
+            self.distance = np.abs(grid_x - gx) + np.abs(grid_y - gy)
+
+    def cell_id(self, state):
+        return (state[0] + OFFSET) * GRID_DIM + state[1] + OFFSET
+
+    def cell_xy(self, cell_id):
+        x, y = divmod(int(cell_id), GRID_DIM)
+        return (x - OFFSET, y - OFFSET)
+
     def is_goal(self, state):
         return state == self.goal
-    
-    # def update_goal(self, goal):
-    #     self.goal = goal
-
-    # def update_params(self, timingmazestate, maze_state):
-    #     self.maze_state = maze_state
-    #     self.is_end_visible = timingmazestate.is_end_visible
-    #     if timingmazestate.is_end_visible:
-    #         self.goal = (timingmazestate.end_x, timingmazestate.end_y)
-    
+
+    def next_cell(self, cell_id, action):
+        return self.transitions[cell_id * N_ACTIONS + action_index(action)]
+
+    def next_cells(self, cell_ids, action_indices):
+        """Batched step, `action_indices` index ACTIONS"""
+        return self.transitions[cell_ids * N_ACTIONS + action_indices]
+
+    def is_valid_move(self, state, action):
+        cell_id = self.cell_id(state)
+        return action == WAIT or self.next_cell(cell_id, action) != cell_id
+
     def get_next_state(self, state, action):
         # get next state, but check if the move is actually possible
-        x, y = state
-        cell_states = sorted(self.maze_state[(x,y)], key=lambda x : x[2])
-        if action == LEFT and cell_states[action][-1] == constants.OPEN:
-            adj_cell = sorted(self.maze_state[(x-1,y)], key=lambda x : x[2])
-            if adj_cell[RIGHT][-1] == constants.OPEN:
-                x -= 1
-        elif action == UP and cell_states[action][-1] == constants.OPEN:
-            adj_cell = sorted(self.maze_state[(x,y+1)], key=lambda x : x[2])
-            if adj_cell[DOWN][-1] == constants.OPEN:
-                y -= 1
-        elif action == RIGHT and cell_states[action][-1] == constants.OPEN:
-            adj_cell = sorted(self.maze_state[(x+1,y)], key=lambda x : x[2])
-            if adj_cell[LEFT][-1] == constants.OPEN:
-                x += 1
-        elif action == DOWN and cell_states[action][-1] == constants.OPEN:
-            adj_cell = sorted(self.maze_state[(x,y-1)], key=lambda x : x[2])
-            if adj_cell[UP][-1] == constants.OPEN:
-                y += 1
-        
-        return (x, y)
-    
+        return self.cell_xy(self.next_cell(self.cell_id(state), action))
+
     def step(self, action):
         next_state = self.get_next_state(self.state, action)
         self.state = next_state
-        
+
         if self.is_goal(self.state) and self.is_end_visible:
             return next_state, 100, True
         elif self.is_goal(self.state) and not self.is_end_visible:
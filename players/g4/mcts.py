@@ -1,275 +1,208 @@
 import numpy as np
-import random
-from collections import defaultdict
 import time
-import math
-import constants
 
-# Node class for MCTS
-class Node:
-    def __init__(self, state, parent=None):
-        self.state = state
-        self.parent = parent
-        self.children = {}
-        self.visits = 0
-        self.value = 0
-
-    def is_fully_expanded(self, actions):
-        return len(self.children) == len(actions)
-    
-    def heuristic(self, state, target):
-        # manhattan distance
-        return abs(state[0] - target[0]) + abs(state[1] - target[1])
+from players.g4.gridworld import ACTIONS, N_ACTIONS, action_index
+
+
+# Tree of the MCTS search stored in flat arrays, node 0 is always the root
+class SearchTree:
+    def __init__(self, root_state, capacity=1024):
+        self.state = np.empty(capacity, dtype=np.int64)
+        self.parent = np.empty(capacity, dtype=np.int64)
+        self.action = np.empty(capacity, dtype=np.int64)
+        self.children = np.empty((capacity, N_ACTIONS), dtype=np.int64)
+        self.visits = np.empty(capacity, dtype=np.int64)
+        self.value = np.empty(capacity, dtype=float)
+        self.size = 0
+        self.add_node(root_state, -1, -1)
+
+    def add_node(self, state, parent, action):
+        if self.size == len(self.state):
+            self.grow()
+        node = self.size
+        self.size += 1
+        self.state[node] = state
+        self.parent[node] = parent
+        self.action[node] = action
+        self.children[node] = -1
+        self.visits[node] = 0
+        self.value[node] = 0
+        if parent >= 0:
+            self.children[parent, action] = node
+        return node
 
-    def best_child(self, target=None, c_param=1.4):
-        # UCB1 with heuristics
-        choices_weights = [
-            (child.value / child.visits) + c_param * np.sqrt(np.log(self.visits) / child.visits) - self.heuristic(child.state, target)
-            if target is not None else (child.value / child.visits) + c_param * np.sqrt(np.log(self.visits) / child.visits) 
-            for child in self.children.values()
-        ]
-        return list(self.children.values())[np.argmax(choices_weights)]
-    
-    def expand(self, action, next_state):
-        child_node = Node(state=next_state, parent=self)
-        self.children[action] = child_node
-        return child_node
+    def grow(self):
+        capacity = 2 * len(self.state)
+        for name in ("state", "parent", "action", "visits", "value"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[: len(old)] = old
+            setattr(self, name, new)
+        children = np.empty((capacity, N_ACTIONS), dtype=np.int64)
+        children[: len(self.children)] = self.children
+        self.children = children
+
+    def is_fully_expanded(self, node):
+        return self.children[node].min() >= 0
+
+    def reroot(self, node, env):
+        """Keep only the subtree of `node`, renumbered breadth first so that it becomes node 0
+
+            The states are replayed in `env` as the doors seen this turn may differ from the ones the
+            subtree was built with, the statistics are kept as they are.
+        """
+        order = [np.array([node])]
+        frontier = order[0]
+        while len(frontier):
+            frontier = self.children[frontier].ravel()
+            frontier = frontier[frontier >= 0]
+            order.append(frontier)
+        order_levels = order
+        order = np.concatenate(order)
+
+        remap = np.full(self.size, -1, dtype=np.int64)
+        remap[order] = np.arange(len(order))
+
+        self.state[: len(order)] = self.state[order]
+        self.parent[: len(order)] = np.where(self.parent[order] >= 0, remap[self.parent[order]], -1)
+        self.action[: len(order)] = self.action[order]
+        children = self.children[order]
+        self.children[: len(order)] = np.where(children >= 0, remap[children], -1)
+        self.visits[: len(order)] = self.visits[order]
+        self.value[: len(order)] = self.value[order]
+        self.size = len(order)
+        self.parent[0] = -1
+        self.action[0] = -1
+
+        # replay one depth at a time, the parents come before their children in breadth first order
+        start = 1
+        for level in order_levels[1:]:
+            nodes = np.arange(start, start + len(level))
+            self.state[nodes] = env.next_cells(self.state[self.parent[nodes]], self.action[nodes])
+            start += len(level)
 
 
 # Monte Carlo Tree Search Class
 class MCTS:
-    def __init__(self, env, actions, frequencies, turn, max_freq, maze_state):
+    def __init__(self, rng=None, batch_size=16, depth=10, c_param=1.4):
+        """
+            Args:
+                rng (np.random.Generator): generator of the rollouts and of the expansion order
+                batch_size (int): random rollouts simulated together from every expanded node
+                depth (int): moves per rollout
+                c_param (float): exploration constant of UCB1
+        """
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.batch_size = batch_size
+        self.depth = depth
+        self.c_param = c_param
+        self.env = None
+        self.tree = None
+        self.played_action = None
+
+    def advance(self, action):
+        """Record the action played, its subtree becomes the root of the next search"""
+        self.played_action = action
+
+    def update(self, env):
+        """Search the maze of `env` from its current state, reusing the subtree of the action played if the
+        drone ended up where the previous search expected"""
         self.env = env
-        self.actions = actions
-        self.frequencies = frequencies
-        self.turn = turn
-        self.max_freq = max_freq
-        self.maze_state = maze_state
+        root_state = env.cell_id(env.state)
+        tree = self.tree
+        if tree is not None and self.played_action is not None:
+            child = tree.children[0, action_index(self.played_action)]
+            if child >= 0 and tree.state[child] == root_state:
+                tree.reroot(child, env)
+            else:
+                tree = None
+        elif tree is not None and tree.state[0] != root_state:
+            tree = None
+
+        self.tree = tree if tree is not None else SearchTree(root_state)
+        self.played_action = None
 
-    def mcts(self, root_state=None, timeout=1):
-        root = Node(state=root_state)
+    def mcts(self, timeout=1):
+        """Run the search for `timeout` seconds
+
+            Returns:
+                List[int]: the actions of the root ranked from the best one
+        """
+        tree = self.tree
         start_time = time.time()
 
         while time.time() - start_time < timeout:
             # 1. Selection
-            node = self.selection(root)
+            node = self.selection(0)
 
             # 2. Expansion
-            if not node.is_fully_expanded(self.actions):
+            if not tree.is_fully_expanded(node):
                 action = self.random_untried_action(node)
-                next_state = self.env.get_next_state(node.state, action)
-                node = node.expand(action, next_state)
+                next_state = self.env.transitions[tree.state[node] * N_ACTIONS + action]
+                node = tree.add_node(next_state, node, action)
 
             # 3. Simulation
-            reward = self.simulate(node.state)
+            reward = self.simulate(tree.state[node])
 
             # 4. Backpropagation
-            self.backpropagate(node, reward)
+            self.backpropagate(node, reward, self.batch_size)
+
+        return self.rank_actions(0)
 
-        return root.best_child(target=self.env.goal, c_param=1.4)
+    def ucb(self, node):
+        tree = self.tree
+        children = tree.children[node]
+        visits = tree.visits[children]
+        return tree.value[children] / visits + self.c_param * np.sqrt(np.log(tree.visits[node]) / visits)
 
     # navigate tree selecting best children nodes until node with unexplored children reached
     def selection(self, node):
-        while node.is_fully_expanded(self.actions):
-            node = node.best_child()
+        while self.tree.is_fully_expanded(node):
+            node = self.tree.children[node, np.argmax(self.ucb(node))]
         return node
 
     # randomly select an action which has not yet been explored
     def random_untried_action(self, node):
-        tried_actions = set(node.children.keys())
-        untried_actions = list(set(self.actions) - tried_actions)
-        return random.choice(untried_actions)
-        
-    # def angular_dist(self, diff):
-    #     return min(abs(diff), 360 - abs(diff))
-    
-    def compare_manhattan_dist(self, cur, adj):
-        # compute manhattan distances
-        cur_dist = abs(cur[0] - self.env.goal[0]) + abs(cur[1] - self.env.goal[1])
-        adj_dist = abs(adj[0] - self.env.goal[0]) + abs(adj[1] - self.env.goal[1])
-
-        if adj_dist < cur_dist:
-            return 1
-        elif adj_dist == cur_dist:
-            return 0
-        else:
-            return -1
-    
-    def compute_score(self, cur, adj, action, turn=None, wait=False):
-        if turn == None:
-            turn = self.turn
-
-        cur_state = sorted(self.maze_state[cur], key=lambda x : x[2])
-
-        # discourage going through boundaries
-        if cur_state[action][-1] == constants.BOUNDARY:
-            return -10
-        
-        try:
-            adj_state = sorted(self.maze_state[adj[0]], key=lambda x : x[2])
-        except:
-            return -1
-
-        if not wait:
-            # Reward if both doors are open and punish if not
-            if cur_state[action][-1] != constants.OPEN or adj_state[adj[1]][-1] != constants.OPEN:
-                return -10
-            
-            if cur_state[action][-1] == constants.OPEN and adj_state[adj[1]][-1] == constants.OPEN:
-                return 1
-        # else:
-        #     open_score = 0.5
-        else:
-            # give scores based on how many doors are likely to open at given turn
-            cur_freq = self.frequencies[(*cur, action)]
-            adj_freq = self.frequencies[(*adj[0], adj[1])]
-            cum_freq = cur_freq & adj_freq
-
-            # base case
-            if len(cum_freq) == self.max_freq:
-                return 0
-            
-            if len(cum_freq) == 0:
-                return -1
-            
-            mod_count = 0
-            for freq in cum_freq:
-                if freq == 0:
-                    continue
-                if turn % freq == 0:
-                    mod_count += 1
-            
-            score = mod_count / len(cum_freq)
-
-            print(score)
-            return score
-    
-    def choose_action(self, state, turn=None):
-        if turn is None:
-            turn = self.turn 
-
-        # xdist = self.env.goal[0] - state[0]
-        # ydist = -(self.env.goal[1] - state[1])
-        # if xdist != 0:
-        #     theta = math.degrees(math.atan(ydist / xdist))
-        # else:
-        #     theta = 90 * (ydist/abs(ydist))
-
-        # if (xdist < 0 and ydist >= 0) or (xdist < 0 and ydist < 0):
-        #     theta += 180
-        # elif xdist > 0 and ydist < 0:
-        #     theta += 360
-
-        weights = np.zeros(5)
-
-        wait_score = 0
-        for action in self.actions[:-1]:
-            
-            # give scores for each action
-            if action == constants.LEFT:
-                # ang_dist_score = 1 - self.angular_dist(180 - theta) / 180
-                # weights[0] = ang_dist_score
-                adj = ((state[0] - 1, state[1]), 2)
-                manhattan_score = self.compare_manhattan_dist(state, adj[0])
-                weights[0] = manhattan_score
-                weights[0] += self.compute_score(state, adj, action, turn, False)
-
-                # give score based on chances if wait a turn then take specified action
-                wait_score_left = self.compute_score(state, adj, action, self.turn + 1, True) + manhattan_score
-                wait_score = wait_score_left if wait_score_left > wait_score else wait_score
-
-            elif action == constants.UP:
-                # ang_dist_score = 1 - self.angular_dist(180 - theta) / 180
-                # weights[1] = ang_dist_score
-                adj = ((state[0], state[1] - 1), 3)
-                manhattan_score = self.compare_manhattan_dist(state, adj[0])
-                weights[1] = manhattan_score
-                weights[1] += self.compute_score(state, adj, action, turn, False)
-
-                wait_score_up = self.compute_score(state, adj, action, self.turn + 1, True) + manhattan_score
-                wait_score = wait_score_up if wait_score_up > wait_score else wait_score
-
-            elif action == constants.RIGHT:
-                # ang_dist_score = 1 - self.angular_dist(180 - theta) / 180
-                # weights[2] = ang_dist_score
-                adj = ((state[0] + 1, state[1]), 0)
-                manhattan_score = self.compare_manhattan_dist(state, adj[0])
-                weights[2] = manhattan_score
-                weights[2] += self.compute_score(state, adj, action, turn, False)
-
-                wait_score_right = self.compute_score(state, adj, action, self.turn + 1, True) + manhattan_score
-                wait_score = wait_score_right if wait_score_right > wait_score else wait_score
-
-            elif action == constants.DOWN:
-                # ang_dist_score = 1 - self.angular_dist(180 - theta) / 180
-                # weights[3] = ang_dist_score
-                adj = ((state[0], state[1] + 1), 1)
-                manhattan_score = self.compare_manhattan_dist(state, adj[0])
-                weights[3] = manhattan_score
-                weights[3] += self.compute_score(state, adj, action, turn, False)
-
-                wait_score_down = self.compute_score(state, adj, action, self.turn + 1, True) + manhattan_score
-                wait_score = wait_score_down if wait_score_down > wait_score else wait_score
-
-            weights[-1] = wait_score 
-        
-        # if all weights are 0, then wait
-        if max(weights) == 0:
-            best_action = -1
-        else:
-            # check if best action is valid; if not, take next best action
-            best_action = np.argmax(weights) if np.argmax(weights) != 4 else -1
-            for i in range(len(weights)):
-                if not self.is_valid_move(state, best_action):
-                    weights[best_action] = float('-inf')
-
-            best_action = np.argmax(weights) if np.argmax(weights) != 4 else -1
-
-        return best_action
+        untried_actions = np.flatnonzero(self.tree.children[node] < 0)
+        return untried_actions[self.rng.integers(len(untried_actions))]
+
+    def rank_actions(self, node):
+        # UCB1 with heuristics, the actions which were never tried come last
+        tree = self.tree
+        children = tree.children[node]
+        expanded = children >= 0
+        scores = np.full(N_ACTIONS, -np.inf)
+        if expanded.any():
+            visits = tree.visits[children[expanded]]
+            scores[expanded] = (
+                tree.value[children[expanded]] / visits
+                + self.c_param * np.sqrt(np.log(max(tree.visits[node], 1)) / visits)
+                - self.env.distance[tree.state[children[expanded]]]
+            )
+        return [ACTIONS[i] for i in np.argsort(-scores, kind="stable")]
 
     def simulate(self, state):
-        current_state = state
-        prev_state = None
-        cumulative_reward = 0.0
-        # while not self.env.is_goal(current_state):
-        for i in range(10):
-            # very naive way of setting up a reward system
-            if self.env.is_goal(current_state) and self.env.is_end_visible:
-                cumulative_reward += 100
-            elif self.env.is_goal(current_state) and not self.env.is_end_visible:
-                cumulative_reward += 1
-            elif prev_state is not None:
-                # give reward if closer to target
-                if self.compare_manhattan_dist(current_state, prev_state) == 1:
-                    cumulative_reward += 10
-            else:
-                cumulative_reward -= 0.01
-            
-            action = self.choose_action(current_state, self.turn + i)
-            prev_state = current_state
-            current_state = self.env.get_next_state(current_state, action)
-        return cumulative_reward
-    
-    def is_valid_move(self, state, action):
-        curr_cell = sorted(self.maze_state[state], key = lambda x : x[2])
-
-        if action == constants.LEFT:
-            adj_cell = sorted(self.maze_state[state[0] - 1, state[1]], key = lambda x : x[2])
-            return curr_cell[action][-1] == constants.OPEN and adj_cell[2][-1] == constants.OPEN
-        elif action == constants.UP:
-            adj_cell = sorted(self.maze_state[state[0], state[1] - 1], key = lambda x : x[2])
-            return curr_cell[action][-1] == constants.OPEN and adj_cell[3][-1] == constants.OPEN
-        elif action == constants.RIGHT:
-            adj_cell = sorted(self.maze_state[state[0] + 1, state[1]], key = lambda x : x[2])
-            return curr_cell[action][-1] == constants.OPEN and adj_cell[0][-1] == constants.OPEN
-        elif action == constants.DOWN:
-            adj_cell = sorted(self.maze_state[state[0], state[1] + 1], key = lambda x : x[2])
-            return curr_cell[action][-1] == constants.OPEN and adj_cell[1][-1] == constants.OPEN
-        
-        return False
-
-    def backpropagate(self, node, reward):
-        while node is not None:
-            node.visits += 1
-            node.value += reward
-            node = node.parent
\ No newline at end of file
+        """Total reward of `batch_size` random rollouts of `depth` moves starting from `state`"""
+        env = self.env
+        goal_reward = 100 if env.is_end_visible else 1
+        positions = np.full(self.batch_size, state, dtype=np.int64)
+        actions = self.rng.integers(0, N_ACTIONS, size=(self.depth, self.batch_size))
+
+        # very naive way of setting up a reward system
+        at_goal = positions == env.goal_id
+        cumulative_reward = np.where(at_goal, goal_reward, -0.01)
+        for i in range(self.depth - 1):
+            previous = positions
+            positions = env.next_cells(positions, actions[i])
+            at_goal = positions == env.goal_id
+            # give reward if closer to target
+            closer = env.distance[positions] < env.distance[previous]
+            cumulative_reward += np.where(at_goal, goal_reward, np.where(closer, 10, 0))
+        return cumulative_reward.sum()
+
+    def backpropagate(self, node, reward, visits):
+        tree = self.tree
+        while node >= 0:
+            tree.visits[node] += visits
+            tree.value[node] += reward
+            node = tree.parent[node]
@@ -1,4 +1,3 @@
-from collections import defaultdict
 import heapq
 import random
 import time
@@ -14,10 +13,18 @@ from timing_maze_state import TimingMazeState
 from players.g4.gridworld import GridWorld
 from players.g4.mcts import MCTS
 
-from sympy import divisors
+from frequency_tables import get_frequency_tables
+from frequency_inference import FrequencyCandidates
+from door_wait import get_wait_table
+from timing_maze_planner import IncrementalPlanner
 
 from collections import deque
 
+# Grid offset of each door type's neighbour, and the door facing back from it
+DX = np.array([-1, 0, 1, 0])
+DY = np.array([0, -1, 0, 1])
+OPPOSITE_DOORS = np.array([constants.RIGHT, constants.DOWN, constants.LEFT, constants.UP])
+
 
 class Player:
     def __init__(
@@ -41,165 +48,125 @@ class Player:
         self.logger = logger
         self.maximum_door_frequency = maximum_door_frequency
         self.radius = radius
-        self.frequencies_per_cell = defaultdict(
-            lambda: set(range(maximum_door_frequency + 1))
-        )
-        self.lcm_cache = {}
+        self.wait_table = get_wait_table()
         self.curr_turn = 0
+        self.frequency_tables = get_frequency_tables(maximum_door_frequency, precomp_dir)
         self.start = (0, 0)
         self.goal = None
-        self.maze_graph = defaultdict(dict)
+
+        # Positions are relative to the start, so they lie within map_dim of it, and a position (x, y) is
+        # stored at [x + offset, y + offset] of every per-cell array
+        self.offset = constants.map_dim
+        self.frequencies = FrequencyCandidates(maximum_door_frequency, tables=self.frequency_tables)
+        self.shape = self.frequencies.shape
+
+        # Expected cost of crossing each door of each cell, inf if there is no edge through it, and the
+        # cells the graph knows of: the ones seen and their neighbours
+        self.edge_costs = np.full(self.shape + (4,), np.inf)
+        self.known_cells = np.zeros(self.shape, dtype=bool)
+
+        # D* Lite search to the goal once it is seen, repaired every turn with the edges of the percept
+        self.planner = IncrementalPlanner(self.shape)
 
         # Used for the exploration values strategy
         self.temp_goal = None
-        self.exploration_values = {}
+        self.exploration_values = np.zeros(self.shape)
+        self.explored_cells = np.zeros(self.shape, dtype=bool)
 
         # Calculate the grid cell size based on the radius
         self.cell_size = max(int(self.radius / math.sqrt(2)), 1)
 
-        # Initialize variables for the exploration strategy
-        self.visited_grid_cells = set()
-        self.frontier_positions = set()
-        self.frontier_set = set()
-
-    def update_door_frequencies(self, curr_x, curr_y, current_percept):
-        factors = set(divisors(self.curr_turn))
-        for dX, dY, door, state in current_percept.maze_state:
-            # update frequency dictionary
-            if state == constants.CLOSED:
-                self.frequencies_per_cell[(curr_x + dX, curr_y + dY, door)] -= factors
-            elif state == constants.OPEN:
-                self.frequencies_per_cell[(curr_x + dX, curr_y + dY, door)] &= factors
-            elif (
-                curr_x + dX,
-                curr_y + dY,
-                door,
-            ) not in self.frequencies_per_cell.keys() and state == constants.BOUNDARY:
-                self.frequencies_per_cell[(curr_x + dX, curr_y + dY, door)] = {0}
-
-    def update_graph(self, curr_x, curr_y, current_percept):
-        # Update maze graph with new information
-        for dX, dY, door, state in current_percept.maze_state:
-            cell_pos = (curr_x + dX, curr_y + dY)
-            neighbor_pos = None
-
-            # Determine the neighbor position based on the door direction
-            if door == constants.LEFT:
-                neighbor_pos = (cell_pos[0] - 1, cell_pos[1])
-            elif door == constants.RIGHT:
-                neighbor_pos = (cell_pos[0] + 1, cell_pos[1])
-            elif door == constants.UP:
-                neighbor_pos = (cell_pos[0], cell_pos[1] - 1)
-            elif door == constants.DOWN:
-                neighbor_pos = (cell_pos[0], cell_pos[1] + 1)
-            else:
-                continue  # Should not happen
-
-            # Get the frequencies of the doors
-            cell_door_freqs = self.frequencies_per_cell[
-                (cell_pos[0], cell_pos[1], door)
-            ]
-            neighbor_door = self.opposite_door(door)
-            neighbor_door_freqs = self.frequencies_per_cell[
-                (neighbor_pos[0], neighbor_pos[1], neighbor_door)
-            ]
-
-            # Determine if the edge is passable
-            if cell_door_freqs == {0} or neighbor_door_freqs == {0}:
-                # Door is always closed or frequencies are unknown; remove edge if it exists
-                self.maze_graph[cell_pos].pop(neighbor_pos, None)
-                self.maze_graph[neighbor_pos].pop(cell_pos, None)
-            else:
-                # Compute expected cost using avg_time_for_both_doors_to_open
-                expected_cost = self.avg_time_for_both_doors_to_open(
-                    cell_door_freqs, neighbor_door_freqs
-                )
-                # Add edge to the graph with the expected cost as the weight
-                self.maze_graph[cell_pos][neighbor_pos] = expected_cost
-                self.maze_graph[neighbor_pos][cell_pos] = expected_cost
-
-    def update_exploration_values(self, curr_x, curr_y, current_percept):
-        for dX, dY, door, state in current_percept.maze_state:
-            cell_pos = (curr_x + dX, curr_y + dY)
-
-            # If the cell hasn't been explored yet, initialize its value
-            if cell_pos not in self.exploration_values:
-                self.exploration_values[cell_pos] = 0
-
-            # Each turn we see a cell, increase value by 1 (4 doors * .25 = 1)
-            self.exploration_values[cell_pos] += 0.25
-
-            # Further cells get lower increments based on distance
-            if dX != 0 and dY != 0:
-                self.exploration_values[cell_pos] += (1 / abs(dX) + 1 / abs(dY))
-            elif dX == 0 and dY != 0:
-                self.exploration_values[cell_pos] += 1 / abs(dY)
-            elif dY == 0 and dX != 0:
-                self.exploration_values[cell_pos] += 1 / abs(dX)
-        
+        # Initialize variables for the exploration strategy, grid cell (gx, gy) being stored at
+        # [gx - grid_origin, gy - grid_origin], with room for the neighbours of the outermost ones
+        self.grid_origin = -self.offset // self.cell_size - 1
+        grid_shape = (self.offset // self.cell_size + 2 - self.grid_origin,) * 2
+        self.visited_grid_cells = np.zeros(grid_shape, dtype=bool)
+        self.frontier_set = np.zeros(grid_shape, dtype=bool)
+        self.frontier_positions = np.zeros(self.shape, dtype=bool)
+
+    def update_door_frequencies(self, curr_x, curr_y, doors):
+        # update the frequency candidates of every door of the percept at once
+        return self.frequencies.apply(
+            curr_x + self.offset + doors[:, 0], curr_y + self.offset + doors[:, 1],
+            doors[:, 2], doors[:, 3], self.curr_turn
+        )
+
+    def update_graph(self, xs, ys, door_types):
+        # Update maze graph with new information, for the doors updated by the percept
+        neighbor_xs = xs + DX[door_types]
+        neighbor_ys = ys + DY[door_types]
+        neighbor_doors = OPPOSITE_DOORS[door_types]
+        self.known_cells[xs, ys] = True
+        self.known_cells[neighbor_xs, neighbor_ys] = True
+
+        # The cost only depends on the candidates of both doors, so it's looked up once per distinct pair
+        candidates = self.frequencies.candidates
+        pairs = np.concatenate(
+            (candidates[xs, ys, door_types], candidates[neighbor_xs, neighbor_ys, neighbor_doors]), axis=1
+        )
+        _, first, inverse = np.unique(pairs, axis=0, return_index=True, return_inverse=True)
+        costs = np.array([
+            self.avg_time_for_both_doors_to_open(
+                self.frequencies.get_mask(xs[i], ys[i], door_types[i]),
+                self.frequencies.get_mask(neighbor_xs[i], neighbor_ys[i], neighbor_doors[i]),
+            )
+            for i in first
+        ])[inverse.reshape(-1)]
+
+        # A door which is always closed leaves no pair of candidates, so no edge is an infinite cost
+        self.edge_costs[xs, ys, door_types] = costs
+        self.edge_costs[neighbor_xs, neighbor_ys, neighbor_doors] = costs
+
+    def update_exploration_values(self, curr_x, curr_y, doors):
+        dX, dY, states = doors[:, 0], doors[:, 1], doors[:, 3]
+        xs, ys = curr_x + self.offset + dX, curr_y + self.offset + dY
+        # If the cell hasn't been explored yet, its value starts at 0
+        self.explored_cells[xs, ys] = True
+
+        # Each turn we see a cell, increase value by 1 (4 doors * .25 = 1), and further cells get lower
+        # increments based on distance
+        with np.errstate(divide="ignore"):
+            increments = (np.where(dX != 0, 1 / np.abs(dX), 0)
+                          + np.where(dY != 0, 1 / np.abs(dY), 0))
+        is_boundary = states == BOUNDARY
+
+        # The boundary penalty depends on the value so far, so the doors of a cell are applied in percept
+        # order: the k-th door seen of every cell in the k-th pass
+        cells = xs * self.shape[1] + ys
+        order = np.argsort(cells, kind="stable")
+        sorted_cells = cells[order]
+        starts = np.ones(len(cells), dtype=bool)
+        starts[1:] = sorted_cells[1:] != sorted_cells[:-1]
+        positions = np.arange(len(cells))
+        ranks = np.empty(len(cells), dtype=np.int64)
+        ranks[order] = positions - np.maximum.accumulate(np.where(starts, positions, 0))
+
+        for rank in range(ranks.max(initial=-1) + 1):
+            selected = ranks == rank
+            x, y = xs[selected], ys[selected]
+            values = self.exploration_values[x, y] + 0.25
+            values = values + increments[selected]
+
             # cells with boundary doors get lower values, but with decaying penalty
-            decay_factor = max(1, self.exploration_values[cell_pos] / 10)
-            if state == BOUNDARY:
-                self.exploration_values[cell_pos] -= 1 / decay_factor
-
-            # cells which contain very high frequency doors get high values
-            door_freqs = self.frequencies_per_cell[(cell_pos[0], cell_pos[1], door)]
-            # if len(door_freqs) == 1:
-            #     if self.maximum_door_frequency - door_freqs[0] <= 1:
-            #         self.exploration_values[cell_pos] += 5
-        
+            decay_factor = np.maximum(1, values / 10)
+            values = np.where(is_boundary[selected], values - 1 / decay_factor, values)
+            self.exploration_values[x, y] = values
+
         # After each move, apply a small decay to all previously explored cells
-        self.decay_exploration_values
+        self.decay_exploration_values()
 
     def decay_exploration_values(self):
         decay_rate = 0.99
-        for cell_pos in self.exploration_values:
-            if self.exploration_values[cell_pos] > 0:
-                self.exploration_values[cell_pos] *= decay_rate
-    
-    def lcm(self, a, b):
-        # Return 0 if one of the values is 0 (door never opens)
-        if a == 0 or b == 0:
-            return 0
-
-        # Check both (a, b) and (b, a) in cache to avoid unnecessary sorting
-        if (a, b) in self.lcm_cache:
-            return self.lcm_cache[(a, b)]
-        elif (b, a) in self.lcm_cache:
-            return self.lcm_cache[(b, a)]
-
-        # Compute the LCM and store it in the cache
-        result = abs(a * b) // math.gcd(a, b)
-        self.lcm_cache[(a, b)] = result
-
-        return result
-
-    def avg_time_for_both_doors_to_open(self, door1_freq_set, door2_freq_set):
-        """Function which returns an approximation of the number of turns from the current turn needed to
-        wait before adjacent doors are open at the same time"""
-
-        total_sum = 0
-        count = 0
-
-        # Loop through all possible frequency pairs from set1 and set2
-        for f1 in door1_freq_set:
-            for f2 in door2_freq_set:
-                if f1 != 0 and f2 != 0:  # Skip cases where one of the doors never opens
-                    next_open_time = self.lcm(f1, f2)
+        values = self.exploration_values
+        np.multiply(values, decay_rate, out=values, where=values > 0)
 
-                    # If we don't care about current cycle, just avg expected moves to wait
-                    if next_open_time != 0:
-                        total_sum += next_open_time
-                        count += 1
-
-                    # if next_open_time != 0:
-                    #     # Calculate how far ahead from current turn both doors will be open
-                    #     next_open_turn = (-self.curr_turn % next_open_time)
-                    #     total_sum += next_open_turn
-                    #     count += 1
+    def avg_time_for_both_doors_to_open(self, door1_mask, door2_mask):
+        """Function which returns an approximation of the number of turns from the current turn needed to
+        wait before adjacent doors are open at the same time, from the candidate bitmasks of both doors"""
 
-        # Compute and return the average of all next open times
-        return total_sum / count if count > 0 else float("inf")
+        # If we don't care about current cycle, just avg lcm of the pairs of frequencies which open
+        # if we do, self.wait_table.expected_wait(mask1, mask2, self.curr_turn) is the wait from this turn
+        return self.wait_table.mean_period(door1_mask, door2_mask)
 
     def opposite_door(self, door):
         if door == constants.LEFT:
@@ -220,6 +187,7 @@ class Player:
         return (dx + dy) * avg_cost_per_move
 
     def a_star_search(self, start, goals):
+        """A* over the known edges, `goals` being a boolean mask of the grid"""
         open_set = []
         heapq.heappush(open_set, (self.heuristic(start, start), 0, start))
         came_from = {start: None}
@@ -228,7 +196,7 @@ class Player:
         while open_set:
             _, current_g, current = heapq.heappop(open_set)
 
-            if current in goals:
+            if goals[current[0] + self.offset, current[1] + self.offset]:
                 # Reconstruct path
                 path = []
                 current_node = current
@@ -239,10 +207,12 @@ class Player:
                 # print(path)
                 return path
 
-            for neighbor in self.maze_graph[current]:
-                tentative_g_score = (
-                    g_score[current] + self.maze_graph[current][neighbor]
-                )
+            costs = self.edge_costs[current[0] + self.offset, current[1] + self.offset]
+            for door in range(4):
+                if costs[door] == np.inf:
+                    continue
+                neighbor = (current[0] + int(DX[door]), current[1] + int(DY[door]))
+                tentative_g_score = g_score[current] + float(costs[door])
                 if neighbor not in g_score or tentative_g_score < g_score[neighbor]:
                     came_from[neighbor] = current
                     g_score[neighbor] = tentative_g_score
@@ -252,34 +222,47 @@ class Player:
         # No path found
         return None
 
-    def get_visible_cells(self, curr_x, curr_y, maze_state):
-        visible_cells = []
-        for dX, dY, door, state in maze_state:
-            cell_pos = (curr_x + dX, curr_y + dY)
+    def get_visible_cells(self, doors):
+        """Cells of the percept, as a (2r+1, 2r+1) mask around the drone indexed by [dX + r, dY + r], and the
+        index in the percept of the first door seen of each of them"""
+        size = 2 * self.radius + 1
+        first_seen = np.full(size * size, len(doors), dtype=np.int64)
+        cells = (doors[:, 0] + self.radius) * size + doors[:, 1] + self.radius
+        np.minimum.at(first_seen, cells, np.arange(len(doors)))
+        first_seen = first_seen.reshape(size, size)
+        return first_seen < len(doors), first_seen
 
-            if cell_pos not in visible_cells:
-                visible_cells.append(cell_pos)
-        
-        return visible_cells
+    def select_next_temp_goal(self, curr_x, curr_y, doors):
+        r = self.radius
+        visible_cells, visible_order = self.get_visible_cells(doors)
 
-    def select_next_temp_goal(self, curr_x, curr_y, current_percept):
-        start = (curr_x, curr_y)
-        visible_cells = self.get_visible_cells(curr_x, curr_y, current_percept.maze_state)
-
-        def score(cell):
-            # Calculate the weighted score based on exploration value and distance
-            exploration_value = self.exploration_values.get(cell, float('inf'))
-            distance_to_cell = self.heuristic(start, cell)
-            alpha = 0.7  # weight for exploration value
-            beta = 0.3   # weight for distance
-            return alpha * exploration_value + beta * distance_to_cell
-        
         # Filter out the current position from visible_cells
-        valid_cells = [cell for cell in visible_cells if (cell[0], cell[1]) != start]
+        valid_cells = visible_cells.copy()
+        valid_cells[r, r] = False
+        if not valid_cells.any():
+            raise ValueError("no visible cell to select")
+
+        # Cells of the window past the edge of the grid are never visible
+        offsets = np.arange(-r, r + 1)
+        window = np.ix_(
+            np.clip(curr_x + self.offset + offsets, 0, self.shape[0] - 1),
+            np.clip(curr_y + self.offset + offsets, 0, self.shape[1] - 1),
+        )
+
+        # Calculate the weighted score based on exploration value and distance
+        exploration_values = np.where(self.explored_cells[window], self.exploration_values[window], np.inf)
+        distances = np.abs(offsets)[:, None] + np.abs(offsets)[None, :]
+        alpha = 0.7  # weight for exploration value
+        beta = 0.3   # weight for distance
+        scores = alpha * exploration_values + beta * distances
+
+        # Select the cell with the lowest score, the first one seen on ties
+        best = scores[valid_cells].min()
+        ties = valid_cells & (scores == best)
+        first_seen = np.where(ties, visible_order, np.iinfo(np.int64).max)
+        dX, dY = np.unravel_index(np.argmin(first_seen), first_seen.shape)
+        return curr_x + int(dX) - r, curr_y + int(dY) - r
 
-        # Select the cell with the lowest score
-        return min(valid_cells, key=score)
-    
     def move(self, current_percept) -> int:
         """Function which retrieves the current state of the maze and returns a movement action.
 
@@ -296,64 +279,65 @@ class Player:
         curr_x, curr_y = -current_percept.start_x, -current_percept.start_y
         self.curr_turn += 1
 
+        doors = np.asarray(current_percept.maze_state, dtype=np.int64).reshape(-1, 4)
+
         # Update door frequencies based on current percept
-        self.update_door_frequencies(curr_x, curr_y, current_percept)
+        xs, ys, door_types = self.update_door_frequencies(curr_x, curr_y, doors)
 
         # Update graph based on current percept
-        self.update_graph(curr_x, curr_y, current_percept)
+        self.update_graph(xs, ys, door_types)
 
         # Update exploration values for the cells in drone vision
-        self.update_exploration_values(curr_x, curr_y, current_percept)
+        self.update_exploration_values(curr_x, curr_y, doors)
 
         start = (curr_x, curr_y)
 
         # Update goal if end is visible
         if current_percept.is_end_visible:
             self.goal = (curr_x + current_percept.end_x, curr_y + current_percept.end_y)
-        # THIS COMMENTED OUT CODE WAS USED FOR EXPLORATION VALUES STRATEGY
-        #elif self.temp_goal is None or self.heuristic(start, self.temp_goal) <= self.radius // 3:
-        #    self.temp_goal = self.select_next_temp_goal(curr_x, curr_y, current_percept)
-
-        #goal = self.goal if self.goal is not None else self.temp_goal
-        # [perform A* search on goal to get next move]
 
         if self.goal:
-            # Use A* search to the goal
-            return self.perform_a_star_and_get_next_move((curr_x, curr_y), {self.goal})
+            return self.move_to_goal(start, xs, ys, door_types)
         else:
             # Exploration strategy
             self.update_visited_and_frontier(curr_x, curr_y)
 
-            if self.frontier_positions:
+            if self.frontier_positions.any():
                 # Use A* search to any of the frontier positions
-                return self.perform_a_star_and_get_next_move(
-                    (curr_x, curr_y), self.frontier_positions
-                )
-
-            return constants.WAIT
+                path = self.a_star_search(start, self.frontier_positions)
+                if path:
+                    self.temp_goal = None
+                    return self.get_next_move(start, path)
+
+            # No frontier position can be reached, fall back to the exploration values strategy: head for
+            # the least explored visible cell until it is within a third of the radius
+            if self.temp_goal is None or self.heuristic(start, self.temp_goal) <= self.radius // 3:
+                self.temp_goal = self.select_next_temp_goal(curr_x, curr_y, doors)
+            goals = np.zeros(self.shape, dtype=bool)
+            goals[self.temp_goal[0] + self.offset, self.temp_goal[1] + self.offset] = True
+            path = self.a_star_search(start, goals)
+            if path is None:
+                # Pick another cell next turn
+                self.temp_goal = None
+            return self.get_next_move(start, path)
 
     def get_grid_cell(self, x, y):
         grid_x = x // self.cell_size
         grid_y = y // self.cell_size
         return (grid_x, grid_y)
 
-    def get_positions_in_grid_cell(self, grid_cell):
+    def get_grid_cell_slices(self, grid_cell):
         grid_x, grid_y = grid_cell
 
-        # Define the boundaries of the grid cell
-        min_x = grid_x * self.cell_size
-        max_x = (grid_x + 1) * self.cell_size - 1
-        min_y = grid_y * self.cell_size
-        max_y = (grid_y + 1) * self.cell_size - 1
-
-        # Collect known positions within the grid cell
-        known_positions = set(self.maze_graph.keys())
-        positions = []
-        for x in range(min_x, max_x + 1):
-            for y in range(min_y, max_y + 1):
-                if (x, y) in known_positions:
-                    positions.append((x, y))
-        return positions
+        # Define the boundaries of the grid cell, as slices of the per-cell arrays
+        min_x = max(grid_x * self.cell_size + self.offset, 0)
+        max_x = max((grid_x + 1) * self.cell_size + self.offset, 0)
+        min_y = max(grid_y * self.cell_size + self.offset, 0)
+        max_y = max((grid_y + 1) * self.cell_size + self.offset, 0)
+        return slice(min_x, max_x), slice(min_y, max_y)
+
+    def get_grid_index(self, grid_cell):
+        return grid_cell[0] - self.grid_origin, grid_cell[1] - self.grid_origin
 
     def get_unvisited_neighbors(self, grid_cell):
         x, y = grid_cell
@@ -361,12 +345,10 @@ class Player:
         directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
         for dx, dy in directions:
             neighbor = (x + dx, y + dy)
-            if (
-                neighbor not in self.visited_grid_cells
-                and neighbor not in self.frontier_set
-            ):
+            index = self.get_grid_index(neighbor)
+            if not self.visited_grid_cells[index] and not self.frontier_set[index]:
                 neighbors.append(neighbor)
-                self.frontier_set.add(neighbor)
+                self.frontier_set[index] = True
         return neighbors
 
     def determine_move(self, dx, dy):
@@ -381,8 +363,26 @@ class Player:
         else:
             return constants.WAIT
 
-    def perform_a_star_and_get_next_move(self, start, goals):
-        path = self.a_star_search(start, goals)
+    def move_to_goal(self, start, xs, ys, door_types):
+        """Next move towards the goal, repairing the search of the previous turn with the doors updated by
+        the percept instead of searching again"""
+        grid_start = (start[0] + self.offset, start[1] + self.offset)
+        if self.planner.goal is None:
+            # The costs are set before the search exists, so none of them is propagated
+            self.planner.set_all_costs(self.edge_costs)
+            self.planner.reset(grid_start, (self.goal[0] + self.offset, self.goal[1] + self.offset))
+        else:
+            self.planner.move_start(grid_start)
+            # update_graph sets the cost of both sides of each updated door's edge
+            edge_xs = np.concatenate((xs, xs + DX[door_types]))
+            edge_ys = np.concatenate((ys, ys + DY[door_types]))
+            edge_doors = np.concatenate((door_types, OPPOSITE_DOORS[door_types]))
+            self.planner.update_costs(edge_xs, edge_ys, edge_doors, self.edge_costs[edge_xs, edge_ys, edge_doors])
+        self.planner.compute()
+        door_type = self.planner.next_move()
+        return constants.WAIT if door_type is None else door_type
+
+    def get_next_move(self, start, path):
         if path and len(path) > 1:
             next_pos = path[1]
             dx, dy = next_pos[0] - start[0], next_pos[1] - start[1]
@@ -391,22 +391,17 @@ class Player:
 
     def update_visited_and_frontier(self, curr_x, curr_y):
         current_grid_cell = self.get_grid_cell(curr_x, curr_y)
+        current_index = self.get_grid_index(current_grid_cell)
 
-        if current_grid_cell not in self.visited_grid_cells:
-            self.visited_grid_cells.add(current_grid_cell)
+        if not self.visited_grid_cells[current_index]:
+            self.visited_grid_cells[current_index] = True
 
             # Remove positions in this grid cell from frontier_positions
-            positions_in_current_grid_cell = set(
-                self.get_positions_in_grid_cell(current_grid_cell)
-            )
-            self.frontier_positions -= positions_in_current_grid_cell
+            self.frontier_positions[self.get_grid_cell_slices(current_grid_cell)] = False
 
             # Expand the frontier
             neighbors = self.get_unvisited_neighbors(current_grid_cell)
             for neighbor in neighbors:
-                self.frontier_set.add(neighbor)
-                # Add positions in neighbor grid cell to frontier_positions
-                positions_in_neighbor_grid_cell = set(
-                    self.get_positions_in_grid_cell(neighbor)
-                )
-                self.frontier_positions |= positions_in_neighbor_grid_cell
+                # Add the known positions in neighbor grid cell to frontier_positions
+                block = self.get_grid_cell_slices(neighbor)
+                self.frontier_positions[block] |= self.known_cells[block]
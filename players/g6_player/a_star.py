@@ -2,8 +2,6 @@ from players.g6_player.classes.cell import Cell
 from players.g6_player.data import Move
 from players.g6_player.updatable_heap import UpdatableHeap
 
-from time import sleep
-
 
 def a_star(start: Cell, target: Cell) -> list[Move]:
     """
@@ -12,38 +10,47 @@ def a_star(start: Cell, target: Cell) -> list[Move]:
     """
     frontier = UpdatableHeap()
     explored = set()
-    moves = []
 
-    # heapq.heappush(frontier, (heuristic(start, target), start))
-    frontier.push(start, priority=heuristic(start, target), moves=[])
+    # cell -> (previous cell, move from the previous cell), the path is only built for the target
+    parents: dict[Cell, tuple[Cell, Move]] = {}
+
+    frontier.push(start, priority=heuristic(start, target))
 
     while len(frontier) > 0:
-        # state = heapq.heappop(frontier)
-        (cost, cell, moves) = frontier.pop()
+        (cost, cell) = frontier.pop()
         explored.add(cell)
 
         if cell == target:
             # Success
-            return moves, cost
+            return reconstruct_moves(parents, start, cell), cost
 
         for path, neighbour, move in cell.neighbours():
             if neighbour not in explored and neighbour not in frontier:
                 priority = calc_priority(cost, path, cell, neighbour, target)
 
-                frontier.push(
-                    neighbour,
-                    priority=priority,
-                    moves=moves + [move],
-                )
+                frontier.push(neighbour, priority=priority)
+                parents[neighbour] = (cell, move)
 
             elif neighbour in frontier:
                 n_cost = cost + path + heuristic(neighbour, target)
 
-                frontier.update(neighbour, n_cost, moves=moves + [move])
+                if frontier.update(neighbour, n_cost):
+                    parents[neighbour] = (cell, move)
 
     raise Exception("Target should have been found")
 
 
+def reconstruct_moves(
+    parents: dict[Cell, tuple[Cell, Move]], start: Cell, cell: Cell
+) -> list[Move]:
+    moves = []
+    while cell != start:
+        cell, move = parents[cell]
+        moves.append(move)
+    moves.reverse()
+    return moves
+
+
 def calc_priority(
     cost: float, path: int, curr: Cell, neighbour: Cell, target: Cell
 ) -> float:
@@ -105,17 +105,26 @@ class Maze:
             self.grid[x][y].update_paths()
 
     def __update_maze_graph(self, current_percept: TypedTimingMazeState):
-        for cell in current_percept.maze_state:
-            x = self.curr_pos[0] + cell.row
-            y = self.curr_pos[1] + cell.col
+        # Every cell of the percept comes with its four doors, update each cell once
+        cells = list(
+            {
+                (self.curr_pos[0] + cell.row, self.curr_pos[1] + cell.col)
+                for cell in current_percept.maze_state
+            }
+        )
+        if not cells:
+            return
+
+        xs, ys = zip(*cells)
+        weights = []
+        for x, y in cells:
+            cell = self.grid[x][y]
+            # Update edges that exist between cell and neighbors, in LEFT, UP, RIGHT, DOWN order
+            weights.append([cell.w_path, cell.n_path, cell.e_path, cell.s_path])
 
-            # Update edges that exist between cell and neighbors
-            self.graph.add_edge((x, y), (x + 1, y), weight=self.grid[x][y].e_path)
-            self.graph.add_edge((x, y), (x - 1, y), weight=self.grid[x][y].w_path)
-            self.graph.add_edge((x, y), (x, y + 1), weight=self.grid[x][y].n_path)
-            self.graph.add_edge((x, y), (x, y - 1), weight=self.grid[x][y].s_path)
+        self.graph.set_cell_edges(xs, ys, weights)
 
-            # self.graph.display_graph()
+        # self.graph.display_graph()
 
     def update_boundary(self, curr_cell: Cell, direction: int):
         """
@@ -1,16 +1,78 @@
-import networkx as nx
+import heapq
 import math
 
+import numpy as np
+
+from constants import LEFT, UP, RIGHT, DOWN, map_dim
+from timing_maze_planner import EarliestArrivalPlanner
+
+# 199 usually
+GRID_DIM = map_dim * 2 - 1
+
+# Position delta for LEFT, UP, RIGHT, DOWN
+DX = (-1, 0, 1, 0)
+DY = (0, -1, 0, 1)
+
+# door type on the other side of each door type
+FACING = (RIGHT, DOWN, LEFT, UP)
+
+
 class MazeGraph:
-    def __init__(self):
-        # Initialize a graph using networkx
-        self.graph = nx.Graph()
+    """
+    Undirected weighted graph over the grid cells
+
+    The weight of the edge behind door `d` of cell (x, y) is `weights[x, y, d]`, nan if
+    the edge was never added. The weights are the path frequencies of the maze, so the
+    same array doubles as the crossing periods of the time-dependent search.
+    """
+
+    def __init__(self, shape: tuple[int, int] = (GRID_DIM, GRID_DIM)):
+        self.shape = tuple(shape)
+        self.planner = EarliestArrivalPlanner(self.shape)
+        self.weights = self.planner.periods
+        self.weights[...] = np.nan
+
+    def __edge(self, node1, node2) -> int:
+        delta = (node2[0] - node1[0], node2[1] - node1[1])
+        for door_type in (LEFT, UP, RIGHT, DOWN):
+            if delta == (DX[door_type], DY[door_type]):
+                return door_type
+        raise ValueError(f"cells {node1} and {node2} are not adjacent")
+
+    def __in_grid(self, node) -> bool:
+        return 0 <= node[0] < self.shape[0] and 0 <= node[1] < self.shape[1]
 
     def add_edge(self, node1, node2, weight):
         """
         Add an edge between two nodes (cells) with a given path distance (weight).
         """
-        self.graph.add_edge(node1, node2, weight=weight)
+        door_type = self.__edge(node1, node2)
+        if self.__in_grid(node1):
+            self.weights[node1[0], node1[1], door_type] = weight
+        if self.__in_grid(node2):
+            self.weights[node2[0], node2[1], FACING[door_type]] = weight
+
+    def set_cell_edges(self, xs, ys, weights):
+        """
+        Set the four edges of many cells at once
+
+        weights[i] holds the LEFT, UP, RIGHT, DOWN path distances of cell (xs[i], ys[i]),
+        None for an unknown edge. The neighbours' side of each edge is updated too.
+        """
+        xs = np.asarray(xs, dtype=int)
+        ys = np.asarray(ys, dtype=int)
+        weights = np.array(weights, dtype=float).reshape(-1, 4)
+
+        self.weights[xs, ys] = weights
+        for door_type in (LEFT, UP, RIGHT, DOWN):
+            nx = xs + DX[door_type]
+            ny = ys + DY[door_type]
+            inside = (nx >= 0) & (nx < self.shape[0]) & (ny >= 0) & (ny < self.shape[1])
+            self.weights[nx[inside], ny[inside], FACING[door_type]] = weights[inside, door_type]
+
+    def weight(self, node1, node2) -> float:
+        """Weight of the edge between two adjacent nodes, nan if there is none"""
+        return self.weights[node1[0], node1[1], self.__edge(node1, node2)]
 
     def euclidean_distance(self, node1, node2):
         """
@@ -22,25 +84,81 @@ class MazeGraph:
 
     def astar_shortest_path(self, start, target):
         """Find the shortest path between start and end nodes using A* algorithm."""
-        print(type(start), type(target))
-        try:
-            shortest_path = nx.astar_path(
-                self.graph, source=start, target=target, heuristic=self.euclidean_distance, weight='weight'
-            )
-            path_length = nx.astar_path_length(
-                self.graph, source=start, target=target, heuristic=self.euclidean_distance, weight='weight'
-            )
-            return shortest_path, path_length
-        except Exception as e:
-            print(f"An error occurred while finding the path: {str(e)}")
-            return None, float('inf')
+        height = self.shape[1]
+        weights = self.weights.ravel().tolist()
+        neighbors = self.planner.neighbors
+        inf = float("inf")
+
+        source = start[0] * height + start[1]
+        goal = target[0] * height + target[1]
+        distance = {source: 0}
+        parent = {source: -1}
+        closed = set()
+
+        # (f, tiebreak, g, cell), the counter keeps the pops in insertion order on ties
+        counter = 0
+        heap = [(self.euclidean_distance(start, target), counter, 0, source)]
+
+        while heap:
+            _, _, g, u = heapq.heappop(heap)
+            if u in closed:
+                continue
+            if u == goal:
+                path = []
+                while u >= 0:
+                    path.append(divmod(u, height))
+                    u = parent[u]
+                path.reverse()
+                return path, g
+            closed.add(u)
+
+            for door_type in range(4):
+                edge = u * 4 + door_type
+                v = neighbors[edge]
+                weight = weights[edge]
+                # nan: no edge
+                if v < 0 or v in closed or weight != weight:
+                    continue
+                n_g = g + weight
+                if n_g < distance.get(v, inf):
+                    distance[v] = n_g
+                    parent[v] = u
+                    counter += 1
+                    h = self.euclidean_distance(divmod(v, height), target)
+                    heapq.heappush(heap, (n_g + h, counter, n_g, v))
+
+        print(f"An error occurred while finding the path: no path from {start} to {target}")
+        return None, float("inf")
+
+    def earliest_arrival_path(self, start, target, turn: int):
+        """
+        Time-dependent search, the weights being the crossing periods of the edges
+
+        Returns the cells from start to target and the turn of arrival, (None, inf) if the
+        target can't be reached
+        """
+        result = self.planner.search(start, turn, [target])
+        if not result.is_reached(target):
+            return None, float("inf")
+
+        path = [tuple(start)]
+        for door_type, _ in result.path(target):
+            x, y = path[-1]
+            path.append((x + DX[door_type], y + DY[door_type]))
+        return path, result.arrival_turn(target)
 
     def get_distinct_nodes(self):
         """Return a list of distinct nodes in the graph."""
-        print("Number of nodes: {}".format(len(list(self.graph.nodes()))))
-        return # list(self.graph.nodes())
+        xs, ys = np.nonzero(~np.isnan(self.weights).all(axis=2))
+        print("Number of nodes: {}".format(len(xs)))
+        return # list(zip(xs.tolist(), ys.tolist()))
 
     def display_graph(self):
         """Display the graph's edges and weights."""
-        for edge in self.graph.edges(data=True):  # Accessing the 'edges' method of the graph
-            print(f"Edge from cell {edge[0]} to cell {edge[1]} with distance {edge[2]['weight']}")
+        # every edge is stored on both of its cells, only show it from the RIGHT and DOWN side
+        for door_type in (RIGHT, DOWN):
+            xs, ys = np.nonzero(~np.isnan(self.weights[:, :, door_type]))
+            for x, y in zip(xs.tolist(), ys.tolist()):
+                neighbour = (x + DX[door_type], y + DY[door_type])
+                weight = self.weights[x, y, door_type]
+                print(f"Edge from cell {(x, y)} to cell {neighbour} with distance {weight}")
@@ -1,48 +1,110 @@
-import heapq
-
-from players.g6_player.data import Move
-from numpy.random import default_rng
-
-
-gen = default_rng()
+from itertools import count
 
 
 class UpdatableHeap:
-    def __init__(self) -> None:
-        self.heap = []
-        self.entry_finder: dict = {}
-
-    def push(self, item, priority: float, moves: list[Move]) -> None:
-        heapq.heappush(self.heap, (priority, gen.random(), item, moves))
-        self.entry_finder[item] = priority
+    """Binary min heap with decrease-key
 
-    def pop(self) -> tuple[float, object, list[Move]]:
-        priority, _, item, moves = heapq.heappop(self.heap)
+    Every item is in the heap at most once, its index in the heap list is tracked in
+    `positions` so that its priority can be lowered in place. Ties between equal
+    priorities are broken by insertion order with a monotonic counter, the counter
+    being renewed when an item's priority is lowered.
+    """
 
-        # TODO: check if heap is empty, do not attempt a pop
-        while item not in self.entry_finder or self.entry_finder[item] != priority:
-            priority, _, item, moves = heapq.heappop(self.heap)
-
-        del self.entry_finder[item]
-
-        return (priority, item, moves)
-
-    def update(self, item, priority: float, moves: list[Move]) -> None:
-        # do not update if the new priority is higher
-        if self.entry_finder[item] < priority:
-            return
-
-        heapq.heappush(self.heap, (priority, gen.random(), item, moves))
-        self.entry_finder[item] = priority
+    def __init__(self) -> None:
+        # entries are [priority, order, item]
+        self.heap: list[list] = []
+        self.positions: dict = {}
+        self.counter = count()
+
+    def push(self, item, priority: float) -> None:
+        entry = [priority, next(self.counter), item]
+        self.heap.append(entry)
+        self.positions[item] = len(self.heap) - 1
+        self.__sift_up(len(self.heap) - 1)
+
+    def pop(self) -> tuple[float, object]:
+        heap = self.heap
+        top = heap[0]
+        last = heap.pop()
+        del self.positions[top[2]]
+
+        if heap:
+            heap[0] = last
+            self.positions[last[2]] = 0
+            self.__sift_down(0)
+
+        return (top[0], top[2])
+
+    def update(self, item, priority: float) -> bool:
+        """Lower the priority of an item already in the heap
+
+        Returns whether the priority changed, a priority which is not lower is ignored
+        """
+        index = self.positions[item]
+        entry = self.heap[index]
+        if priority >= entry[0]:
+            return False
+
+        entry[0] = priority
+        entry[1] = next(self.counter)
+        self.__sift_up(index)
+        return True
+
+    def priority(self, item) -> float:
+        return self.heap[self.positions[item]][0]
+
+    def __sift_up(self, index: int) -> None:
+        heap = self.heap
+        positions = self.positions
+        entry = heap[index]
+        key = (entry[0], entry[1])
+
+        while index > 0:
+            parent_index = (index - 1) >> 1
+            parent = heap[parent_index]
+            if key >= (parent[0], parent[1]):
+                break
+            heap[index] = parent
+            positions[parent[2]] = index
+            index = parent_index
+
+        heap[index] = entry
+        positions[entry[2]] = index
+
+    def __sift_down(self, index: int) -> None:
+        heap = self.heap
+        positions = self.positions
+        size = len(heap)
+        entry = heap[index]
+        key = (entry[0], entry[1])
+
+        while True:
+            child_index = 2 * index + 1
+            if child_index >= size:
+                break
+            child = heap[child_index]
+            right_index = child_index + 1
+            if right_index < size:
+                right = heap[right_index]
+                if (right[0], right[1]) < (child[0], child[1]):
+                    child_index, child = right_index, right
+            if key <= (child[0], child[1]):
+                break
+            heap[index] = child
+            positions[child[2]] = index
+            index = child_index
+
+        heap[index] = entry
+        positions[entry[2]] = index
 
     def __len__(self) -> int:
-        return len(self.entry_finder)
+        return len(self.heap)
 
     def __str__(self) -> str:
-        return f"Heap(heap_size: {len(self.heap)}, items: {len(self.entry_finder)})"
+        return f"Heap(heap_size: {len(self.heap)}, items: {len(self.positions)})"
 
     def __repr__(self) -> str:
         return str(self)
 
     def __contains__(self, item) -> bool:
-        return item in self.entry_finder
+        return item in self.positions
@@ -8,11 +8,12 @@ import random
 import networkx as nx # pip install networkx
 import matplotlib.pyplot as plt # pip install matplotlib
 import math
-from players.g7.player_helper_code import build_graph_from_memory, MazeGraph, PlayerMemory, findShortestPathsToEachNode, reconstruct_path, is_move_valid, MemorySquare, Boundary
+from players.g7.player_helper_code import PlayerMemory, findShortestPathsFromMemory, reconstruct_planner_path, is_move_valid, Boundary
 
 
 import constants
 from timing_maze_state import TimingMazeState
+from information_gain import InformationGainMap
 
 class Player:
     def __init__(self, rng: np.random.Generator, logger: logging.Logger,
@@ -47,6 +48,7 @@ class Player:
         self.maximum_door_frequency = maximum_door_frequency
         self.radius = radius
         self.memory: PlayerMemory = PlayerMemory()
+        self.information_gain = InformationGainMap(self.memory.seen.shape, radius, seen=self.memory.seen)
         self.turn = 0
         self.starting_position_set = False #check
         self.target_node_absolute_coords = None
@@ -76,9 +78,8 @@ class Player:
         # Decide on the next move based on the current percept.
         self.memory.update_memory(current_percept.maze_state, self.turn)
         
-        # Build the graph from the updated memory
-        currentGraph = build_graph_from_memory(self.memory, True)
-        minDistanceArray, parent = findShortestPathsToEachNode(currentGraph, self.memory.pos, self.turn)
+        # The memory keeps the edge periods up to date, search them directly
+        minDistanceArray, search = findShortestPathsFromMemory(self.memory, self.memory.pos, self.turn)
 
         # Case 1: We know the end position and we can reach it Follow path.
         # Case 2: We know the end position but we can't reach it. 
@@ -92,7 +93,7 @@ class Player:
         if self.target_node_absolute_coords:
             print("We know target location and we have a path to get to it")
             
-            path = reconstruct_path(parent, self.target_node_absolute_coords)
+            path = reconstruct_planner_path(search, self.target_node_absolute_coords)
             if path and len(path) > 1:
             # Case 1: We know the end position and we can reach it. Follow path..
                 next_move = self.get_move_direction(path)
@@ -133,7 +134,7 @@ class Player:
             self.current_intermediate_target_age = 0
             self.current_intermediate_target = self.choose_intermediate_target_node(minDistanceArray)
 
-        path = reconstruct_path(parent, self.current_intermediate_target)
+        path = reconstruct_planner_path(search, self.current_intermediate_target)
         if path and len(path) > 1:
             # Case 1: We know the end position and we can reach it. Follow path..
                 next_move = self.get_move_direction(path)
@@ -150,26 +151,16 @@ class Player:
     
 
     def choose_intermediate_target_node(self, min_dist_array):
-        options =  {}
-        for y in range(len(min_dist_array)):
-            for x, dist in enumerate(min_dist_array[y]):
-                if dist < float("inf"):
-                    # Find new Squares
-                    options[(y, x)] = {"dist": dist, "euclidean_dist": math.sqrt((y - self.memory.pos[0]) ** 2 + (x - self.memory.pos[1]) ** 2), "final_score": 0}
-        
-        most_new_visible_squares = 0
-        best_new_pos = self.memory.pos
         boundary: Boundary = self.memory.get_boundary_coords()
-        for new_pos in options:
-            num_unseen_squares = len(self.get_unseen_squares(new_pos, boundary))
-            options[new_pos]["num_unseen"] = num_unseen_squares
-        
-        best_new_pos = self.generate_best_option(options, min_dist_array)
-            # if num_unseen_squares > most_new_visible_squares:
-            #     most_new_visible_squares = num_unseen_squares
-            #     best_new_pos = new_pos
 
-        return best_new_pos
+        # Number of unseen squares visible from every square at once
+        bounds = (
+            (boundary.up, boundary.down) if boundary.is_vertical_boundary_known() else None,
+            (boundary.left, boundary.right) if boundary.is_horizontal_boundary_known() else None,
+        )
+        num_unseen = self.information_gain.gains(bounds)
+
+        return self.generate_best_option(num_unseen, min_dist_array)
     
     # def generate_best_option(self, options, min_dist_array):
     #     # This function is the "brain" of exploring
@@ -197,41 +188,34 @@ class Player:
     #     print("best pos: ", best_pos)
     #     return best_pos
 
-    def generate_best_option(self, options, min_dist_array):
-        best_score = float('-inf')  # Start with a very low score
-        best_pos = self.memory.pos   # Default to the current position
-
+    def generate_best_option(self, num_unseen, min_dist_array):
         # Tuned weights
         unseen_weight = 3            # Increased priority on unseen areas
         distance_weight = 1          # Moderate distance penalty
         time_weight = 0.5              # More weight on time to reach due to door timings
 
-        min_min_dist = np.min(min_dist_array)
-        max_min_dist = 1
-        no_infs = [i for i in np.reshape(min_dist_array, -1) if i < float("inf")]
-        if no_infs:
-            max_min_dist = np.max(no_infs)
+        # Every square we can reach is an option
+        reachable = min_dist_array < float("inf")
+        if not reachable.any():
+            return self.memory.pos   # Default to the current position
 
-        # max_min_dist = np.max([i for i in np.reshape(min_dist_array, -1) if i < float("inf")])
-
-        for pos in options:
-            unseen_cells = options[pos]["num_unseen"]
-            euclidean_dist = options[pos]["euclidean_dist"]
-            time_to_reach = options[pos]["dist"]
+        min_min_dist = np.min(min_dist_array)
+        max_min_dist = np.max(min_dist_array[reachable])
 
-            # Calculate normalized factors
-            unseen_factor = unseen_weight * (unseen_cells / (3 * self.radius**2))
-            distance_factor = distance_weight * (euclidean_dist / (self.radius)) / (1 + self.memory.memory[pos[0]][pos[1]].visited)
-            time_factor = time_weight * (time_to_reach - min_min_dist) / (max_min_dist - min_min_dist if max_min_dist != min_min_dist else 1)
+        rows, cols = np.indices(min_dist_array.shape)
+        euclidean_dist = np.sqrt((rows - self.memory.pos[0]) ** 2 + (cols - self.memory.pos[1]) ** 2)
 
-            # Adjust score to favor unexplored areas, penalize far away and high-time positions
-            final_score = unseen_factor - distance_factor - time_factor
-            options[pos]["final_score"] = final_score
+        # Calculate normalized factors
+        unseen_factor = unseen_weight * (num_unseen / (3 * self.radius**2))
+        distance_factor = distance_weight * (euclidean_dist / (self.radius)) / (1 + self.memory.visited)
+        time_factor = time_weight * (min_dist_array - min_min_dist) / (max_min_dist - min_min_dist if max_min_dist != min_min_dist else 1)
 
-            if final_score > best_score:
-                best_score = final_score
-                best_pos = pos
+        # Adjust score to favor unexplored areas, penalize far away and high-time positions
+        final_score = np.where(reachable, unseen_factor - distance_factor - time_factor, -np.inf)
 
+        # First best square in row major order
+        best_pos = np.unravel_index(np.argmax(final_score), final_score.shape)
+        best_pos = (int(best_pos[0]), int(best_pos[1]))
         print("Best position chosen: ", best_pos)
 
         return best_pos
@@ -247,50 +231,6 @@ class Player:
     #             best_dist = newdist
     #     return (best[0] - self.memory.pos[0], best[1] - self.memory.pos[1])
 
-    def get_unseen_squares(self, pos, boundary: Boundary):
-        squares = self.get_visible_squares_at_pos(pos, boundary)
-        not_seen_squares = []
-
-        if squares:
-            for y in range(len(squares)):
-                for x in range(len(squares[y])):
-                    square = squares[y][x]
-                    if not square.seen:  # Add only unseen squares within boundaries
-                        not_seen_squares.append((y, x))
-        return not_seen_squares
-
-    def get_visible_squares_at_pos(self, pos, boundary: Boundary):
-        """
-        Get the visible squares at the current position
-        NOTE: THIS MAKES SURE THEY ARE WITHIN THE BOUNDARY
-        """
-        y, x = pos
-        visible_squares = []
-        
-        y_start = max(y - self.radius, boundary.up if boundary.is_vertical_boundary_known() else y - self.radius)
-        y_end = min(y + self.radius, boundary.down if boundary.is_vertical_boundary_known() else y + self.radius)
-        x_start = max(x - self.radius, boundary.left if boundary.is_horizontal_boundary_known() else x - self.radius)
-        x_end = min(x + self.radius, boundary.right if boundary.is_horizontal_boundary_known() else x + self.radius)
-
-        # A square is only visible if it is inside the boundary
-        # for row in self.memory.memory[y_start:y_end]:
-        #     visible_squares.append(row[x_start:x_end])
-
-        # A square is only visible if it is inside the boundary and within the Euclidean distance of 'r'
-        for row in range(y_start, y_end + 1):
-            visible_row = []
-            for col in range(x_start, x_end + 1):
-                # Calculate the Euclidean distance from the current position to the square (row, col)
-                distance = math.sqrt((row - y) ** 2 + (col - x) ** 2)
-
-                # If the square is within the visibility radius and boundary, add it to visible squares
-                if distance <= self.radius:
-                    visible_row.append(self.memory.memory[row][col])
-
-            visible_squares.append(visible_row) 
-
-        return visible_squares
-
     def get_move_direction(self, path): #current to next position
         """        
         Args:
@@ -1,121 +1,292 @@
 import random
 
 from dataclasses import dataclass
-import networkx as nx
-import matplotlib.pyplot as plt
-from math import lcm
 import constants
-from utils import get_divisors
+from timing_maze_planner import EarliestArrivalPlanner
 import numpy as np
-import heapq
 
 
-class MemoryDoor:
-    def __init__(self):
-        self.is_certain_freq = False
-        self.observations = {} # {turn : 1 - Closed / 2 - Open / 3 - Boundary}
-        self.freq_distribution = {}
-        self.is_boundary = False
-    
+# (row delta, col delta) of the LEFT, UP, RIGHT, DOWN doors
+DOOR_DELTAS = np.array([(0, -1), (-1, 0), (0, 1), (1, 0)])
+FACING_DOORS = np.array([constants.RIGHT, constants.DOWN, constants.LEFT, constants.UP])
+# The planner's first axis is our row, so its LEFT, UP, RIGHT, DOWN doors are our UP, LEFT, DOWN, RIGHT doors
+PLANNER_DOORS = np.array([constants.UP, constants.LEFT, constants.DOWN, constants.RIGHT])
+
+# Initial number of small candidates kept as bitmasks, PlayerMemory doubles it whenever a turn reaches its square
+DIVISOR_LIMIT = 256
+
+
+def divisor_flags(turn, values):
+    """Flags over `values` (0..limit - 1) of utils.get_divisors(turn): turn itself and its divisors up to sqrt(turn)"""
+    return (values > 0) & (turn % np.maximum(values, 1) == 0) & ((values * values <= turn) | (values == turn))
+
+
+def pack_flags(flags):
+    return np.packbits(flags, axis=-1, bitorder="little").view("<u8")
+
+
+def unpack_flags(words):
+    return np.unpackbits(words.view(np.uint8), axis=-1, bitorder="little").astype(bool)
+
+
+class MemoryDoorView:
+    """One door of a PlayerMemory, with the attributes of the former per-door objects"""
+
+    __slots__ = ("memory", "index")
+
+    def __init__(self, memory, row, col, door_type):
+        self.memory = memory
+        self.index = (row, col, door_type)
+
+    @property
+    def is_boundary(self):
+        return bool(self.memory.is_boundary[self.index])
+
+    @property
+    def is_certain_freq(self):
+        return bool(self.memory.is_certain[self.index])
+
+    @property
+    def freq_distribution(self):
+        frequencies = self.memory.get_frequencies(*self.index)
+        return {freq: 1 / len(frequencies) for freq in frequencies}
+
     def is_open(self, turn):
-        # Returns if the door is open at a given turn
-        return self.observations.get(turn, 1) == 2
-    
-    def update_observations(self, door_state, turn):
-        # Updates observed freqs, runs get_freq
-        if door_state == constants.BOUNDARY:
-            self.is_boundary = True
-            return
-        
-        if not self.is_certain_freq:
-            self.observations[turn] = door_state
-            self.freq_distribution = self.get_freq()
-            if len(self.freq_distribution) == 1:
-                self.is_certain_freq = True
-    
-    def get_freq(self):
-        # Tries to find the frequency given observed, returns a probability distribution
-        if self.is_boundary: # Boundary has 0 frequency
-            return {0:1}
-        
-        possible_open_frequencies = set()
-        closed_frequencies = set()
-
-        # Iterate over the frequency conditions
-        for turn, status in self.observations.items():
-            if status == 2:
-                # Add all divisors of the frequency if it's open
-                if not possible_open_frequencies:
-                    possible_open_frequencies = get_divisors(turn)
-                else:
-                    possible_open_frequencies &= get_divisors(turn)
-            else:
-                # Add all divisors of the closed frequency
-                closed_frequencies |= get_divisors(turn)
-
-        # Remove any closed frequencies from the possible open set
-        possible_open_frequencies -= closed_frequencies
-
-        # Assign equal probabilities to each remaining frequency
-        total_frequencies = len(possible_open_frequencies)
-        probability_distribution = {
-            freq: 1/total_frequencies for 
-            freq in possible_open_frequencies} if total_frequencies > 0 else {}
-
-        return probability_distribution
-    
+        # Only the last turn on which the door was seen open is kept
+        return self.memory.last_open[self.index] == turn
+
     def roll_freq(self, use_max=False):
-        # Returns a frequency based on the distribution
-            # Calculate cumulative distribution
-        if self.freq_distribution == {}:
+        frequencies = self.memory.get_frequencies(*self.index)
+        if not frequencies:
             return 0
         if use_max:
-            return max(self.freq_distribution)
-        cumulative_dist = []
-        cumulative_sum = 0
-        for freq, prob in self.freq_distribution.items():
-            cumulative_sum += prob
-            cumulative_dist.append((cumulative_sum, freq))
-        
-        rand = np.random.random()
-        
-        # Choose the frequency based on the random number
-        for cumulative_prob, freq in cumulative_dist:
-            if rand <= cumulative_prob:
-                return freq
-
-        # In case the random number is exactly 1, return the last frequency
-        return cumulative_dist[-1][1]
-        
-
-class MemorySquare:
-    def __init__(self):
-        left = MemoryDoor()
-        up = MemoryDoor()
-        right = MemoryDoor()
-        down = MemoryDoor()
-        self.doors = {constants.LEFT:left, constants.UP:up, constants.RIGHT:right, constants.DOWN:down}
-        self.visited = 0
-        self.seen = False
+            return frequencies[-1]
+        return frequencies[min(int(np.random.random() * len(frequencies)), len(frequencies) - 1)]
+
+
+class MemorySquareView:
+    """One cell of a PlayerMemory, with the attributes of the former per-cell objects"""
+
+    __slots__ = ("memory", "row", "col")
+
+    def __init__(self, memory, row, col):
+        self.memory = memory
+        self.row = row
+        self.col = col
+
+    @property
+    def visited(self):
+        return int(self.memory.visited[self.row, self.col])
+
+    @visited.setter
+    def visited(self, value):
+        self.memory.visited[self.row, self.col] = value
+
+    @property
+    def seen(self):
+        return bool(self.memory.seen[self.row, self.col])
+
+    @seen.setter
+    def seen(self, value):
+        self.memory.seen[self.row, self.col] = value
+
+    @property
+    def doors(self):
+        return {door_type: MemoryDoorView(self.memory, self.row, self.col, door_type)
+                for door_type in (constants.LEFT, constants.UP, constants.RIGHT, constants.DOWN)}
+
+
+class MemoryRowView:
+    __slots__ = ("memory", "row")
+
+    def __init__(self, memory, row):
+        self.memory = memory
+        self.row = row
+
+    def __getitem__(self, col):
+        return MemorySquareView(self.memory, self.row, col)
+
+    def __len__(self):
+        return self.memory.size
+
+
+class MemoryGridView:
+    """Lets memory.memory[y][x] keep working on top of the arrays"""
+
+    __slots__ = ("memory",)
+
+    def __init__(self, memory):
+        self.memory = memory
+
+    def __getitem__(self, row):
+        return MemoryRowView(self.memory, row)
+
+    def __len__(self):
+        return self.memory.size
+
 
 class PlayerMemory:
+    """Everything the player has seen of the maze, relative to its start
+
+        Door beliefs are stored in arrays indexed by [row, col, door_type] (rows being y). A door's candidates
+        are the intersection of utils.get_divisors over the turns it was seen open, minus their union over the turns
+        it was seen closed, only known once the door has been seen open. get_divisors(t) being t and its
+        divisors up to sqrt(t), and 1 never leaving the intersection, the open turns boil down to the first
+        one t1 and their gcd g: the candidates are the divisors of g up to sqrt(t1), plus t1 itself while
+        every later open turn is a multiple of t1 at least t1 ** 2. The closed turns are kept as a bitmask of
+        the small candidates they rule out, and a flag for t1.
+
+        The bitmask covers the values below divisor_limit, whose square is kept above the turn so that every
+        small candidate fits. A closed turn c rules out the values dividing it up to sqrt(c), which fit too,
+        and c itself, which may not: for the doors never seen open, the closed turns from divisor_limit on are
+        kept aside in late_closed and folded into the bitmask when it grows.
+    """
+
     def __init__(self, map_size: int = 100):
-        self.memory = [[MemorySquare() for _ in range(map_size * 2)] for _ in range(map_size * 2)]
+        """
+            Args:
+                map_size (int): side of the maze, the memory is twice as large to fit any start position
+        """
+        self.size = map_size * 2
+        shape = (self.size, self.size)
+        self.divisor_limit = DIVISOR_LIMIT
+        self.divisor_values = np.arange(self.divisor_limit)
+        # Flat door index -> closed turns from divisor_limit on as a bit set, for the doors never seen open
+        self.late_closed = {}
+        self.first_open = np.zeros(shape + (4,), dtype=np.int64)
+        self.open_gcd = np.zeros(shape + (4,), dtype=np.int64)
+        self.first_open_kept = np.zeros(shape + (4,), dtype=bool)
+        self.closed_divisors = np.zeros(shape + (4, self.divisor_limit // 64), dtype=np.uint64)
+        self.has_open = np.zeros(shape + (4,), dtype=bool)
+        self.is_certain = np.zeros(shape + (4,), dtype=bool)
+        self.is_boundary = np.zeros(shape + (4,), dtype=bool)
+        self.last_open = np.full(shape + (4,), -1, dtype=np.int64)
+        # Largest candidate frequency of every door, 0 while the door was never seen open
+        self.max_frequency = np.zeros(shape + (4,), dtype=np.int64)
+        self.visited = np.zeros(shape, dtype=np.int64)
+        self.seen = np.zeros(shape, dtype=bool)
+
+        # Crossing period of every edge, lcm of the largest candidates of its two doors, 0 if either can't
+        # be used. It is kept in the planner and only the edges of the doors seen on a turn are recomputed
+        self.planner = EarliestArrivalPlanner(shape)
+
+        self.memory = MemoryGridView(self)
         self.pos = (map_size, map_size) #(y, x)
         self.boundary = Boundary(-1, -1, -1, -1)
 
-    
     def update_memory(self, state, turn):
-        # state = [door] = (row_offset, col_offset, door_type, door_status)
-        for s in state:
-            square: MemorySquare = self.memory[self.pos[0] + s[1]][self.pos[1] + s[0]]
-            square.seen = True
-            door = square.doors[s[2]]
-            door_state = s[3]
-            door.update_observations(door_state, turn)
+        # state = [door] = (col_offset, row_offset, door_type, door_status)
+        while turn >= self.divisor_limit * self.divisor_limit:
+            self.grow_divisors()
+
+        doors = np.asarray(state, dtype=np.int64).reshape(-1, 4)
+        rows = self.pos[0] + doors[:, 1]
+        cols = self.pos[1] + doors[:, 0]
+        door_types = doors[:, 2]
+        states = doors[:, 3]
+        self.seen[rows, cols] = True
+        seen_rows, seen_cols = rows, cols
+
+        boundary = states == constants.BOUNDARY
+        self.is_boundary[rows[boundary], cols[boundary], door_types[boundary]] = True
+
+        # Boundary doors and doors whose frequency is already certain record nothing
+        update = ~boundary & ~self.is_certain[rows, cols, door_types]
+        rows, cols, door_types, states = rows[update], cols[update], door_types[update], states[update]
+        is_open = states == constants.OPEN
+        first_open = self.first_open[rows, cols, door_types]
+
+        # t1 leaves the candidates for good with an open turn it doesn't divide or below t1 ** 2, or a closed
+        # turn it divides from t1 ** 2 on
+        multiple = (first_open > 0) & (turn % np.maximum(first_open, 1) == 0) & (turn >= first_open * first_open)
+        kept = self.first_open_kept[rows, cols, door_types]
+        self.first_open_kept[rows, cols, door_types] = np.where(
+            first_open == 0, is_open, kept & np.where(is_open, multiple, ~multiple))
+        self.first_open[rows, cols, door_types] = np.where(is_open & (first_open == 0), turn, first_open)
+        self.open_gcd[rows[is_open], cols[is_open], door_types[is_open]] = np.gcd(
+            self.open_gcd[rows[is_open], cols[is_open], door_types[is_open]], turn)
+        self.closed_divisors[rows[~is_open], cols[~is_open], door_types[~is_open]] |= pack_flags(
+            divisor_flags(turn, self.divisor_values))
+        self.update_late_closed(rows, cols, door_types, is_open, first_open, turn)
+
+        self.has_open[rows[is_open], cols[is_open], door_types[is_open]] = True
+        self.last_open[rows[is_open], cols[is_open], door_types[is_open]] = turn
+
+        index = (rows, cols, door_types)
+        flags, kept = self.candidate_flags(index)
+        counts = flags.sum(axis=-1) + kept
+        largest = np.where(flags.any(axis=-1), self.divisor_limit - 1 - flags[:, ::-1].argmax(axis=-1), 0)
+        self.max_frequency[index] = np.where(kept, self.first_open[index], largest)
+        self.is_certain[index] = self.has_open[index] & (counts == 1)
+
+        self.update_periods(seen_rows, seen_cols)
+
+    def update_late_closed(self, rows, cols, door_types, is_open, first_open, turn):
+        """Keep the closed turns the bitmask can't hold yet, for the doors which may still need them"""
+        if turn < self.divisor_limit:
+            return
+        # A door seen open for the first time now has its candidates below sqrt(turn), inside the bitmask
+        keys = np.ravel_multi_index((rows, cols, door_types), self.first_open.shape)
+        for key in keys[is_open & (first_open == 0)].tolist():
+            self.late_closed.pop(key, None)
+        bit = 1 << turn
+        late_closed = self.late_closed
+        for key in keys[~is_open & (first_open == 0)].tolist():
+            late_closed[key] = late_closed.get(key, 0) | bit
+
+    def grow_divisors(self):
+        """Double divisor_limit, once a turn reaches its square"""
+        limit = self.divisor_limit
+        # No closed turn so far reaches limit ** 2, so the new values are only ruled out as closed turns themselves
+        new_words = np.zeros(self.closed_divisors.shape[:-1] + (limit // 64,), dtype=np.uint64)
+        for key, closed in self.late_closed.items():
+            band = (closed >> limit) & ((1 << limit) - 1)
+            new_words[np.unravel_index(key, self.first_open.shape)] = np.frombuffer(
+                band.to_bytes(limit // 8, "little"), dtype="<u8")
+        self.closed_divisors = np.concatenate([self.closed_divisors, new_words], axis=-1)
+        self.divisor_limit = 2 * limit
+        self.divisor_values = np.arange(self.divisor_limit)
+
+    def update_periods(self, rows, cols):
+        """Recompute the period of every edge of the given cells, seen from both of its sides"""
+        rows = (rows[:, None] + np.append(DOOR_DELTAS[:, 0], 0)).ravel()
+        cols = (cols[:, None] + np.append(DOOR_DELTAS[:, 1], 0)).ravel()
+        inside = (rows >= 0) & (rows < self.size) & (cols >= 0) & (cols < self.size)
+        rows, cols = np.divmod(np.unique(rows[inside] * self.size + cols[inside]), self.size)
+
+        neighbor_rows = rows[:, None] + DOOR_DELTAS[:, 0]
+        neighbor_cols = cols[:, None] + DOOR_DELTAS[:, 1]
+        inside = (neighbor_rows >= 0) & (neighbor_rows < self.size) & (neighbor_cols >= 0) & (neighbor_cols < self.size)
+        neighbor_rows, neighbor_cols = np.where(inside, neighbor_rows, 0), np.where(inside, neighbor_cols, 0)
+
+        # largest candidate of the doors involved, 0 for the doors which can't be used
+        frequencies = np.where(self.has_open & ~self.is_boundary, self.max_frequency, 0)
+        facing_frequencies = np.where(inside, frequencies[neighbor_rows, neighbor_cols, FACING_DOORS], 0)
+        periods = np.lcm(frequencies[rows, cols], facing_frequencies)
+        self.planner.periods[rows[:, None], cols[:, None], PLANNER_DOORS] = periods
+
+    def candidate_flags(self, index):
+        """Small candidates of the indexed doors as flags over 0..divisor_limit - 1, and whether t1 is a candidate
+        on top of them"""
+        values = self.divisor_values
+        first_open = self.first_open[index][..., None]
+        flags = ((values > 0) & (self.open_gcd[index][..., None] % np.maximum(values, 1) == 0)
+                 & (values * values <= first_open) & ~unpack_flags(self.closed_divisors[index]))
+        # t1 = 1 is already the small candidate 1
+        return flags, self.first_open_kept[index] & (self.first_open[index] > 1)
+
+    def get_frequencies(self, row, col, door_type):
+        """Sorted candidate frequencies of a door, empty while it was never seen open"""
+        if self.is_boundary[row, col, door_type] or not self.has_open[row, col, door_type]:
+            return []
+        flags, kept = self.candidate_flags((row, col, door_type))
+        frequencies = np.flatnonzero(flags).tolist()
+        if kept:
+            frequencies.append(int(self.first_open[row, col, door_type]))
+        return frequencies
 
     def update_pos(self, move):
-        self.memory[self.pos[0]][self.pos[1]].visited += 1
+        self.visited[self.pos[0], self.pos[1]] += 1
         if move == constants.LEFT:
             self.pos = (self.pos[0], self.pos[1] - 1)
         if move == constants.UP:
@@ -124,34 +295,31 @@ class PlayerMemory:
             self.pos = (self.pos[0], self.pos[1] + 1)
         if move == constants.DOWN:
             self.pos = (self.pos[0] + 1, self.pos[1])
-    	
+
     def get_boundary_coords(self):
         if self.boundary.is_boundary_fully_known():
             return self.boundary
 
-        # search for boundary
+        # Every boundary door of one side is on the same row or column, so any of them gives the bounds
         new_boundary = Boundary(-1, -1, -1, -1)
-        for y in range(len(self.memory)):
-            for x in range(len(self.memory[0])):
-                
-                if new_boundary.is_boundary_fully_known():
-                    self.boundary = new_boundary
-                    return new_boundary # We can break early if we have all the bounds
-                
-                if self.memory[y][x].doors[constants.LEFT].is_boundary:
-                    new_boundary.left = x
-                    new_boundary.right = x + 99
-                if self.memory[y][x].doors[constants.RIGHT].is_boundary:
-                    new_boundary.right = x
-                    new_boundary.left = x - 99
-                if self.memory[y][x].doors[constants.UP].is_boundary:
-                    new_boundary.up = y
-                    new_boundary.down = y + 99
-                if self.memory[y][x].doors[constants.DOWN].is_boundary:
-                    new_boundary.down = y
-                    new_boundary.up = y - 99
+        _, cols = np.nonzero(self.is_boundary[:, :, constants.LEFT])
+        if len(cols):
+            new_boundary.left = int(cols[0])
+            new_boundary.right = int(cols[0]) + 99
+        _, cols = np.nonzero(self.is_boundary[:, :, constants.RIGHT])
+        if len(cols):
+            new_boundary.right = int(cols[0])
+            new_boundary.left = int(cols[0]) - 99
+        rows, _ = np.nonzero(self.is_boundary[:, :, constants.UP])
+        if len(rows):
+            new_boundary.up = int(rows[0])
+            new_boundary.down = int(rows[0]) + 99
+        rows, _ = np.nonzero(self.is_boundary[:, :, constants.DOWN])
+        if len(rows):
+            new_boundary.down = int(rows[0])
+            new_boundary.up = int(rows[0]) - 99
         self.boundary = new_boundary
-        
+
         return self.boundary
     
 @dataclass
@@ -172,215 +340,33 @@ class Boundary:
 
 
 
-class MazeGraph:
-    def __init__(self, graph: dict = {}):
-        self.graph = graph  # A dictionary for the adjacency list
-        
-    def add_edge(self, node1: tuple, node2: tuple, weight: int):
-        if node1 not in self.graph:  # Check if the node is already added
-            self.graph[node1] = {}   # If not, create the node
-        self.graph[node1][node2] = weight  # Else, add a connection to its neighbor
-    
-    def add_bidirectional_edge(self, node1: tuple, node2: tuple, node1_door_freq: int, node2_door_freq: int):
-        """Adds an edge both ways between node1 and node2."""
-        self.add_edge(node1, node2, [node1_door_freq, node2_door_freq])
-        self.add_edge(node2, node1, [node2_door_freq, node1_door_freq])
-    
-    def getMazeDimension(self) -> int:
-        # Returns the dimension of the maze (assuming it is a square)
-        return int(len(self.graph) ** 0.5)
-    
-    def getNeighbors(self, node) -> dict[tuple, int]:
-        return self.graph[node]
-
-
-    def visualize_graph_in_grid(self, minDistanceArray=None, parent=None, startNode=None, targetNode=None, 
-                                row_slice=None, col_slice=None, figsize=30):
-        G = nx.Graph()
-
-        # Add nodes and edges from adjacency list
-        for node1, neighbors in self.graph.items():
-            for node2, weight in neighbors.items():
-                node1Freq, node2Freq = weight
-
-                # Calculate the edge weight
-                if node1Freq == 0 or node2Freq == 0:
-                    weight = float('inf')
-                else:
-                    # LCM is the combined frequency of the doors
-                    weight = lcm(node1Freq, node2Freq)
-
-                # Only add nodes and edges within the specified row/col slice
-                if row_slice and col_slice:
-                    if (node1[0] in row_slice and node1[1] in col_slice and
-                        node2[0] in row_slice and node2[1] in col_slice):
-                        G.add_edge(node1, node2, weight=weight)
-                else:
-                    G.add_edge(node1, node2, weight=weight)
-
-        grid_dim = len(self.graph) ** 0.5  # Square root of the number of nodes
-        grid_dim_int = int(grid_dim)  # Ensure square root is an integer for a square grid
-        plt.figure(figsize=(figsize, figsize))
-
-        # Define positions for nodes in a grid layout, restricted to the row and column slices
-        pos = {(i, j): (j, -i) for i in range(grid_dim_int) for j in range(grid_dim_int)
-            if (not row_slice or i in row_slice) and (not col_slice or j in col_slice)}
-
-        # Draw the graph in the grid layout
-        nx.draw(G, pos, with_labels=True, node_size=500, node_color='lightblue', font_size=10)
-
-        # Highlight the path if startNode and targetNode are provided
-        if minDistanceArray and parent and startNode and targetNode:
-            print(targetNode)
-            targetx, targety = targetNode
-            if minDistanceArray[targetx][targety] == float('inf'):
-                print(f"Target node {targetNode} is unreachable.")
-                return
-            path = reconstruct_path(parent, startNode, targetNode)
-
-            # Collect the edges in the path
-            path_edges = [(path[i], path[i + 1]) for i in range(len(path) - 1)]
-
-            # Get turn information for nodes in the path
-            path_turns = {node: parent[node][1] for node in path if node in parent}
-
-            # Highlight the path nodes in a different color
-            nx.draw_networkx_nodes(G, pos, nodelist=path, node_color='yellow', node_size=700)
-
-            # Draw the edges in the path with arrows, direction, and increased width
-            nx.draw_networkx_edges(G, pos, edgelist=path_edges, edge_color='red', width=3, arrows=True)
-
-            # Label the nodes with the turn number
-            for node, (x, y) in pos.items():
-                if node in path_turns:
-                    plt.text(x, y + 0.1, f"Turn {path_turns[node]}", fontsize=9, ha='center', color='blue')
-
-        # Draw edge labels (combined frequency of the adjacent doors)
-        edge_labels = nx.get_edge_attributes(G, 'weight')
-        nx.draw_networkx_edge_labels(G, pos, edge_labels=edge_labels)
-
-        print("Making graph")
-        plt.savefig("graph.png", format="png", dpi=300)
-        # plt.show()
-        
-def reconstruct_path(parent, targetNode):
-    """Helper function to reconstruct the path from startNode to targetNode using the parent dictionary."""
-    path = []
-    # we are storing y, x in startNode (if y is row and x is xol...)
-    currentNode = targetNode
-    while currentNode is not None:
-        if currentNode not in parent:
-            print("Target Node is unreachable")
-            return None # TargetNode is unreachable
-        path.append(currentNode)
-        currentNode = parent.get(currentNode)[0]  # Get the parent node
-    path.reverse()  # Reverse the path to get it from start to target
+def reconstruct_planner_path(result, targetNode):
+    """Path of cells from the start of a search of PlayerMemory.planner to targetNode, None if it wasn't reached"""
+    targetNode = tuple(targetNode)
+    rows, cols = result.shape
+    if not (0 <= targetNode[0] < rows and 0 <= targetNode[1] < cols) or not result.is_reached(targetNode):
+        print("Target Node is unreachable")
+        return None
+    path = [result.source]
+    for door_type in result.moves(targetNode):
+        # planner LEFT, UP, RIGHT, DOWN move along our rows and cols
+        row, col = path[-1]
+        path.append((row + (-1, 0, 1, 0)[door_type], col + (0, -1, 0, 1)[door_type]))
     return path
 
-def build_graph_from_memory(player_memory: PlayerMemory, use_max=False) -> MazeGraph:
-    graph = MazeGraph()
-
-    # Iterate through the map_memory and add edges to the graph
-    # use_max will make the heuristic assume worst case door frequency
-    for y in range(len(player_memory.memory)): # i is the row index (basically y)
-        for x in range(len(player_memory.memory[0])): # j is the column index (basically x)
-            currMemSquare: MemorySquare = player_memory.memory[y][x]
-
-            # Coordinates for neighboring cells
-            neighbors = {
-                'left': (y, x-1),
-                'right': (y, x+1),
-                'up': (y-1, x),
-                'down': (y+1, x)
-            }            
-            # Left neighbor exists 
-            if x > 0:
-                leftSquare: MemorySquare = player_memory.memory[y][x - 1]
-                graph.add_bidirectional_edge((y, x), neighbors['left'],
-                                                currMemSquare.doors[constants.LEFT].roll_freq(use_max),
-                                                leftSquare.doors[constants.RIGHT].roll_freq(use_max))
-
-            # Right neighbor exists 
-            if x < len(player_memory.memory[0]) - 1:  
-                rightSquare: MemorySquare = player_memory.memory[y][x + 1]
-                graph.add_bidirectional_edge((y, x), neighbors['right'],
-                                                currMemSquare.doors[constants.RIGHT].roll_freq(use_max),
-                                                rightSquare.doors[constants.LEFT].roll_freq(use_max))
-            
-            # Up neighbor exists 
-            if y > 0: 
-                upSquare: MemorySquare = player_memory.memory[y - 1][x]
-                graph.add_bidirectional_edge((y, x), neighbors['up'],
-                                                currMemSquare.doors[constants.UP].roll_freq(use_max),
-                                                upSquare.doors[constants.DOWN].roll_freq(use_max))
-            
-            # Down neighbor exists
-            if y < len(player_memory.memory) - 1:
-                downSquare: MemorySquare = player_memory.memory[y + 1][x]
-                graph.add_bidirectional_edge((y, x), neighbors['down'],
-                                                currMemSquare.doors[constants.DOWN].roll_freq(use_max),
-                                                downSquare.doors[constants.UP].roll_freq(use_max))
-
-    return graph
-
-
-def findShortestPathsToEachNode(graph: MazeGraph, startNode: tuple, turnNumber: int):
-    dimension = graph.getMazeDimension()
-
-    # Initialize the minDistanceArray with infinity
-    minDistanceArray = [[float('inf')] * dimension for _ in range(dimension)]
-    minDistanceArray[startNode[0]][startNode[1]] = 0  # Start node has distance 0
-
-    # Initialize the parent dictionary to track the shortest path and the turn when we moved to this node
-    # parent[(x, y)] = (parentNode, turnWeMovedToNode)
-    parent = {startNode: (None, turnNumber)}  # Initially at startNode at the given turnNumber
-
-    # Min-heap stores (distance, (x, y) node)
-    minHeap = [(0, startNode)]  # Start node with distance 0
-
-    visitedNodes = set()
-
-    # Process the heap until it is empty
-    while minHeap:
-        turnsToCurrentNode, currentNode = heapq.heappop(minHeap)
-        # currentXCoord, currentYCoord = currentNode         print("visiting: ", currentNode)
-
-        # Skip node if already visited
-        if currentNode in visitedNodes:
-            continue
-
-        visitedNodes.add(currentNode)
-
-        # Get neighbors of the current node from the graph
-        neighbors: dict[tuple, tuple] = graph.getNeighbors(currentNode)
-
-
-        for (yCoordNeighbour, xCoordNeighbour), (node1Freq, node2Freq) in neighbors.items():
-            # Combined Frequency of the doors
-            if node1Freq == 0 or node2Freq == 0:
-                combinedFrequencey = float('inf')
-            else:
-                # LCM is the combined frequency of the doors
-                combinedFrequencey = lcm(node1Freq, node2Freq)
-    
-            # Determine the turn number when we reach this node
-            turnWeWillBeAtThisNode = turnNumber + turnsToCurrentNode
-
-            # Calculate the number of turns we need to wait for the door to open
-            turnsToWait = (combinedFrequencey - (turnWeWillBeAtThisNode % combinedFrequencey)) % combinedFrequencey
-            # at the node at turn 19. 19 % 12 = 7... 12 -7 = 5  % combinedFrequencey = 5
-
-            newTurnsToGetToNeighbor = turnsToCurrentNode + turnsToWait + 1
 
-            # Update the neighbor's distance if a shorter path is found
-            if newTurnsToGetToNeighbor < minDistanceArray[yCoordNeighbour][xCoordNeighbour]:
-                minDistanceArray[yCoordNeighbour][xCoordNeighbour] = newTurnsToGetToNeighbor
-                # Store both the parent node and the turn at which we moved to this neighbor
-                parent[(yCoordNeighbour, xCoordNeighbour)] = (currentNode, turnWeWillBeAtThisNode + turnsToWait + 1)
-                heapq.heappush(minHeap, (newTurnsToGetToNeighbor, (yCoordNeighbour, xCoordNeighbour)))
+def findShortestPathsFromMemory(player_memory: PlayerMemory, startNode: tuple, turnNumber: int):
+    """Turns to reach every cell from startNode, waiting at each edge for a multiple of its period
 
-    return minDistanceArray, parent  # Return both distances and paths
+        Crossing from a cell reached `d` turns in waits for the next multiple of the edge period not before
+        turnNumber + d, then takes one turn, which is the planner's next multiple after turnNumber - 1 + d.
 
+        Returns:
+            Tuple[np.ndarray, SearchResult]: (rows, cols) array of turns to reach every cell, inf if it can't
+                be reached, and the search to read the paths from
+    """
+    result = player_memory.planner.search(startNode, turnNumber - 1)
+    return result.arrival - (turnNumber - 1), result
 
 
 def is_move_valid(move, state):
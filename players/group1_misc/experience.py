@@ -2,6 +2,7 @@
 import constants
 import random
 import numpy as np
+from information_gain import InformationGainMap, disk_shift_offsets
 
 
 class Experience:
@@ -24,9 +25,24 @@ class Experience:
             0,
         )  # (x, y) coordinates relative to the original start position
         self.maze_dimension = 100  # size of the maze
-        self.seen_cells = (
-            set()
-        )  # set of tuples (x, y) storing coordinates of cells relative to the original start position
+        # seen cells as a boolean grid indexed by (x + grid_offset, y + grid_offset), coordinates relative
+        # to the original start position, large enough for the view of any cell next to the maze
+        self.grid_offset = self.maze_dimension + self.r
+        self.information_gain = InformationGainMap(
+            (2 * self.grid_offset + 1, 2 * self.grid_offset + 1), self.r
+        )
+        self.seen_cells = self.information_gain.seen
+        # cells entering and leaving the view when moving one step in each direction, as (x, y) offsets
+        # from the position moved from
+        self.view_shifts = {
+            direction: disk_shift_offsets(self.r, (dx, dy))
+            for dx, dy, direction in [
+                (-1, 0, constants.LEFT),
+                (0, -1, constants.UP),
+                (1, 0, constants.RIGHT),
+                (0, 1, constants.DOWN),
+            ]
+        }
         self.walls = (
             float("inf"),
             float("inf"),
@@ -54,25 +70,17 @@ class Experience:
             self.direction_vector_multiplier * self.num_turns,
         )  # update direction vector weight
 
-        # initialize coordinates for the maximum field of view relative to current position
-        right, top, left, bottom = 0, 0, 0, 0
-
-        for cell in current_percept.maze_state:
-
-            # update field of view coordinates relative to current position
-            right, top, left, bottom = (
-                max(right, cell[0]),
-                max(top, cell[1]),
-                min(left, cell[0]),
-                min(bottom, cell[1]),
-            )
+        # maximum field of view coordinates relative to current position
+        cells = np.asarray(current_percept.maze_state, dtype=np.int64).reshape(-1, 4)
+        right, top = max(int(cells[:, 0].max()), 0), max(int(cells[:, 1].max()), 0)
+        left, bottom = min(int(cells[:, 0].min()), 0), min(int(cells[:, 1].min()), 0)
 
-            cell = (
-                self.cur_pos[0] + cell[0],
-                self.cur_pos[1] + cell[1],
+        self.information_gain.mark_seen(
+            (
+                self.cur_pos[0] + self.grid_offset + cells[:, 0],
+                self.cur_pos[1] + self.grid_offset + cells[:, 1],
             )
-            if cell not in self.seen_cells:
-                self.seen_cells.add(cell)
+        )
 
         # update walls coordinates relative to the original start position
         # TODO: infer left wall from right wall, and bottom wall from top wall
@@ -112,7 +120,7 @@ class Experience:
         #     f"Best move: {'WAIT' if move == constants.WAIT else 'LEFT' if move == constants.LEFT else 'UP' if move == constants.UP else 'RIGHT' if move == constants.RIGHT else 'DOWN'}"
         # )
         # print(f"Walls: {self.walls}")
-        # print(f"Number of seen cells: {len(self.seen_cells)}")
+        # print(f"Number of seen cells: {np.count_nonzero(self.seen_cells)}")
         # print("\n")
 
         if self.is_valid_move(current_percept, move):
@@ -125,25 +133,39 @@ class Experience:
         """Increment the number of times the player has waited"""
         self.stays[self.cur_pos] = self.stays.get(self.cur_pos, 0) + 1
 
+    def is_seen(self, x, y):
+        """Whether the cell at (x, y) relative to the original start position was seen"""
+        i, j = x + self.grid_offset, y + self.grid_offset
+        grid_len = 2 * self.grid_offset + 1
+        return 0 <= i < grid_len and 0 <= j < grid_len and bool(self.seen_cells[i, j])
+
     def get_direction_vector(self):
-        direction_vector = [0, 0]  # [x, y]
-        for x in range(
+        xs = np.arange(
             max(self.cur_pos[0] - self.direction_vector_pov_radius, self.walls[2]),
             min(self.cur_pos[0] + self.direction_vector_pov_radius, self.walls[0]),
-        ):
-            for y in range(
-                max(self.cur_pos[1] - self.direction_vector_pov_radius, self.walls[3]),
-                min(
-                    self.cur_pos[1] + self.direction_vector_pov_radius + 1,
-                    self.walls[1],
-                ),
-            ):
-                if (x, y) not in self.seen_cells:
-                    direction = (x - self.cur_pos[0], y - self.cur_pos[1])
-                    if direction[0] != 0:
-                        direction_vector[0] += 1 / direction[0]
-                    if direction[1] != 0:
-                        direction_vector[1] += 1 / direction[1]
+        )
+        ys = np.arange(
+            max(self.cur_pos[1] - self.direction_vector_pov_radius, self.walls[3]),
+            min(
+                self.cur_pos[1] + self.direction_vector_pov_radius + 1,
+                self.walls[1],
+            ),
+        )
+        xs, ys = np.meshgrid(xs, ys, indexing="ij")
+
+        # the window can reach past the grid, cells out of it were never seen
+        i, j = xs + self.grid_offset, ys + self.grid_offset
+        grid_len = 2 * self.grid_offset + 1
+        inside = (i >= 0) & (i < grid_len) & (j >= 0) & (j < grid_len)
+        unseen = ~inside
+        unseen[inside] = ~self.seen_cells[i[inside], j[inside]]
+
+        # sum 1 / direction of the unseen cells in x then y order, cumsum adding them one by one like a loop
+        direction_vector = [0, 0]  # [x, y]
+        for axis, offsets in enumerate((xs - self.cur_pos[0], ys - self.cur_pos[1])):
+            offsets = offsets[unseen & (offsets != 0)]
+            if len(offsets):
+                direction_vector[axis] = float(np.cumsum(1 / offsets)[-1])
 
         # Normalize and add weight to direction vector
         norm = np.linalg.norm(direction_vector)
@@ -228,6 +250,7 @@ class Experience:
             list: list of scores for each move (LEFT, UP, RIGHT, DOWN)
         """
         move_scores = [0, 0, 0, 0]
+        num_new_cells_per_move = self.get_num_new_cells_per_move()
 
         # Define the corners based on walls
         corners = [
@@ -245,7 +268,7 @@ class Experience:
         ]:
             new_x = self.cur_pos[0] + dx
             new_y = self.cur_pos[1] + dy
-            num_new_cells = self.get_num_new_cells(new_x, new_y)
+            num_new_cells = num_new_cells_per_move[direction]
 
             # Score for the number of new cells seen
             move_scores[direction] = num_new_cells
@@ -254,7 +277,7 @@ class Experience:
             for corner in corners:
                 corner_x, corner_y = corner
                 if abs(corner_x - new_x) <= self.r and abs(corner_y - new_y) <= self.r:
-                    if corner not in self.seen_cells:
+                    if not self.is_seen(corner_x, corner_y):
                         move_scores[direction] += 5  # Extra score for visible unvisited corners
 
             # Adjust for distance to walls and hugging behavior
@@ -299,16 +322,54 @@ class Experience:
             int: number of new cells seen at the new position
         """
 
-        num_new_cells = 0
-        for dx in range(-self.r, self.r + 1):
-            for dy in range(-self.r, self.r + 1):
-                if dx**2 + dy**2 <= self.r**2:
-                    if (x + dx, y + dy) not in self.seen_cells and (
-                        self.walls[2] <= x + dx <= self.walls[0]
-                        and self.walls[3] <= y + dy <= self.walls[1]
-                    ):
-                        num_new_cells += 1
-        return num_new_cells
+        return self.information_gain.gain(
+            x + self.grid_offset, y + self.grid_offset, self.get_wall_bounds()
+        )
+
+    def get_wall_bounds(self):
+        """Index bounds of the cells within the walls on the seen cells grid"""
+        grid_len = 2 * self.grid_offset + 1
+        bounds = []
+        for low, high in ((self.walls[2], self.walls[0]), (self.walls[3], self.walls[1])):
+            bounds.append(
+                (
+                    int(max(low + self.grid_offset, 0)),
+                    int(min(high + self.grid_offset, grid_len - 1)),
+                )
+            )
+        return tuple(bounds)
+
+    def get_num_new_cells_per_move(self):
+        """Get the number of new cells seen after moving one step in each direction
+
+        The view after a move is the current view with the cells entering it added and the cells leaving it
+        removed, both O(r), so only the current view is counted over the whole disk.
+
+        Returns:
+            list: number of new cells seen for each move (LEFT, UP, RIGHT, DOWN)
+        """
+        num_new_cells = self.get_num_new_cells(self.cur_pos[0], self.cur_pos[1])
+        num_new_cells_per_move = [0, 0, 0, 0]
+        for direction, (entering, leaving) in self.view_shifts.items():
+            num_new_cells_per_move[direction] = (
+                num_new_cells
+                + self.count_new_cells(entering)
+                - self.count_new_cells(leaving)
+            )
+        return num_new_cells_per_move
+
+    def count_new_cells(self, offsets):
+        """Number of cells at `offsets` from the current position which are unseen and within the walls"""
+        xs = self.cur_pos[0] + offsets[:, 0]
+        ys = self.cur_pos[1] + offsets[:, 1]
+        within_walls = (
+            (self.walls[2] <= xs)
+            & (xs <= self.walls[0])
+            & (self.walls[3] <= ys)
+            & (ys <= self.walls[1])
+        )
+        unseen = ~self.seen_cells[xs + self.grid_offset, ys + self.grid_offset]
+        return int(np.count_nonzero(unseen & within_walls))
 
     # TODO: This function can be sped up by decreasing the number iterations
     def is_valid_move(self, current_percept, move):
@@ -3,7 +3,6 @@ from typing import List
 import constants
 
 from players.group5.player_map import PlayerMapInterface
-from players.group5.door import DoorIdentifier
 
 class ConvergeStrategy:
 	def __init__(self, cur_pos: List[int], goal: List[List[int]], turn: int, player_map: PlayerMapInterface, max_door_frequency: int) -> int:
@@ -25,90 +24,81 @@ class ConvergeStrategy:
 def dyjkstra(current_pos : list, goal : list[list[int]], turn : int, player_map: PlayerMapInterface,  max_door_frequency) -> list:
 	turn = turn - 1
 
+	# Cells are handled by their integer ids, the ids keep the order of the coordinates so that ties in the queue
+	# are broken like with coordinate lists
+	neighbor_offsets = player_map.get_neighbor_id_offsets()
+	get_wall_waits = player_map.get_wall_waits
+	# ids are x * grid_len + y, shifted so that the coordinates start at -1
+	grid_len = neighbor_offsets[constants.RIGHT]
+
+	# cells past the boundaries never have a door that opens, and the coordinates go from -1 to the map length
+	left, up, right, down = player_map.get_boundaries()
+	left, up, right, down = max(left, -1), max(up, -1), min(right, grid_len - 2), min(down, grid_len - 2)
+
+	start = player_map.get_cell_id(current_pos)
+	goal_ids = {player_map.get_cell_id(cell) for cell in goal if -1 <= cell[0] <= grid_len - 2 and -1 <= cell[1] <= grid_len - 2}
+
 	# Create a priority queue
-	queue = []
-	heapq.heappush(queue, (0, current_pos, turn))
+	queue = [(0, start, turn)]
 
 	# Create a dictionary to store the cost of each position
-	costs = {tuple(current_pos): 0}
+	costs = {start: 0}
 
 	# Create a set to store visited positions
 	visited = set()
 
-	# Create a dictionary to store the path to each position
-	paths = {tuple(current_pos): []}
-
-	# Create a dictionary to store the turns for each position
-	turns = {tuple(current_pos): turn}
+	# Parent cell and move of each position, the path is only built for the goal
+	parents = {}
 
 	# While there are positions to explore
 	while queue:
 		# Get the position with the lowest cost
-		current_cost, current_pos, expected_turn  = heapq.heappop(queue)
+		current_cost, current, expected_turn = heapq.heappop(queue)
 
 		# If we have reached the goal, return the path
-		if current_pos in goal:
-      
-			return paths[tuple(current_pos)]
+		if current in goal_ids:
+			path = []
+			while current != start:
+				current, move = parents[current]
+				path.append(move)
+			path.reverse()
+			return path
 
 		# If we have already visited this position, skip it
-		if tuple(current_pos) in visited:
+		if current in visited:
 			continue
 
 		# Mark the position as visited
-		visited.add(tuple(current_pos))
+		visited.add(current)
+
+		x, y = divmod(current, grid_len)
+		x, y = x - 1, y - 1
+		if not (left <= x <= right and up <= y <= down):
+			continue  # the doors of a cell out of bound never open
 
 		# Explore the neighbors
 		for move in [constants.UP, constants.DOWN, constants.RIGHT, constants.LEFT]:
+			neighbor = current + neighbor_offsets[move]
+			if neighbor in visited:
+				continue
 
-			if move == constants.LEFT:
-				neighbor = [current_pos[0] - 1, current_pos[1]]
-				door = DoorIdentifier(
-					absolute_coord=[current_pos[0], current_pos[1]],
-					door_type=constants.LEFT,
-				)
-			elif move == constants.UP:
-				neighbor = [current_pos[0], current_pos[1] - 1]
-				door = DoorIdentifier(
-					absolute_coord=[current_pos[0], current_pos[1]], 
-					door_type=constants.UP,
-				)
-			elif move == constants.RIGHT:
-				neighbor = [current_pos[0] + 1, current_pos[1]]
-				door = DoorIdentifier(
-					absolute_coord=[current_pos[0], current_pos[1]], 
-					door_type=constants.RIGHT,
-				)
-			elif move == constants.DOWN:
-				neighbor = [current_pos[0], current_pos[1] + 1]
-				door = DoorIdentifier(
-					absolute_coord=[current_pos[0], current_pos[1]], 
-					door_type=constants.DOWN,
-				)
-
-			# Calculate the cost of the neighbor
-			# TODO make a special function that calculates based on observations of wall intervals
-			# weight, new_expected_turn = add_weight(current_pos, neighbor, player_map.get_wall_freq_candidates(door), expected_turn)
-
-			# print("current_pos: ", current_pos)
-			# print("neighbor: ", neighbor)
-			# print("door: ", door)
-
-			weight, new_expected_turn = calculate_weighted_average(expected_turn, player_map.get_wall_freq_candidates(door), max_door_frequency)
-
-			# print ("weight: ", weight)
-
-			if weight == 1e20:
-				# print("SKIPPED MOVE: ", move)
+			if move == constants.LEFT and x - 1 < left or move == constants.RIGHT and x + 1 > right \
+					or move == constants.UP and y - 1 < up or move == constants.DOWN and y + 1 > down:
+				continue  # Skip this move if the touching door is out of bound
+
+			wall_waits = get_wall_waits(current, move)
+			if wall_waits is None:
 				continue  # Skip this move if the door is closed
-			
+
+			# The distance to the next opening of the wall from expected_turn
+			weight = wall_waits.waits(expected_turn + 1)[0] + 1
 			new_cost = current_cost + weight
 
 			# If the neighbor has not been visited or the new cost is lower, update the cost and add it to the queue
-			if tuple(neighbor) not in visited and (tuple(neighbor) not in costs or new_cost < costs[tuple(neighbor)]):
-				costs[tuple(neighbor)] = new_cost
-				paths[tuple(neighbor)] = paths[tuple(current_pos)] + [move]
-				heapq.heappush(queue, (new_cost, neighbor, new_expected_turn))
+			if neighbor not in costs or new_cost < costs[neighbor]:
+				costs[neighbor] = new_cost
+				parents[neighbor] = (current, move)
+				heapq.heappush(queue, (new_cost, neighbor, round(weight) + expected_turn))
 
 	# If we reach here, it means we could not find a path to the goal
 	return None
@@ -121,41 +111,3 @@ def dyjkstra(current_pos : list, goal : list[list[int]], turn : int, player_map:
 # def compute_unobserved_door_weight() -> int:
 	# calculates the likelihood of doors being open and average wait expected
 	return 0
-
-def calculate_weighted_average(current_turn, candidates, max_door_frequency):
-
-    """
-    Calculate a weighted average cost for traversing a door based on the current turn
-    and the candidate turns when the door might open. Also return the expected turn.
-
-    Parameters:
-    - current_turn (int): The current turn.
-    - candidates (list): A list of candidate turns when the door might open.
-
-    Returns:
-    - average_weight (float): The weighted average cost for passing through the door.
-    - expected_turn (int): The next expected turn when the door will open.
-    """
-
-    # print(candidates)
-
-    if all(candidate == 0 for candidate in candidates):
-        return 1e20, current_turn + 1e20
-
-    weights = []
-    total_weight = 0
-    weighted_sum = 0
-    next_expected_turn = None
-    avg_distance = 0
-
-    for candidate in candidates:
-        if candidate == 0:
-            candidate = max_door_frequency
-		
-        distance = candidate - (current_turn % candidate)
-        avg_distance += distance
-
-
-    avg_distance /= len(candidates)
-
-    return avg_distance, round(avg_distance) + current_turn
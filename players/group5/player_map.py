@@ -1,12 +1,15 @@
 from abc import ABC, abstractmethod
-from collections import defaultdict
 import logging
 import math
 import os
 from typing import List, Optional, Set, Tuple
 
+import numpy as np
+
 import constants
-from players.group5.door import DoorIdentifier, get_updated_frequency_candidates
+from door_wait import PairWaits, can_open, frequency_mask, get_wait_table, mask_frequencies
+from frequency_inference import FrequencyCandidates
+from players.group5.door import DoorIdentifier
 from players.group5.util import setup_file_logger
 from timing_maze_state import TimingMazeState
 
@@ -62,6 +65,50 @@ class PlayerMapInterface(ABC):
         """
         pass
 
+    @abstractmethod
+    def get_wall_freq_masks(self, door_id: DoorIdentifier) -> Tuple[int, int]:
+        """Function which returns the frequency candidates of the given door and its touching door as bitmasks
+
+            Args:
+                door_id (DoorIdentifier): DoorIdentifier object containing the relative coordinates and door type
+            Returns:
+                Tuple[int, int]: Bitmasks of the door and touching door frequency candidates (bit n for frequency n)
+        """
+        pass
+
+    @abstractmethod
+    def get_cell_id(self, coord: List[int]) -> int:
+        """Function which returns the integer id of a cell, used by the searches instead of coordinate lists
+
+            Args:
+                coord (List[int]): x and y coordinates of the cell, between -1 and the map length (inclusive)
+            Returns:
+                int: Id of the cell, ids are ordered like the coordinates they stand for
+        """
+        pass
+
+    @abstractmethod
+    def get_cell_coord(self, cell: int) -> List[int]:
+        """Function which returns the coordinates of the cell with the given id (inverse of get_cell_id)"""
+        pass
+
+    @abstractmethod
+    def get_neighbor_id_offsets(self) -> List[int]:
+        """Function which returns, for each door type, the difference between the ids of a cell and of the cell behind that door"""
+        pass
+
+    @abstractmethod
+    def get_wall_waits(self, cell: int, door_type: int) -> Optional[PairWaits]:
+        """Function which returns the waits before the given door and its touching door are open together, regardless of the boundaries
+
+            Args:
+                cell (int): Id of the cell of the door
+                door_type (int): Type of the door
+            Returns:
+                Optional[PairWaits]: Waits of the wall (see door_wait.PairWaits), None if the wall can never be crossed
+        """
+        pass
+
     @abstractmethod
     def update_map(self, turn_num: int, percept: TimingMazeState):  # TODO: check type of maze_state
         """Function which updates the map with the given maze state
@@ -99,15 +146,11 @@ class PlayerMapInterface(ABC):
         """
         pass
 
-# TODO: check this
-def default_freq_candidates(max_door_frequency: int):
-    # generate a set of door frequencies from 0 to max_door_frequency
-    return lambda: set(range(max_door_frequency+1))
-
-
 """
 StartPosCentricPlayerMap is similar to SimplePlayerCentricMap but is not centric on the user's current position but rather the first start position which we assign to a constant coordinate (i.e., it receives/outputs start position-centric coordinate data). 
 In the SimplePlayerCentricMap, the player was always at (0,0). This is not the case in the StartPosCentricPlayerMap.
+
+Door data is kept in preallocated (GLOBAL_MAP_LEN, GLOBAL_MAP_LEN, 4) arrays indexed by map coordinates and door type: the last seen status of every door, and its frequency candidates as bitmasks (bit n for frequency n) in a FrequencyCandidates.
 """
 class StartPosCentricPlayerMap(PlayerMapInterface):
     def __init__(self, max_door_frequency: int, logger: logging.Logger, map_dim: int = constants.map_dim):
@@ -122,8 +165,22 @@ class StartPosCentricPlayerMap(PlayerMapInterface):
         self._boundaries = [-1, -1, self._GLOBAL_MAP_LEN, self._GLOBAL_MAP_LEN]  # will be set to last cell whose outer wall is a boundary
         self._prev_start_ref = [0,0]  # TODO: rename. currently functional.
 
-        self._door_freqs = defaultdict(default_freq_candidates(max_door_frequency))
-        self._door_status = defaultdict(int)
+        self._door_freqs = FrequencyCandidates(max_door_frequency, shape=(self._GLOBAL_MAP_LEN, self._GLOBAL_MAP_LEN))
+        self._door_status = np.full((self._GLOBAL_MAP_LEN, self._GLOBAL_MAP_LEN, 4), constants.UNKNOWN, dtype=np.int8)
+        self._NEVER_OPEN_MASK = frequency_mask({0})
+        self._UNSEEN_MASK = frequency_mask(range(max_door_frequency + 1))
+
+        # Waits of every wall, computed when first needed and reset when one of its doors changes. Cells are numbered
+        # over the map padded by one cell on each side, i.e. the coordinates from -1 to the map length that the
+        # boundaries allow before they are found
+        self._CELL_GRID_LEN = self._GLOBAL_MAP_LEN + 2
+        self._NEIGHBOR_ID_OFFSETS = [0] * 4
+        self._NEIGHBOR_ID_OFFSETS[constants.LEFT] = -self._CELL_GRID_LEN
+        self._NEIGHBOR_ID_OFFSETS[constants.UP] = -1
+        self._NEIGHBOR_ID_OFFSETS[constants.RIGHT] = self._CELL_GRID_LEN
+        self._NEIGHBOR_ID_OFFSETS[constants.DOWN] = 1
+        self._wall_waits = [None] * (self._CELL_GRID_LEN * self._CELL_GRID_LEN * 4)
+        self._wait_table = get_wait_table(max_door_frequency)
         
         self.turn_num = 0
         self.cur_pos = self._START_POS  # (x, y) start pos centric
@@ -157,24 +214,64 @@ class StartPosCentricPlayerMap(PlayerMapInterface):
     
     def set_boundaries(self, boundaries: List[int]):
         self._boundaries = boundaries
-    
-    def _door_dictkey(self, map_coords, door_type) -> List[int]:
-        return f"({map_coords[0]},{map_coords[1]})_{door_type}"
 
-    def _get_freq_candidates_usecase(self, coord, door_type) -> Set[int]:
+    def _is_in_map(self, coord) -> bool:
+        return 0 <= coord[0] < self._GLOBAL_MAP_LEN and 0 <= coord[1] < self._GLOBAL_MAP_LEN
+
+    def _get_freq_mask_usecase(self, coord, door_type) -> int:
         if self._is_out_of_bound(coord):
-            return {0}
+            return self._NEVER_OPEN_MASK
+
+        # cells past the map are never seen, but are only known not to exist once the boundary is found
+        if not self._is_in_map(coord):
+            return self._UNSEEN_MASK
+
+        return self._door_freqs.get_mask(coord[0], coord[1], door_type)
+
+    def _get_raw_freq_mask(self, coord, door_type) -> int:
+        if not self._is_in_map(coord):
+            return self._UNSEEN_MASK
+        return self._door_freqs.get_mask(coord[0], coord[1], door_type)
+
+    def get_cell_id(self, coord: List[int]) -> int:
+        return (coord[0] + 1) * self._CELL_GRID_LEN + coord[1] + 1
+
+    def get_cell_coord(self, cell: int) -> List[int]:
+        x, y = divmod(cell, self._CELL_GRID_LEN)
+        return [x - 1, y - 1]
+
+    def get_neighbor_id_offsets(self) -> List[int]:
+        return self._NEIGHBOR_ID_OFFSETS
+
+    def get_wall_waits(self, cell: int, door_type: int) -> Optional[PairWaits]:
+        edge = cell * 4 + door_type
+        waits = self._wall_waits[edge]
+        if waits is None:
+            coord = self.get_cell_coord(cell)
+            touching_door_offset, touching_door_type = self._TOUCHING_DOORS[door_type]
+            touching_door_coord = [coord[0] + touching_door_offset[0], coord[1] + touching_door_offset[1]]
+            door_mask = self._get_raw_freq_mask(coord, door_type)
+            touching_door_mask = self._get_raw_freq_mask(touching_door_coord, touching_door_type)
+
+            waits = self._wait_table.get(door_mask, touching_door_mask) if can_open(door_mask, touching_door_mask) else False
+            self._wall_waits[edge] = waits
+            touching_edge = (cell + self._NEIGHBOR_ID_OFFSETS[door_type]) * 4 + touching_door_type
+            if 0 <= touching_edge < len(self._wall_waits):
+                self._wall_waits[touching_edge] = waits
+        return waits or None
+
+    def _reset_wall_waits(self, xs: np.ndarray, ys: np.ndarray, door_types: np.ndarray):
+        cells = (xs + 1) * self._CELL_GRID_LEN + ys + 1
+        touching_cells = cells + np.array(self._NEIGHBOR_ID_OFFSETS)[door_types]
+        for edge in np.concatenate([cells * 4 + door_types, touching_cells * 4 + (door_types + 2) % 4]).tolist():
+            self._wall_waits[edge] = None
 
-        key = self._door_dictkey(map_coords=coord, door_type=door_type)
-        return self._door_freqs[key]
+    def _get_freq_candidates_usecase(self, coord, door_type) -> Set[int]:
+        return set(mask_frequencies(self._get_freq_mask_usecase(coord, door_type)))
 
     def get_freq_candidates(self, door_id: DoorIdentifier) -> Set[int]:
         return self._get_freq_candidates_usecase(door_id.absolute_coord, door_id.door_type)
     
-    def _set_freq_candidates_usecase(self, coord, door_type, freq_candidates: Set[int]):
-        key = self._door_dictkey(map_coords=coord, door_type=door_type)
-        self._door_freqs[key] = freq_candidates
-    
     def _is_boundary_found(self, dir: int) -> bool:
         BOUNDARY_NOT_FOUND_VALUES = {-1, self._GLOBAL_MAP_LEN}
         return self._boundaries[dir] not in BOUNDARY_NOT_FOUND_VALUES
@@ -204,49 +301,61 @@ class StartPosCentricPlayerMap(PlayerMapInterface):
         self._prev_start_ref = new_start_ref
 
     def update_door_status(self, coord: List[int], door_type: int, door_state: int):
-        key = self._door_dictkey(map_coords=coord, door_type=door_type)
+        if self._is_in_map(coord):
+            self._door_status[coord[0], coord[1], door_type] = door_state
 
-        # self.logger.debug(f"Updating door status for {key} to {door_state}") if coord[0] == 90 and coord[1] == 99 else None
-        self._door_status[key] = door_state
+    def _get_door_status(self, coord: List[int], door_type: int) -> int:
+        if not self._is_in_map(coord):
+            return constants.UNKNOWN
+        return self._door_status[coord[0], coord[1], door_type]
 
     def update_map(self, turn_num: int, percept: TimingMazeState):
         self.turn_num = turn_num
         self._update_cur_pos([percept.start_x, percept.start_y])
 
         # self.logger.debug(f"!!!!Updating map for turn {turn_num}")
-        for door in percept.maze_state:
-            player_relative_coordinates, door_type, door_state = door[:2], door[2], door[3]
-            # self.logger.debug(f">percept_coords: {player_relative_coordinates}, {door_type}, {door_state} ; cur_pos {self.cur_pos}") if door_state == constants.CLOSED else None
-
-            # self.logger.debug(f"Door seen in percept: {player_relative_coordinates}, {door_type}, {door_state}") if player_relative_coordinates[0] == 90 and player_relative_coordinates[1] == 99 else None
-
-            coord = self._get_map_coordinates(player_relative_coordinates)
-
-            # update boundaries if newly found
-            # self.logger.debug(f"boundary found!!!") if door_state == constants.BOUNDARY and door_type == constants.UP else None
-            if door_state == constants.BOUNDARY and not self._is_boundary_found(door_type):
-                self._update_boundaries(door_type, coord)
+        if len(percept.maze_state) == 0:
+            return
+
+        # update frequencies of every door of the percept at once
+        doors = np.asarray(percept.maze_state, dtype=np.int64).reshape(-1, 4)
+        xs, ys, door_types, door_states = doors[:, 0] + self.cur_pos[0], doors[:, 1] + self.cur_pos[1], doors[:, 2], doors[:, 3]
+        inside = (xs >= 0) & (xs < self._GLOBAL_MAP_LEN) & (ys >= 0) & (ys < self._GLOBAL_MAP_LEN)
+        xs, ys, door_types = xs[inside], ys[inside], door_types[inside]
+
+        previous_masks = self._door_freqs.candidates[xs, ys, door_types]
+        self._door_freqs.apply(xs, ys, door_types, door_states[inside], turn_num)
+        changed = (self._door_freqs.candidates[xs, ys, door_types] != previous_masks).any(axis=-1)
+        self._reset_wall_waits(xs[changed], ys[changed], door_types[changed])
+
+        self._door_status[xs, ys, door_types] = door_states[inside]
+
+        # update boundaries if newly found, in percept order
+        for index in np.flatnonzero(door_states == constants.BOUNDARY):
+            door_type = int(doors[index, 2])
+            if not self._is_boundary_found(door_type):
+                self._update_boundaries(door_type, self._get_map_coordinates(doors[index, :2].tolist()))
                 # self.logger.debug(f"Boundaries updated: {self._boundaries}")
 
-            # update frequencies (TODO: refactor for readability)
-            cur_freq_candidates = self._get_freq_candidates_usecase(coord, door_type)  # TODO: consider refactoring how doorID is used
-            new_freq_candidates = get_updated_frequency_candidates(cur_freq_candidates, turn_num=turn_num, door_state=door_state)
-            self._set_freq_candidates_usecase(coord, door_type, new_freq_candidates)
-
-            self.update_door_status(coord, door_type, door_state)
-
         if percept.is_end_visible and self._end_pos is None:
             self.set_end_pos([percept.end_x, percept.end_y])
 
     OUT_OF_BOUND_SEEN_COUNT = 1000
 
+    _TOUCHING_DOORS = {
+        constants.LEFT: ([-1, 0], constants.RIGHT),
+        constants.UP: ([0, -1], constants.DOWN),
+        constants.RIGHT: ([1, 0], constants.LEFT),
+        constants.DOWN: ([0, 1], constants.UP),
+    }
+
     def _is_out_of_bound(self, coord: List[int]) -> bool:
-        return any([
-            coord[0] < self._boundaries[constants.LEFT], 
-            coord[0] > self._boundaries[constants.RIGHT],
-            coord[1] < self._boundaries[constants.UP],
-            coord[1] > self._boundaries[constants.DOWN],
-        ])
+        return (
+            coord[0] < self._boundaries[constants.LEFT]
+            or coord[0] > self._boundaries[constants.RIGHT]
+            or coord[1] < self._boundaries[constants.UP]
+            or coord[1] > self._boundaries[constants.DOWN]
+        )
     
     def get_valid_moves(self, turn_num: int) -> List[int]:
         if turn_num != self.turn_num:
@@ -254,66 +363,26 @@ class StartPosCentricPlayerMap(PlayerMapInterface):
 
         # self.logger.debug(f"Getting valid moves for turn {turn_num}")
         cur_pos = self.cur_pos
-        valid_moves_dependent_doors = {
-            constants.LEFT: [
-                self._door_dictkey(cur_pos, constants.LEFT), 
-                self._door_dictkey([cur_pos[0]-1, cur_pos[1]], constants.RIGHT),
-            ],
-            constants.UP: [
-                self._door_dictkey(cur_pos, constants.UP),
-                self._door_dictkey([cur_pos[0], cur_pos[1]-1], constants.DOWN),
-            ],
-            constants.RIGHT: [
-                self._door_dictkey(cur_pos, constants.RIGHT),
-                self._door_dictkey([cur_pos[0]+1, cur_pos[1]], constants.LEFT),
-            ],
-            constants.DOWN: [
-                self._door_dictkey(cur_pos, constants.DOWN),
-                self._door_dictkey([cur_pos[0], cur_pos[1]+1], constants.UP),
-            ],
-        }
-
         valid_moves = []
-        for move, door_keys in valid_moves_dependent_doors.items():
-            # self.logger.debug(f"Door {door_keys[0]} status: {self._door_status[door_keys[0]]}, {door_keys[1]} {self._door_status[door_keys[1]]}")
+        for move in [constants.LEFT, constants.UP, constants.RIGHT, constants.DOWN]:
+            touching_door_offset, touching_door_type = self._TOUCHING_DOORS[move]
+            touching_door_coord = [cur_pos[0] + touching_door_offset[0], cur_pos[1] + touching_door_offset[1]]
 
-            if all([self._door_status[key] == constants.OPEN for key in door_keys]):
+            if (self._get_door_status(cur_pos, move) == constants.OPEN
+                    and self._get_door_status(touching_door_coord, touching_door_type) == constants.OPEN):
                 valid_moves.append(move)
 
         return valid_moves
 
     def get_wall_freq_candidates(self, door_id: DoorIdentifier) -> List[Set[int]]:
-        door_freq_candidates = self._get_freq_candidates_usecase(door_id.absolute_coord, door_id.door_type)
+        door_mask, touching_door_mask = self.get_wall_freq_masks(door_id)
+        return [math.lcm(f1, f2) for f1 in mask_frequencies(door_mask) for f2 in mask_frequencies(touching_door_mask)]
 
-        # print("Inner Door freq candidates: ", door_freq_candidates)
-        # print("Door ID: ", door_id)
-        
-        door_type_to_touching_door_offsets = {
-            constants.LEFT: ([-1, 0], constants.RIGHT),
-            constants.UP: ([0, -1], constants.DOWN),
-            constants.RIGHT: ([1, 0], constants.LEFT),
-            constants.DOWN: ([0, 1], constants.UP),
-        }
-        touching_door_offset, touching_door_type = door_type_to_touching_door_offsets[door_id.door_type]
+    def get_wall_freq_masks(self, door_id: DoorIdentifier) -> Tuple[int, int]:
+        touching_door_offset, touching_door_type = self._TOUCHING_DOORS[door_id.door_type]
         touching_door_coord = [door_id.absolute_coord[0] + touching_door_offset[0], door_id.absolute_coord[1] + touching_door_offset[1]]
 
-        # print("Touching Door coord: ", touching_door_coord)
-        
-        touching_door_freq_candidates = self._get_freq_candidates_usecase(touching_door_coord, touching_door_type)
-
-        # print("Outer Door freq candidates: ", touching_door_freq_candidates)
-
-        wall_freq_candidates = [door_freq_candidates, touching_door_freq_candidates]
-
-        # find LCM of two lists
-        def lcm(a, b):
-            if a==0 or b==0:
-                return 0
-            return abs(a * b) // math.gcd(a, b)
-
-        return [lcm(f1, f2) for f1 in door_freq_candidates for f2 in touching_door_freq_candidates]
-
-        # return [door_freq_candidates, touching_door_freq_candidates]
-
-    def get_freq_candidates(self, door_id: DoorIdentifier) -> Set[int]:
-        return self._get_freq_candidates_usecase(door_id.absolute_coord, door_id.door_type)
\ No newline at end of file
+        return (
+            self._get_freq_mask_usecase(door_id.absolute_coord, door_id.door_type),
+            self._get_freq_mask_usecase(touching_door_coord, touching_door_type),
+        )
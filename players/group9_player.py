@@ -93,6 +93,14 @@ class Player:
         self.waited = 0
         self.escaping = False
         self.escape_route = deque([])
+        # Cells we have been in, and a counter bumped whenever they or the door estimates change
+        self.visited_cells = set()
+        self.beliefs_version = 0
+        self.hyperperiod = 1
+        self.hyperperiod_version = -1
+        # Escape plans by (cell, turn mod hyperperiod), valid for one beliefs_version
+        self.escape_memo = {}
+        self.escape_memo_version = -1
 
     class Corner:
         def __init__(self, end_x, end_y) -> None:
@@ -117,18 +125,23 @@ class Player:
         """
         if coordinates not in self.door_states:
             self.door_states[coordinates] = [0, 0, 0, 0] # Left Top Right Bottom
+            self.beliefs_version += 1
 
         if state == constants.OPEN:
+            previous = self.door_states[coordinates][direction]
             if self.door_states[coordinates][direction] == 0:
                 self.door_states[coordinates][direction] = self.step
             else:
                 self.door_states[coordinates][direction] = GCD(self.door_states[coordinates][direction], self.step)
+            if self.door_states[coordinates][direction] != previous:
+                self.beliefs_version += 1
 
         elif state == constants.BOUNDARY and self.boundary[direction] == 100:
             # print("---Updating Boundary----")
             # print("Boundary Found at: ", coordinates)
             # print("Which Door is it? ", direction)
             self.door_states[coordinates][direction] = -1   
+            self.beliefs_version += 1
             x_or_y = 0 if direction % 2 == 0 else 1 # Which coordinate to update
             # print("X OR y (0 or 1)", x_or_y)
             self.boundary[direction] = coordinates[x_or_y]
@@ -170,173 +183,113 @@ class Player:
 
         return (100, 100)
     
-    def cost_of_directions(self, coord, added_steps) -> list:
-        current_turn = self.step + added_steps
-        costs = []
-        neighbors = get_neighbors(coord)
-
-        # For each move, check when player can move
-        for i in range(4):
-            door_freq = self.door_states[coord][i]
-            neighbor_door_freq = self.door_states[neighbors[i]][opposite(i)]
-            # print("Direction: ", i, "Door Freq: ", door_freq)
-            # print("Neighbor Direction: ", opposite(i), "Neighbor Door Freq: ", neighbor_door_freq)
-
-            if door_freq <= 0 or neighbor_door_freq <= 0:
-                costs.append(-1)
-            else:
-                common_freq = LCM(door_freq, neighbor_door_freq)
-                can_move = common_freq
-                # print("Common Freq: ", common_freq)
-                if can_move >= common_freq:
-                    # print("Current Turn is larger than common freq")
-                    while (can_move < current_turn):
-                        can_move += common_freq
-                # print("Resulting common freq and current turn", can_move, current_turn)
-                costs.append(can_move - current_turn)
-                    
-        return costs
-
-    # Player is stuck. Formulate a plot or end up in jail or shot. Updates self.escape_route and self.escaping to True.
-    def find_best_out(self):
-        hard_limit = -1
-        added_steps = 0
-        move_taken = opposite(self.past_moves[-1])
-
-        memo = {}
-        memo_move = {}
-        checked_coords = set()
-        print("Before evaluating Current Position")
-        # Check current coord
-        checked_coords.add(tuple(self.cur_pos)) 
-        costs = self.cost_of_directions(tuple(self.cur_pos), added_steps)
-        print("Cost of moving in current position: ", costs)
-
-        fastest_moves = sorted(range(len(costs)), key=lambda k : (costs[k], self.move_regrets[tuple(self.cur_pos)][k]))
-
-        print("After finding fastest moves")
-
-        for move in fastest_moves:
-            if move != move_taken and costs[move] >= 0:
-                print("---Setting Memo Stuff---")
-                cost = costs[move]
-                memo[tuple(self.cur_pos)] = cost
-                print("Cost of fastest move:", move, cost)
-                
-                actions = [constants.WAIT for i in range(cost)]
-                actions.append(move)
-                print("What I need to do to get out: ", actions)
-
-                memo_move[tuple(self.cur_pos)] = actions
-                break
-
-        print("After updating fastest moves in memoization")
-
-        added_steps += (1 + costs[move_taken])
-
-        # There are no moves found
-        if not memo or not memo_move:
-            print("No valid moves found, adding backtrack to memo")
-            cost = costs[move_taken]
-            memo[tuple(self.cur_pos)] = cost
-            
-            actions = [constants.WAIT for i in range(cost)]
-            actions.append(move_taken)
-
-            memo_move[tuple(self.cur_pos)] = actions
-        else:
-            # Set a hard limit
-            for i in range(3, -1, -1):
-                cost = costs[fastest_moves[i]]
-                if cost != -1 and fastest_moves[i] != move_taken:
-                    hard_limit = cost + 1
-                    break
-                
-            print("Hard Limit: ", hard_limit)
-
-            # If backtracking takes more time then just waiting for a door to open
-            if hard_limit != -1 and added_steps >= hard_limit:
-                print("It is better to wait for another door to open")
-                # print(memo_move[tuple(self.cur_pos)])
-                # print(self.escape_route)
-
-                self.escaping = True
-                self.escape_route = deque(memo_move[tuple(self.cur_pos)])
+    def update_hyperperiod(self):
+        """
+            Period of every crossing time over the known doors: the lcm of all the door frequency estimates
+        """
+        if self.hyperperiod_version != self.beliefs_version:
+            frequencies = {freq for doors in self.door_states.values() for freq in doors if freq > 0}
+            self.hyperperiod = math.lcm(*frequencies) if frequencies else 1
+            self.hyperperiod_version = self.beliefs_version
+        return self.hyperperiod
 
-                return self.escape_route.popleft()
+    def plan_escape(self, start, turn):
+        """
+            Fastest way from start to a cell off the path we came along, trying the doors we haven't taken.
 
-            print("After added_steps condition")
+            Time-dependent Dijkstra over the known cells: crossing an edge whose doors open every f1 and f2
+            turns waits -t mod LCM(f1, f2) turns from turn t, then takes one turn. Only the cells we came
+            through are expanded, the first other cell settled ends the search. Ties go to the move with the
+            lowest regret.
 
-        print("Before checking Past Coords")
-        # Check all past coords to find if there is some out.
-        for i in range(len(self.past_coords) - 1, -1, -1):
-            coord = self.past_coords[i]
-            prev_move = self.past_moves[i - 1] if i > 0 else -1
+            The waits only depend on the turn modulo the hyperperiod, so plans are memoized by
+            (cell, turn mod hyperperiod) until the beliefs or the path change. The rest of a plan is the best
+            plan from every state it goes through, each of them is memoized too.
 
-            if coord in checked_coords:
+            Returns the actions (WAITs and moves) to take, None if no way out is known.
+        """
+        hyperperiod = self.update_hyperperiod()
+        if self.escape_memo_version != self.beliefs_version:
+            self.escape_memo = {}
+            self.escape_memo_version = self.beliefs_version
+
+        key = (start, turn % hyperperiod)
+        if key in self.escape_memo:
+            return self.escape_memo[key]
+
+        # parent[cell] = (previous cell, direction, turn of the move)
+        arrival = {start: turn}
+        parent = {start: None}
+        settled = set()
+        queue = [(turn, 0, start)]
+        goal = None
+
+        while queue:
+            cur_turn, _, cell = heapq.heappop(queue)
+            if cell in settled:
                 continue
+            settled.add(cell)
+            if cell != start and cell not in self.visited_cells:
+                goal = cell
+                break
 
-            checked_coords.add(coord)
-            print("Before finding costs of directions")
-            costs = self.cost_of_directions(coord, added_steps)
-            fastest_moves = sorted(range(len(costs)), key=lambda k : (costs[k], self.move_regrets[coord][k]))
-            print("Before looping through fastest moves")
-
-            for move in fastest_moves:
-                if move != opposite(prev_move) and costs[move] >= 0:
-                    print("Found something")
-                    cost = costs[move]
-                    prev_coord = None
-                    print("Before prev coord")
-                    if i == (len(self.past_coords) - 1):
-                        prev_coord = tuple(self.cur_pos)
-                    else:
-                        prev_coord = self.past_coords[i + 1]
-                    print("After prev coord")
-                    print("Current coord: ", coord)
-                    print("Prev coord: ", prev_coord)
-
-                    memo[coord] = cost
-
-                    cur_actions = [constants.WAIT for i in range(cost)]
-                    cur_actions.append(move)
-                    print("Before prev actions")
-                    if prev_coord in memo_move:
-                        prev_actions = memo_move[prev_coord]
-                    else:
-                        print("Could not find prev coordinate in MemoMove")
-                    print(prev_actions)
-                    print("Before extend")
-                    memo_move[coord] = prev_actions.extend(cur_actions)
-                    print("After extend")
-                    break
-            
-            added_steps += 1 + costs[opposite(prev_move)]
-
-
-            if coord not in memo or coord not in memo_move:
-                print("No valid moves found at", coord)
-                cost = costs[opposite(prev_move)]
-                memo[coord] = cost
-                
-                actions = [constants.WAIT for i in range(cost)]
-                actions.append(opposite(prev_move))
-
-                memo_move[coord] = actions
-            else:
-                if hard_limit == -1 or added_steps >= hard_limit:
-                    self.escape_route = deque(memo_move[prev_coord])
-                    self.escaping = True
+            doors = self.door_states[cell]
+            regrets = self.move_regrets.get(cell, (0, 0, 0, 0))
+            neighbors = get_neighbors(cell)
+            for direction in range(4):
+                neighbor = neighbors[direction]
+                if neighbor in settled or neighbor not in self.door_states:
+                    continue
+                door_freq = doors[direction]
+                neighbor_door_freq = self.door_states[neighbor][opposite(direction)]
+                if door_freq <= 0 or neighbor_door_freq <= 0:
+                    continue
 
-                    return self.escape_route.popleft()                    
+                # Next turn both doors are open, then one turn to move
+                move_turn = cur_turn + (-cur_turn % LCM(door_freq, neighbor_door_freq))
+                if move_turn + 1 < arrival.get(neighbor, math.inf):
+                    arrival[neighbor] = move_turn + 1
+                    parent[neighbor] = (cell, direction, move_turn)
+                    heapq.heappush(queue, (move_turn + 1, regrets[direction], neighbor))
+
+        if goal is None:
+            self.escape_memo[key] = None
+            return None
+
+        steps = []
+        cell = goal
+        while parent[cell] is not None:
+            steps.append(parent[cell])
+            cell = parent[cell][0]
+        steps.reverse()
+
+        actions = []
+        states = []
+        cur_turn = turn
+        for cell, direction, move_turn in steps:
+            for wait_turn in range(cur_turn, move_turn + 1):
+                states.append((cell, wait_turn))
+            actions.extend([constants.WAIT] * (move_turn - cur_turn))
+            actions.append(direction)
+            cur_turn = move_turn + 1
+
+        for i, (cell, state_turn) in enumerate(states):
+            self.escape_memo.setdefault((cell, state_turn % hyperperiod), actions[i:])
+        return actions
 
-            print("FINISHED CHECKING ", i)
+    # Player is stuck. Formulate a plot or end up in jail or shot. Updates self.escape_route and self.escaping to True.
+    def find_best_out(self):
+        actions = self.plan_escape(tuple(self.cur_pos), self.step)
+        if not actions:
+            print("No way out found")
+            self.escaping = False
+            self.escape_route = deque([])
+            return constants.WAIT
 
-        print("Reached the end")
-        self.escape_route = deque(memo_move[(0, 0)])
+        print("Escape route:", actions)
         self.escaping = True
-
-        return constants.WAIT
+        self.escape_route = deque(actions)
+        return self.escape_route.popleft()
 
     def move(self, current_percept) -> int:
         """Function which retrieves the current state of the amoeba map and returns an amoeba movement
@@ -469,6 +422,9 @@ class Player:
         """
         self.past_moves.append(direction)
         self.past_coords.append(tuple(self.cur_pos))
+        if tuple(self.cur_pos) not in self.visited_cells:
+            self.visited_cells.add(tuple(self.cur_pos))
+            self.beliefs_version += 1
 
         if direction >= 0:
             self.cur_pos = get_neighbor(self.cur_pos, direction)
@@ -5,6 +5,9 @@ import signal
 import numpy as np
 import math
 from timing_maze_state import TimingMazeState
+from timing_maze_snapshot import MazeRules, TimingMazeSnapshot
+from timing_maze_percept import egocentric_percept
+from player_sandbox import SandboxedPlayer, WorkerExitedException
 from constants import *
 import constants
 from utils import *
@@ -32,6 +35,7 @@ class TimingMazeGame:
         self.start_time = time.time()
         self.use_gui = not args.no_gui
         self.do_logging = not args.disable_logging
+        self.use_sandbox = getattr(args, "sandbox", False)
         self.is_paused = False
         self.root = root
         self.game_state = "pause"
@@ -100,6 +104,7 @@ class TimingMazeGame:
         self.valid_moves = 0
         self.map_state = np.zeros((constants.map_dim, constants.map_dim, 4), dtype=int)
         self.map_frequencies = np.zeros((constants.map_dim, constants.map_dim, 4), dtype=int)
+        self.snapshot_rules = None
 
         self.add_player(args.player)
         self.initialize(args.maze)
@@ -120,21 +125,32 @@ class TimingMazeGame:
 
             start_time = 0
             is_timeout = False
-            if self.use_timeout:
-                signal.signal(signal.SIGALRM, timeout_handler)
-                signal.alarm(constants.timeout)
-            try:
-                start_time = time.time()
-                player = player_class(rng=self.rng, logger=self.get_player_logger(player_name),
-                                      precomp_dir=precomp_dir, maximum_door_frequency=self.max_door_frequency,
-                                      radius=self.radius)
+            player_kwargs = dict(rng=self.rng, logger=self.get_player_logger(player_name), precomp_dir=precomp_dir,
+                                 maximum_door_frequency=self.max_door_frequency, radius=self.radius)
+            if self.use_sandbox:
+                try:
+                    start_time = time.time()
+                    player = SandboxedPlayer(player_class, player_kwargs,
+                                             init_timeout=constants.timeout if self.use_timeout else None)
+                except TimeoutException:
+                    is_timeout = True
+                    player = None
+                    self.logger.error(
+                        "Initialization Timeout {} since {:.3f}s reached.".format(player_name, constants.timeout))
+            else:
                 if self.use_timeout:
-                    signal.alarm(0)  # Clear alarm
-            except TimeoutException:
-                is_timeout = True
-                player = None
-                self.logger.error(
-                    "Initialization Timeout {} since {:.3f}s reached.".format(player_name, constants.timeout))
+                    signal.signal(signal.SIGALRM, timeout_handler)
+                    signal.alarm(constants.timeout)
+                try:
+                    start_time = time.time()
+                    player = player_class(**player_kwargs)
+                    if self.use_timeout:
+                        signal.alarm(0)  # Clear alarm
+                except TimeoutException:
+                    is_timeout = True
+                    player = None
+                    self.logger.error(
+                        "Initialization Timeout {} since {:.3f}s reached.".format(player_name, constants.timeout))
 
             init_time = time.time() - start_time
 
@@ -363,26 +379,48 @@ class TimingMazeGame:
 
         drone_visual_time = time.time()
         maze_state, is_end_visible = self.get_drone_visual()
+        maze_tensor = egocentric_percept(self.map_state, self.cur_pos, self.radius)
         drone_visual_time = time.time() - drone_visual_time
         self.logger.debug("Drone visual took {:.3f}s".format(drone_visual_time))
 
         # Create the state object for the player
         before_state = TimingMazeState(maze_state, is_end_visible,
                                        self.end_pos[0]-self.cur_pos[0], self.end_pos[1]-self.cur_pos[1],
-                                       self.start_pos[0]-self.cur_pos[0], self.start_pos[1]-self.cur_pos[1])
+                                       self.start_pos[0]-self.cur_pos[0], self.start_pos[1]-self.cur_pos[1],
+                                       maze_tensor)
         returned_action = None
         if not self.player_timeout:
             player_start = time.time()
             try:
                 # Call the player's move function for turn on this move
-                returned_action = self.player.move(
-                    current_percept=before_state
-                )
+                if self.use_sandbox:
+                    returned_action = self.player.move(
+                        current_percept=before_state, timeout=self.player_time if self.use_timeout else None
+                    )
+                    if self.player.last_error is not None:
+                        print("Exception in player code")
+                        self.logger.debug(self.player.last_error)
+                else:
+                    returned_action = self.player.move(
+                        current_percept=before_state
+                    )
+            except TimeoutException:
+                self.player_time = 0
+                returned_action = None
+            except WorkerExitedException as e:
+                # The player is gone, it is out of the game like a player out of time
+                print("Player worker process exited")
+                self.logger.error(str(e))
+                self.player_timeout = True
+                returned_action = None
             except Exception:
                 print("Exception in player code")
                 returned_action = None
 
             player_time_taken = time.time() - player_start
+            if self.use_sandbox and self.player_time > 0:
+                # CPU time of the worker, IPC and time spent waiting to be scheduled aren't charged to the player
+                player_time_taken = self.player.last_cpu_time
             self.logger.debug("Player {} took {:.3f}s".format(self.player_name, player_time_taken))
 
             self.player_time -= player_time_taken
@@ -417,6 +455,7 @@ class TimingMazeGame:
             print("Goal reached!\n\n Turns taken: {}\n".format(self.turns))
             self.end_time = time.time()
             print("\nTime taken: {}\nValid moves: {}\n".format(self.end_time - self.start_time, self.valid_moves))
+            self.close_player()
             return
 
         if self.turns < self.max_turns:
@@ -433,8 +472,14 @@ class TimingMazeGame:
             self.game_state = "over"
             self.end_time = time.time()
             print("\nTime taken: {}\nValid moves: {}\n".format(self.end_time - self.start_time, self.valid_moves))
+            self.close_player()
             return
 
+    def close_player(self):
+        # Stop the worker process of a sandboxed player
+        if self.use_sandbox and self.player is not None:
+            self.player.close()
+
     @staticmethod
     def is_valid(row, col, vis):
         # If cell lies out of bounds
@@ -668,6 +713,12 @@ class TimingMazeGame:
         return_dict['cur_pos'] = self.cur_pos
         return return_dict
 
+    def snapshot(self):
+        """Immutable copy of the current position and turn which shares the maze instead of copying it"""
+        if self.snapshot_rules is None:
+            self.snapshot_rules = MazeRules(self.map_frequencies, self.end_pos)
+        return TimingMazeSnapshot(self.snapshot_rules, int(self.cur_pos[0]), int(self.cur_pos[1]), self.turns)
+
     def draw_grid(self):
         self.canvas.delete("all")  # Clear the canvas
 
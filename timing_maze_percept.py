@@ -0,0 +1,114 @@
+from functools import lru_cache
+
+import numpy as np
+
+import constants
+
+# Values of the marker channel added by with_markers
+START_MARKER = 1
+END_MARKER = 2
+
+
+@lru_cache(maxsize=None)
+def door_visibility(radius):
+    """Which doors around the drone are part of its percept
+
+        Mirrors TimingMazeGame.validate_distance_between_drone_and_door: a door is visible if its centre
+        or one of its two ends is within `radius` of the centre of the drone's cell. Visibility only depends
+        on the offset from the drone, so the mask is computed once per radius.
+
+        Args:
+            radius (int): the radius of the drone
+        Returns:
+            np.ndarray: read-only (2r+1, 2r+1, 4) boolean mask indexed by [dx + r, dy + r, door_type]
+    """
+    offsets = np.arange(-radius, radius + 1)
+    dx = offsets[:, None, None]
+    dy = offsets[None, :, None]
+    ends = np.array([0.0, 0.5, 1.0])[None, None, :]
+
+    # (x, y) of the three points of each door, relative to the top left corner of the drone's cell
+    points = {
+        constants.LEFT: (dx + 0.0 * ends, dy + ends),
+        constants.RIGHT: (dx + 1.0 + 0.0 * ends, dy + ends),
+        constants.UP: (dx + ends, dy + 0.0 * ends),
+        constants.DOWN: (dx + ends, dy + 1.0 + 0.0 * ends),
+    }
+
+    mask = np.zeros((2 * radius + 1, 2 * radius + 1, 4), dtype=bool)
+    for door_type, (x, y) in points.items():
+        distance = np.sqrt((x - 0.5) ** 2 + (y - 0.5) ** 2).min(axis=2)
+        mask[:, :, door_type] = distance <= radius
+    mask.flags.writeable = False
+    return mask
+
+
+@lru_cache(maxsize=None)
+def cell_visibility(radius):
+    """(2r+1, 2r+1) mask of cells with at least one visible door, i.e. the cells whose content is seen"""
+    mask = door_visibility(radius).any(axis=2)
+    mask.flags.writeable = False
+    return mask
+
+
+def is_cell_visible(radius, dx, dy):
+    """Vectorized check of whether offsets (dx, dy) from the drone are inside the percept"""
+    dx = np.asarray(dx)
+    dy = np.asarray(dy)
+    inside = (np.abs(dx) <= radius) & (np.abs(dy) <= radius)
+    mask = cell_visibility(radius)
+    return inside & mask[np.clip(dx + radius, 0, 2 * radius), np.clip(dy + radius, 0, 2 * radius)]
+
+
+def egocentric_percept(map_state, cur_pos, radius):
+    """The drone's percept as a fixed shape array centred on the drone
+
+        Holds the same information as the list of tuples built by TimingMazeGame.get_drone_visual, read from
+        `map_state` with a single gather instead of a BFS.
+
+        Args:
+            map_state (np.ndarray): (map_dim, map_dim, 4) door timers of the game, a door is open when its timer is 1
+            cur_pos (Tuple[int, int]): position of the drone
+            radius (int): the radius of the drone
+        Returns:
+            np.ndarray: (2r+1, 2r+1, 4) uint8 array indexed by [dx + r, dy + r, door_type] holding UNKNOWN for doors
+                outside the percept and CLOSED, OPEN or BOUNDARY otherwise
+    """
+    width, height = map_state.shape[:2]
+    offsets = np.arange(-radius, radius + 1)
+    xs = cur_pos[0] + offsets
+    ys = cur_pos[1] + offsets
+    inside = ((xs >= 0) & (xs < width))[:, None] & ((ys >= 0) & (ys < height))[None, :]
+
+    doors = map_state[np.ix_(np.clip(xs, 0, width - 1), np.clip(ys, 0, height - 1))]
+    percept = np.where(doors == 1, constants.OPEN, constants.CLOSED).astype(np.uint8)
+
+    percept[xs == 0, :, constants.LEFT] = constants.BOUNDARY
+    percept[xs == width - 1, :, constants.RIGHT] = constants.BOUNDARY
+    percept[:, ys == 0, constants.UP] = constants.BOUNDARY
+    percept[:, ys == height - 1, constants.DOWN] = constants.BOUNDARY
+
+    visible = door_visibility(radius) & inside[:, :, None]
+    percept[~visible] = constants.UNKNOWN
+    return percept
+
+
+def with_markers(maze_tensor, current_percept):
+    """Append a start/end marker channel to an egocentric percept
+
+        Args:
+            maze_tensor (np.ndarray): (2r+1, 2r+1, 4) array from egocentric_percept
+            current_percept (TimingMazeState): the percept the array was built for
+        Returns:
+            np.ndarray: (2r+1, 2r+1, 5) array, the last channel holding START_MARKER on the start cell and
+                END_MARKER on the end cell when they fall in the window (the end only once it is visible)
+    """
+    radius = maze_tensor.shape[0] // 2
+    markers = np.zeros(maze_tensor.shape[:2] + (1,), dtype=maze_tensor.dtype)
+    cells = [(current_percept.start_x, current_percept.start_y, START_MARKER)]
+    if current_percept.is_end_visible:
+        cells.append((current_percept.end_x, current_percept.end_y, END_MARKER))
+    for dx, dy, marker in cells:
+        if abs(dx) <= radius and abs(dy) <= radius:
+            markers[dx + radius, dy + radius, 0] = marker
+    return np.concatenate([maze_tensor, markers], axis=2)
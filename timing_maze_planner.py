@@ -0,0 +1,407 @@
+import heapq
+from functools import lru_cache
+
+import numpy as np
+
+import constants
+from timing_maze_snapshot import edge_periods
+
+
+@lru_cache(maxsize=None)
+def grid_neighbors(shape):
+    """Flat neighbour table of a grid
+
+        Args:
+            shape (Tuple[int, int]): width and height of the grid
+        Returns:
+            List[int]: entry cell * 4 + door_type is the id of the cell behind that door, -1 outside the grid
+    """
+    width, height = shape
+    cells = np.arange(width * height).reshape(width, height)
+    neighbors = np.full((width, height, 4), -1, dtype=np.int64)
+    neighbors[1:, :, constants.LEFT] = cells[:-1, :]
+    neighbors[:-1, :, constants.RIGHT] = cells[1:, :]
+    neighbors[:, 1:, constants.UP] = cells[:, :-1]
+    neighbors[:, :-1, constants.DOWN] = cells[:, 1:]
+    return neighbors.ravel().tolist()
+
+
+class SearchResult:
+    """Earliest arrival turns found by one EarliestArrivalPlanner search"""
+
+    def __init__(self, shape, source, turn, arrival, parent, reached):
+        self.shape = shape
+        self.source = source
+        self.turn = turn
+        self.arrival_list = arrival
+        self.parent = parent
+        # Target which stopped the search, None after an all-targets search or if no target is reachable
+        self.reached = reached
+
+    @property
+    def arrival(self):
+        """(width, height) array of earliest arrival turns, inf for the cells not reached"""
+        return np.array(self.arrival_list, dtype=float).reshape(self.shape)
+
+    def arrival_turn(self, cell):
+        return self.arrival_list[cell[0] * self.shape[1] + cell[1]]
+
+    def is_reached(self, cell):
+        return self.arrival_turn(cell) != float("inf")
+
+    def path(self, cell):
+        """Doors to go through from the source to `cell`
+
+            Args:
+                cell (Tuple[int, int]): grid coordinates of the destination
+            Returns:
+                List[Tuple[int, int]]: (door_type, turn) of each move, turn being the turn on which the move
+                    succeeds, or None if `cell` was not reached
+        """
+        height = self.shape[1]
+        node = cell[0] * height + cell[1]
+        if self.arrival_list[node] == float("inf"):
+            return None
+        steps = []
+        while self.parent[node] >= 0:
+            edge = self.parent[node]
+            steps.append((edge % 4, self.arrival_list[node]))
+            node = edge // 4
+        steps.reverse()
+        return steps
+
+    def moves(self, cell):
+        """Same as path, without the turns"""
+        steps = self.path(cell)
+        return None if steps is None else [door_type for door_type, _ in steps]
+
+
+class EarliestArrivalPlanner:
+    """Time-dependent shortest paths over a belief maze stored in fixed arrays
+
+        `periods[x, y, door_type]` is the crossing period of the edge behind that door: the move succeeds on
+        the turns which are multiples of it. Players fill it with exact lcms of known frequencies or with
+        estimates, which may be fractional but not below 1, and 0 or inf marks an edge which can't be
+        crossed. Waiting is always allowed, so the earliest arrival through an edge only grows with the
+        departure turn and Dijkstra on arrival turns is exact.
+
+        Cells are identified by x * height + y and edges by cell * 4 + door_type, the search itself runs on
+        flat python lists and a heap of (key, turn, cell) tuples.
+    """
+
+    def __init__(self, shape=(2 * constants.map_dim + 1, 2 * constants.map_dim + 1)):
+        """
+            Args:
+                shape (Tuple[int, int]): size of the grid, the default fits any position relative to the start
+        """
+        self.shape = tuple(shape)
+        self.n_cells = self.shape[0] * self.shape[1]
+        self.periods = np.zeros(self.shape + (4,), dtype=float)
+        self.neighbors = grid_neighbors(self.shape)
+
+    def cell_id(self, cell):
+        return cell[0] * self.shape[1] + cell[1]
+
+    def cell_xy(self, cell_id):
+        return divmod(cell_id, self.shape[1])
+
+    def set_frequencies(self, frequencies):
+        """Set the periods from a (width, height, 4) array of door frequencies, 0 = never opens"""
+        self.periods[...] = edge_periods(frequencies)
+
+    def search(self, source, turn, targets=None, stop_at_target=True):
+        """Earliest arrival search from `source`
+
+            Args:
+                source (Tuple[int, int]): grid coordinates of the drone
+                turn (int): turns already played, the first move can succeed on turn + 1
+                targets (Optional[Iterable[Tuple[int, int]]]): cells of interest, None for an all-targets search
+                stop_at_target (bool): stop as soon as the first target is settled, which is the one reached
+                    first, otherwise keep going until every target is settled
+            Returns:
+                SearchResult: arrival turns of the settled cells and parent pointers
+        """
+        periods = self.periods.ravel().tolist()
+        neighbors = self.neighbors
+        height = self.shape[1]
+        inf = float("inf")
+
+        source = source[0] * height + source[1]
+        arrival = [inf] * self.n_cells
+        parent = [-1] * self.n_cells
+        settled = [False] * self.n_cells
+
+        remaining = None
+        heuristic = None
+        if targets is not None:
+            remaining = {x * height + y for x, y in targets}
+            if len(remaining) == 1:
+                # Every move takes at least one turn, so the Manhattan distance never overestimates
+                target = next(iter(remaining))
+                heuristic = divmod(target, height)
+
+        arrival[source] = turn
+        heap = [(turn, turn, source)]
+        push = heapq.heappush
+        pop = heapq.heappop
+        reached = None
+
+        while heap:
+            _, t, u = pop(heap)
+            if settled[u]:
+                continue
+            settled[u] = True
+
+            if remaining is not None and u in remaining:
+                remaining.discard(u)
+                if stop_at_target or not remaining:
+                    reached = divmod(u, height) if stop_at_target else None
+                    break
+
+            edge = u * 4
+            for door_type in range(4):
+                v = neighbors[edge + door_type]
+                if v < 0 or settled[v]:
+                    continue
+                p = periods[edge + door_type]
+                if not p > 0:
+                    continue
+                a = (t // p + 1) * p
+                if a < arrival[v]:
+                    arrival[v] = a
+                    parent[v] = edge + door_type
+                    if heuristic is None:
+                        push(heap, (a, a, v))
+                    else:
+                        vx, vy = divmod(v, height)
+                        push(heap, (a + abs(vx - heuristic[0]) + abs(vy - heuristic[1]), a, v))
+
+        return SearchResult(self.shape, divmod(source, height), turn, arrival, parent, reached)
+
+    def earliest_arrival(self, source, turn, target):
+        """Single-target search, returns the arrival turn at `target`, inf if unreachable"""
+        return self.search(source, turn, [target]).arrival_turn(target)
+
+    def nearest(self, source, turn, targets):
+        """Multi-target search, returns the target reached first and its path, (None, None) if none is reachable"""
+        result = self.search(source, turn, targets)
+        if result.reached is None:
+            return None, None
+        return result.reached, result.path(result.reached)
+
+
+class IncrementalPlanner:
+    """D* Lite over the grid, repairing the previous search when edge costs change
+
+        The search runs backwards from the goal with time independent edge costs, such as g4's expected
+        waits for both doors of an edge, so the drone can move without invalidating it. After a percept only
+        the edges whose cost changed are passed to update_costs, and compute only revisits the cells whose
+        cost to the goal is affected, instead of searching the whole grid again.
+
+        `costs` is kept as a flat python list indexed by cell * 4 + door_type like EarliestArrivalPlanner's
+        edges, costs below 1 would break the Manhattan heuristic.
+    """
+
+    def __init__(self, shape=(2 * constants.map_dim + 1, 2 * constants.map_dim + 1), costs=None):
+        """
+            Args:
+                shape (Tuple[int, int]): size of the grid
+                costs (Optional[np.ndarray]): (width, height, 4) initial edge costs, inf (blocked) if None
+        """
+        self.shape = tuple(shape)
+        self.n_cells = self.shape[0] * self.shape[1]
+        self.neighbors = grid_neighbors(self.shape)
+        self.facing = (constants.RIGHT, constants.DOWN, constants.LEFT, constants.UP)
+        inf = float("inf")
+        if costs is None:
+            self.costs = [inf] * (self.n_cells * 4)
+        else:
+            self.costs = np.asarray(costs, dtype=float).ravel().tolist()
+
+        self.start = None
+        self.goal = None
+        self.last_start = None
+        self.km = 0
+        self.g = None
+        self.rhs = None
+        self.queue = None
+        self.queued = None
+        # Cells whose g value was updated by the last compute
+        self.expanded = 0
+
+    def heuristic(self, a, b):
+        height = self.shape[1]
+        return abs(a // height - b // height) + abs(a % height - b % height)
+
+    def key(self, cell):
+        best = min(self.g[cell], self.rhs[cell])
+        return best + self.heuristic(self.start, cell) + self.km, best
+
+    def reset(self, start, goal):
+        """Forget the previous search and plan from `start` to `goal`, both grid coordinates"""
+        height = self.shape[1]
+        inf = float("inf")
+        self.start = start[0] * height + start[1]
+        self.last_start = self.start
+        self.goal = goal[0] * height + goal[1]
+        self.km = 0
+        self.g = [inf] * self.n_cells
+        self.rhs = [inf] * self.n_cells
+        self.rhs[self.goal] = 0
+        self.queue = []
+        self.queued = {}
+        self.push(self.goal)
+
+    def push(self, cell):
+        key = self.key(cell)
+        self.queued[cell] = key
+        heapq.heappush(self.queue, (key, cell))
+
+    def update_vertex(self, cell):
+        if cell != self.goal:
+            best = float("inf")
+            costs = self.costs
+            neighbors = self.neighbors
+            g = self.g
+            edge = cell * 4
+            for door_type in range(4):
+                v = neighbors[edge + door_type]
+                if v >= 0:
+                    value = costs[edge + door_type] + g[v]
+                    if value < best:
+                        best = value
+            self.rhs[cell] = best
+        if self.g[cell] != self.rhs[cell]:
+            self.push(cell)
+        else:
+            self.queued.pop(cell, None)
+
+    def predecessors(self, cell):
+        # Cells with a door leading into `cell`, i.e. the neighbours through their facing door
+        neighbors = self.neighbors
+        edge = cell * 4
+        for door_type in range(4):
+            u = neighbors[edge + door_type]
+            if u >= 0:
+                yield u
+
+    def move_start(self, start):
+        """The drone moved to `start`, the search stays valid and keys are offset instead of recomputed"""
+        height = self.shape[1]
+        start = start[0] * height + start[1]
+        self.km += self.heuristic(self.last_start, start)
+        self.last_start = start
+        self.start = start
+
+    def update_costs(self, xs, ys, door_types, costs):
+        """Set the cost of some edges, only the ones which actually change are propagated
+
+            Args:
+                xs (np.ndarray): x of the cells the edges leave from
+                ys (np.ndarray): y of the cells the edges leave from
+                door_types (np.ndarray): doors the edges go through
+                costs (np.ndarray): new costs, inf for edges which can't be crossed
+            Returns:
+                int: number of edges whose cost changed
+        """
+        edges = ((np.asarray(xs) * self.shape[1] + np.asarray(ys)) * 4 + np.asarray(door_types)).ravel()
+        costs = np.broadcast_to(np.asarray(costs, dtype=float), edges.shape)
+        count = 0
+        for edge, cost in zip(edges.tolist(), costs.tolist()):
+            if self.costs[edge] == cost:
+                continue
+            self.costs[edge] = cost
+            count += 1
+            if self.g is not None:
+                self.update_vertex(edge // 4)
+        return count
+
+    def set_all_costs(self, costs):
+        """Replace every edge cost, propagating only the differences"""
+        costs = np.asarray(costs, dtype=float)
+        xs, ys, door_types = np.nonzero(costs != np.asarray(self.costs).reshape(self.shape + (4,)))
+        return self.update_costs(xs, ys, door_types, costs[xs, ys, door_types])
+
+    def compute(self):
+        """Repair the search until the cost from the start is settled
+
+            Returns:
+                float: cost from the start to the goal, inf if the goal can't be reached
+        """
+        queue = self.queue
+        queued = self.queued
+        g = self.g
+        rhs = self.rhs
+        costs = self.costs
+        neighbors = self.neighbors
+        facing = self.facing
+        pop = heapq.heappop
+        self.expanded = 0
+
+        while queue:
+            key, u = queue[0]
+            if queued.get(u) != key:
+                # Stale entry, the cell was pushed again or became consistent
+                pop(queue)
+                continue
+            start_key = self.key(self.start)
+            if key >= start_key and rhs[self.start] == g[self.start]:
+                break
+            new_key = self.key(u)
+            if key < new_key:
+                self.push(u)
+                continue
+            pop(queue)
+            del queued[u]
+            self.expanded += 1
+
+            if g[u] > rhs[u]:
+                g[u] = rhs[u]
+                edge = u * 4
+                for door_type in range(4):
+                    v = neighbors[edge + door_type]
+                    if v >= 0 and v != self.goal:
+                        value = costs[v * 4 + facing[door_type]] + g[u]
+                        if value < rhs[v]:
+                            rhs[v] = value
+                            self.push(v)
+            else:
+                g[u] = float("inf")
+                self.update_vertex(u)
+                for v in self.predecessors(u):
+                    self.update_vertex(v)
+
+        return rhs[self.start]
+
+    def cost_to_goal(self, cell):
+        return self.rhs[cell[0] * self.shape[1] + cell[1]]
+
+    def next_move(self, cell=None):
+        """Door to take from `cell` (the start by default) on a cheapest path, None if the goal is unreachable"""
+        height = self.shape[1]
+        u = self.start if cell is None else cell[0] * height + cell[1]
+        best = float("inf")
+        move = None
+        edge = u * 4
+        for door_type in range(4):
+            v = self.neighbors[edge + door_type]
+            if v >= 0:
+                value = self.costs[edge + door_type] + self.g[v]
+                if value < best:
+                    best = value
+                    move = door_type
+        return move
+
+    def moves(self):
+        """Doors of a cheapest path from the start to the goal, None if the goal is unreachable"""
+        if self.rhs[self.start] == float("inf"):
+            return None
+        moves = []
+        u = self.start
+        while u != self.goal and len(moves) < self.n_cells:
+            door_type = self.next_move(divmod(u, self.shape[1]))
+            if door_type is None:
+                return None
+            moves.append(door_type)
+            u = self.neighbors[u * 4 + door_type]
+        return moves
@@ -0,0 +1,126 @@
+import numpy as np
+
+import constants
+
+
+def edge_periods(frequencies):
+    """Compute the crossing period of every edge of a maze
+
+        A move through door `k` of cell (x, y) needs both that door and the facing door of the
+        neighbouring cell to be open. A door with frequency n opens on every turn divisible by n,
+        so the move is possible exactly on the turns divisible by lcm of the two frequencies.
+
+        Args:
+            frequencies (np.ndarray): (..., width, height, 4) array of door frequencies, 0 = never opens
+        Returns:
+            np.ndarray: (..., width, height, 4) array of periods, 0 where the edge can never be crossed
+    """
+    frequencies = np.asarray(frequencies, dtype=int)
+    facing = np.zeros_like(frequencies)
+    facing[..., 1:, :, constants.LEFT] = frequencies[..., :-1, :, constants.RIGHT]
+    facing[..., :-1, :, constants.RIGHT] = frequencies[..., 1:, :, constants.LEFT]
+    facing[..., :, 1:, constants.UP] = frequencies[..., :, :-1, constants.DOWN]
+    facing[..., :, :-1, constants.DOWN] = frequencies[..., :, 1:, constants.UP]
+    return np.lcm(frequencies, facing)
+
+
+class MazeRules:
+    """Read-only data shared by every snapshot forked from the same maze"""
+
+    # Position delta for LEFT, UP, RIGHT, DOWN
+    dx = (-1, 0, 1, 0)
+    dy = (0, -1, 0, 1)
+
+    def __init__(self, frequencies, end_pos=None):
+        """
+            Args:
+                frequencies (np.ndarray): (width, height, 4) array of door frequencies, can be the true
+                    maze or a belief maze built by a player
+                end_pos (Optional[Tuple[int, int]]): coordinates of the goal, None if unknown
+        """
+        self.frequencies = np.asarray(frequencies).view()
+        self.frequencies.flags.writeable = False
+        self.width, self.height = self.frequencies.shape[:2]
+        self.end_pos = None if end_pos is None else (int(end_pos[0]), int(end_pos[1]))
+
+        # Flat python list, indexing it is much cheaper than indexing a numpy array per step
+        self.periods = edge_periods(self.frequencies).ravel().tolist()
+
+    def period(self, x, y, door_type):
+        return self.periods[(x * self.height + y) * 4 + door_type]
+
+
+class TimingMazeSnapshot:
+    """Immutable game state which can be stepped without copying the maze
+
+        `turn` is the number of turns already played, so the next move is made on turn `turn + 1`,
+        the same way TimingMazeGame counts turns. Every snapshot forked from another one shares its
+        MazeRules, so a step only allocates the new snapshot.
+    """
+
+    __slots__ = ("rules", "x", "y", "turn")
+
+    def __init__(self, rules, x, y, turn):
+        object.__setattr__(self, "rules", rules)
+        object.__setattr__(self, "x", x)
+        object.__setattr__(self, "y", y)
+        object.__setattr__(self, "turn", turn)
+
+    @classmethod
+    def from_frequencies(cls, frequencies, pos, end_pos=None, turn=0):
+        return cls(MazeRules(frequencies, end_pos), int(pos[0]), int(pos[1]), int(turn))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("TimingMazeSnapshot is immutable")
+
+    def __eq__(self, other):
+        return (isinstance(other, TimingMazeSnapshot) and self.rules is other.rules
+                and self.x == other.x and self.y == other.y and self.turn == other.turn)
+
+    def __hash__(self):
+        return hash((self.x, self.y, self.turn))
+
+    def __repr__(self):
+        return "TimingMazeSnapshot(pos=({}, {}), turn={})".format(self.x, self.y, self.turn)
+
+    @property
+    def pos(self):
+        return self.x, self.y
+
+    @property
+    def frequencies(self):
+        return self.rules.frequencies
+
+    def is_goal(self):
+        return self.rules.end_pos is not None and (self.x, self.y) == self.rules.end_pos
+
+    def can_move(self, move):
+        if move == constants.WAIT:
+            return True
+        if move not in (constants.LEFT, constants.UP, constants.RIGHT, constants.DOWN):
+            return False
+        period = self.rules.period(self.x, self.y, move)
+        return period != 0 and (self.turn + 1) % period == 0
+
+    def valid_moves(self):
+        return [move for move in (constants.WAIT, constants.LEFT, constants.UP, constants.RIGHT, constants.DOWN)
+                if self.can_move(move)]
+
+    def step(self, move):
+        """Play one turn, an impossible move is cancelled but the turn still passes like in the game
+
+            Args:
+                move (int): WAIT, LEFT, UP, RIGHT or DOWN
+            Returns:
+                TimingMazeSnapshot: the state after the turn
+        """
+        if move != constants.WAIT and self.can_move(move):
+            return TimingMazeSnapshot(self.rules, self.x + MazeRules.dx[move], self.y + MazeRules.dy[move],
+                                      self.turn + 1)
+        return TimingMazeSnapshot(self.rules, self.x, self.y, self.turn + 1)
+
+    def with_frequencies(self, frequencies, end_pos=None):
+        """Fork this position and turn onto another maze, e.g. a player's belief of the maze"""
+        if end_pos is None:
+            end_pos = self.rules.end_pos
+        return TimingMazeSnapshot(MazeRules(frequencies, end_pos), self.x, self.y, self.turn)
@@ -1,13 +1,16 @@
 class TimingMazeState:
-    def __init__(self, maze_state, is_end_visible, end_x, end_y, start_x, start_y):
+    def __init__(self, maze_state, is_end_visible, end_x, end_y, start_x, start_y, maze_tensor=None):
         """
             Args:
                 maze_state (List[List[int]]): 2D list of integers representing the maze state
                 is_end_visible (bool): Boolean representing if the end is visible
                 end_x (int): x-coordinate of the end cell
                 end_y (int): y-coordinate of the end cell
+                maze_tensor (Optional[np.ndarray]): the same percept as a (2r+1, 2r+1, 4) array centred on the drone,
+                    see timing_maze_percept.egocentric_percept
         """
         self.maze_state = maze_state
+        self.maze_tensor = maze_tensor
         self.start_x = start_x
         self.start_y = start_y
         self.is_end_visible = is_end_visible